@@ -36,6 +36,7 @@ if [ "${platform}" == "arm" ]; then
     docker run \
                 --gpus all \
                 --privileged \
+                --shm-size=2g \
                 -v /dev/bus/usb:/dev/bus/usb \
                 --platform="${PLATFORM}" \
                 --hostname ${CONTAINER_NAME} \
@@ -50,6 +51,7 @@ elif [ "${platform}" == "x86" ]; then
     docker run \
                 --gpus all \
                 --privileged \
+                --shm-size=2g \
                 --memory=20g \
                 -v /dev/bus/usb:/dev/bus/usb \
                 --platform="${PLATFORM}" \
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+
+"""
+Extract every collected log missing from the catalog across a pool of processes.
+
+(c) 2023 Scintilla. All rights reserved.
+Unauthorized reproduction, distribution, or disclosure of this material is strictly
+prohibited without the express written permission of Scintilla.
+"""
+
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from common.oslibs import error, info
+from data_pipeline.extractors.catalog import open_catalog, record_extraction
+from data_pipeline.extractors.mcap_to_parquet import (
+    extract_topics_worker,
+    load_config,
+    load_message_counts,
+    shard_topics,
+)
+from data_pipeline.extractors.writers.tf_index import DEFAULT_TF_STATIC_TOPICS, DEFAULT_TF_TOPICS, write_tf_index
+
+DEFAULT_COLLECTED_DIRECTORY = 'data/logs/collected/'
+
+
+class LogJob(NamedTuple):
+    """
+    A collected log waiting to be extracted.
+    """
+    name: str
+    mcap: str
+    size: int
+    message_counts: Dict[str, int]
+
+
+class WorkUnit(NamedTuple):
+    """
+    A shard of the topics of a log, extracted by one worker process.
+    """
+    log: str
+    mcap: str
+    topics: List[str]
+    cost: float
+
+
+def discover_logs(collected_directory: str, config: Dict[str, Any]) -> List[LogJob]:
+    """
+    Find the collected logs that are not in the catalog yet.
+
+    A log is a directory holding an .mcap file and the metadata.yaml written by the
+    recorder.
+
+    Args:
+        collected_directory (str): Directory holding one directory per collected log.
+        config (dict): Extraction configuration settings, locating the catalog.
+
+    Returns:
+        List[LogJob]: Logs to extract, largest first.
+    """
+    with open_catalog(config) as catalog:
+        extracted = catalog.log_names()
+    jobs = []
+    for mcap in sorted(glob.glob(os.path.join(glob.escape(collected_directory), '*', '*.mcap'))):
+        name = os.path.basename(os.path.dirname(mcap))
+        if name in extracted:
+            continue
+        jobs.append(LogJob(name, mcap, os.path.getsize(mcap), load_message_counts(Path(mcap).parent / 'metadata.yaml')))
+    return sorted(jobs, key=lambda job: job.size, reverse=True)
+
+
+def plan_work(jobs: List[LogJob], topics: List[str], shards_per_log: int) -> List[WorkUnit]:
+    """
+    Split every log into topic shards and order all shards by decreasing cost.
+
+    The cost of a shard is the share of the log file its messages account for, so
+    the shards of the biggest logs and topics are started first and the small ones
+    fill in the gaps at the end.
+
+    Args:
+        jobs (List[LogJob]): Logs to extract.
+        topics (List[str]): Topics to extract from every log.
+        shards_per_log (int): Maximum number of shards per log.
+
+    Returns:
+        List[WorkUnit]: Work units, most expensive first.
+    """
+    units = []
+    for job in jobs:
+        total = sum(job.message_counts.get(topic, 1) for topic in topics) or 1
+        for shard in shard_topics(topics, shards_per_log, job.message_counts):
+            share = sum(job.message_counts.get(topic, 1) for topic in shard) / total
+            units.append(WorkUnit(job.name, job.mcap, shard, job.size * share))
+    return sorted(units, key=lambda unit: unit.cost, reverse=True)
+
+
+def extract_logs(
+    jobs: List[LogJob],
+    config: Dict[str, Any],
+    num_workers: int,
+    shards_per_log: Optional[int] = None
+) -> Dict[str, Dict[str, int]]:
+    """
+    Extract logs with a pool of worker processes and record each one once it is done.
+
+    All work units are queued at once, most expensive first, on the shared queue of
+    the pool: a worker that finishes a unit takes the next one, whichever log it
+    belongs to, so no worker idles while another one still has a backlog. A log is
+    added to the catalog by this process as soon as its last unit succeeds, and its
+    throughput is reported along with the running total.
+
+    Args:
+        jobs (List[LogJob]): Logs to extract.
+        config (dict): Extraction configuration settings.
+        num_workers (int): Number of worker processes.
+        shards_per_log (int, optional): Maximum number of topic shards per log, the number of workers by default.
+
+    Returns:
+        Dict[str, Dict[str, int]]: Number of converted messages per topic of every extracted log.
+    """
+    topics = config.get('extracted_topics', [])
+    units = plan_work(jobs, topics, shards_per_log or num_workers)
+    remaining = {job.name: sum(1 for unit in units if unit.log == job.name) for job in jobs}
+    sizes = {job.name: job.size for job in jobs}
+    stats: Dict[str, Dict[str, int]] = {job.name: {} for job in jobs}
+    failed = set()
+
+    info(f'Extracting {len(jobs)} logs as {len(units)} work units in {num_workers} worker processes')
+    start = time.monotonic()
+    done_bytes = 0
+    done_messages = 0
+
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = {
+            executor.submit(
+                extract_topics_worker,
+                unit.mcap,
+                unit.topics,
+                os.path.join(config.get('output_directory'), unit.log),
+                config
+            ): unit
+            for unit in units
+        }
+        for future in as_completed(futures):
+            unit = futures[future]
+            remaining[unit.log] -= 1
+            try:
+                stats[unit.log].update(future.result())
+            except Exception as exception:
+                error(f'Extraction of {len(unit.topics)} topics of {unit.log} failed: {exception!r}')
+                failed.add(unit.log)
+
+            if remaining[unit.log] > 0 or unit.log in failed:
+                continue
+
+            output_directory = os.path.join(config.get('output_directory'), unit.log)
+            write_tf_index(output_directory, config.get('tf_topics', DEFAULT_TF_TOPICS), config.get('tf_static_topics', DEFAULT_TF_STATIC_TOPICS))
+            record_extraction(config, unit.log, Path(unit.mcap).parent / 'metadata.yaml', output_directory)
+            elapsed = max(time.monotonic() - start, 1e-9)
+            done_bytes += sizes[unit.log]
+            done_messages += sum(stats[unit.log].values())
+            info(
+                f'Extracted {unit.log}: {sum(stats[unit.log].values())} messages; total '
+                f'{done_bytes / 2**20 / elapsed:.1f} MB/s, {done_messages / elapsed:.0f} messages/s'
+            )
+
+    elapsed = max(time.monotonic() - start, 1e-9)
+    info(
+        f'Extracted {len(jobs) - len(failed)} of {len(jobs)} logs, {done_bytes / 2**20:.1f} MB and '
+        f'{done_messages} messages in {elapsed:.1f} s: {done_bytes / 2**20 / elapsed:.1f} MB/s, '
+        f'{done_messages / elapsed:.0f} messages/s'
+    )
+    for log in sorted(failed):
+        error(f'{log} was not added to the catalog, rerun to resume it')
+    return {log: log_stats for log, log_stats in stats.items() if log not in failed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Convert every collected mcap file missing from the catalog to parquet')
+    parser.add_argument('-c', '--config', help='Path to the extraction configuration.', default='data/config/mcap_to_parquet.yaml')
+    parser.add_argument('-d', '--collected', help='Directory holding one directory per collected log.', default=None)
+    parser.add_argument('-w', '--workers', help='Number of worker processes.', type=int, default=os.cpu_count())
+    parser.add_argument('-s', '--shards-per-log', help='Maximum number of topic shards per log.', type=int, default=None)
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    collected_directory = args.collected or config.get('collected_directory', DEFAULT_COLLECTED_DIRECTORY)
+
+    jobs = discover_logs(collected_directory, config)
+    if not jobs:
+        info(f'Every log in {collected_directory} is already extracted')
+    else:
+        extract_logs(jobs, config, args.workers, args.shards_per_log)
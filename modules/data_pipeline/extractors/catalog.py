@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+
+"""
+SQLite catalog of the extracted logs and topics.
+
+(c) 2023 Scintilla. All rights reserved.
+Unauthorized reproduction, distribution, or disclosure of this material is strictly
+prohibited without the express written permission of Scintilla.
+"""
+
+import fcntl
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import pandas as pd
+import yaml
+
+from data_pipeline.extractors.checkpoint import CheckpointManifest
+from data_pipeline.extractors.writers.parquet_writer import BUCKET_KEY, topic_to_directory
+
+# Seconds a writer waits for the lock held by another writer
+DEFAULT_LOCK_TIMEOUT = 60.0
+
+# Columns of manifest.parquet, read by the activity page of Pantheon
+MANIFEST_COLUMNS = ['timestamp', 'log_name', 'start_time', 'duration']
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS logs (
+    log_name TEXT PRIMARY KEY,
+    extracted_at TEXT NOT NULL,
+    start_time INTEGER,
+    duration INTEGER,
+    end_time INTEGER,
+    message_count INTEGER,
+    output_bytes INTEGER
+);
+CREATE INDEX IF NOT EXISTS logs_by_time ON logs (start_time, end_time);
+CREATE TABLE IF NOT EXISTS topics (
+    log_name TEXT NOT NULL REFERENCES logs (log_name) ON DELETE CASCADE,
+    topic TEXT NOT NULL,
+    message_type TEXT,
+    message_count INTEGER,
+    rows INTEGER,
+    first_timestamp INTEGER,
+    last_timestamp INTEGER,
+    output_bytes INTEGER,
+    PRIMARY KEY (log_name, topic)
+);
+CREATE INDEX IF NOT EXISTS topics_by_topic ON topics (topic, first_timestamp);
+'''
+
+
+def _directory_bytes(directory: str) -> int:
+    """
+    Sum the sizes of the files of a directory and of its partitions, without nested directories.
+
+    Args:
+        directory (str): Directory to measure.
+
+    Returns:
+        int: Total size in bytes, 0 if the directory does not exist.
+    """
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return 0
+    size = 0
+    for entry in entries:
+        if entry.is_file():
+            size += entry.stat().st_size
+        elif entry.is_dir() and entry.name.startswith(f'{BUCKET_KEY}='):
+            size += _directory_bytes(entry.path)
+    return size
+
+
+class ExtractionCatalog:
+    """
+    Catalog of the extracted logs with the time range, message counts and output size of every topic.
+
+    The catalog is an SQLite database in WAL mode: readers never block, and every
+    write runs in an immediate transaction, so concurrent extractors queue on the
+    database lock instead of overwriting each other. Logs are looked up through
+    their primary key and by time range through an index.
+    """
+
+    def __init__(self, path: str, lock_timeout: float = DEFAULT_LOCK_TIMEOUT) -> None:
+        """
+        Open the catalog, creating it if needed.
+
+        Args:
+            path (str): Path to the SQLite database.
+            lock_timeout (float): Seconds a writer waits for the lock held by another writer.
+
+        Returns:
+            None
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self._connection = sqlite3.connect(path, timeout=lock_timeout, isolation_level=None)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA foreign_keys=ON')
+        self._connection.executescript(SCHEMA)
+
+    def __enter__(self) -> 'ExtractionCatalog':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close the database connection.
+
+        Returns:
+            None
+        """
+        self._connection.close()
+
+    def record_log(
+        self,
+        log_name: str,
+        yaml_file: Union[str, Path],
+        output_directory: str,
+        extracted_at: Optional[datetime] = None
+    ) -> None:
+        """
+        Record or replace an extracted log and its topics.
+
+        The time range and message counts of the log come from its bag metadata, the
+        rows and time range of every topic from the checkpoint manifest of its
+        extraction, and the output sizes from the extracted files.
+
+        Args:
+            log_name (str): Name of the log.
+            yaml_file (str): Path to the metadata.yaml file of the bag.
+            output_directory (str): Root directory of the extracted log.
+            extracted_at (datetime, optional): Time of the extraction, now by default.
+
+        Returns:
+            None
+        """
+        with open(yaml_file, 'r') as file:
+            information = yaml.safe_load(file)['rosbag2_bagfile_information']
+        start_time = information['starting_time']['nanoseconds_since_epoch']
+        duration = information['duration']['nanoseconds']
+        checkpoints = CheckpointManifest(output_directory).load()
+
+        topics = []
+        for topic_info in information.get('topics_with_message_count', []):
+            topic = topic_info['topic_metadata']['name']
+            if topic not in checkpoints:
+                continue
+            checkpoint = checkpoints[topic]
+            topics.append((
+                log_name, topic, topic_info['topic_metadata'].get('type'), topic_info['message_count'],
+                checkpoint.get('rows'), checkpoint.get('first_timestamp'), checkpoint.get('last_timestamp'),
+                _directory_bytes(topic_to_directory(output_directory, topic)),
+            ))
+
+        extracted_at = (extracted_at or datetime.now()).isoformat()
+        with self._transaction():
+            self._connection.execute('DELETE FROM logs WHERE log_name = ?', (log_name,))
+            self._connection.execute(
+                'INSERT INTO logs VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (
+                    log_name, extracted_at, start_time, duration, start_time + duration,
+                    sum(topic[3] for topic in topics), sum(topic[7] for topic in topics),
+                ),
+            )
+            self._connection.executemany('INSERT INTO topics VALUES (?, ?, ?, ?, ?, ?, ?, ?)', topics)
+
+    def import_manifest(self, manifest_path: str) -> int:
+        """
+        Add the logs of a manifest parquet file missing from the catalog, without topics.
+
+        Args:
+            manifest_path (str): Path to the manifest parquet file.
+
+        Returns:
+            int: Number of imported logs.
+        """
+        try:
+            manifest = pd.read_parquet(manifest_path)
+        except FileNotFoundError:
+            return 0
+
+        rows = [
+            (row.log_name, pd.Timestamp(row.timestamp).isoformat(), int(row.start_time), int(row.duration), int(row.start_time) + int(row.duration))
+            for row in manifest.itertuples(index=False)
+        ]
+        with self._transaction():
+            before = self._connection.total_changes
+            self._connection.executemany(
+                'INSERT OR IGNORE INTO logs (log_name, extracted_at, start_time, duration, end_time) VALUES (?, ?, ?, ?, ?)',
+                rows,
+            )
+            return self._connection.total_changes - before
+
+    def is_extracted(self, log_name: str) -> bool:
+        """
+        Check whether a log is in the catalog.
+
+        Args:
+            log_name (str): Name of the log.
+
+        Returns:
+            bool: True if the log has been extracted.
+        """
+        return self._connection.execute('SELECT 1 FROM logs WHERE log_name = ?', (log_name,)).fetchone() is not None
+
+    def log_names(self) -> set:
+        """
+        Return the names of every extracted log.
+
+        Returns:
+            set: Names of the extracted logs.
+        """
+        return {row[0] for row in self._connection.execute('SELECT log_name FROM logs')}
+
+    def get_log(self, log_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up an extracted log by name.
+
+        Args:
+            log_name (str): Name of the log.
+
+        Returns:
+            dict: Columns of the log, None if it is not in the catalog.
+        """
+        row = self._connection.execute('SELECT * FROM logs WHERE log_name = ?', (log_name,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def find_logs(self, start_time: Optional[int] = None, end_time: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Find the logs overlapping a time range.
+
+        Args:
+            start_time (int, optional): Start of the range, in nanoseconds since epoch.
+            end_time (int, optional): End of the range, in nanoseconds since epoch.
+
+        Returns:
+            List[dict]: Columns of every matching log, by start time.
+        """
+        query = 'SELECT * FROM logs WHERE 1 = 1'
+        parameters = []
+        if end_time is not None:
+            query += ' AND start_time <= ?'
+            parameters.append(end_time)
+        if start_time is not None:
+            query += ' AND end_time >= ?'
+            parameters.append(start_time)
+        return [dict(row) for row in self._connection.execute(query + ' ORDER BY start_time', parameters)]
+
+    def get_topics(self, log_name: str) -> List[Dict[str, Any]]:
+        """
+        Return the extracted topics of a log.
+
+        Args:
+            log_name (str): Name of the log.
+
+        Returns:
+            List[dict]: Columns of every topic of the log, by topic name.
+        """
+        query = 'SELECT * FROM topics WHERE log_name = ? ORDER BY topic'
+        return [dict(row) for row in self._connection.execute(query, (log_name,))]
+
+    def find_topic(self, topic: str, start_time: Optional[int] = None, end_time: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Find the logs holding a topic within a time range.
+
+        Args:
+            topic (str): Name of the topic.
+            start_time (int, optional): Start of the range, in nanoseconds since epoch.
+            end_time (int, optional): End of the range, in nanoseconds since epoch.
+
+        Returns:
+            List[dict]: Columns of the topic in every matching log, by first timestamp.
+        """
+        query = 'SELECT * FROM topics WHERE topic = ?'
+        parameters: List[Any] = [topic]
+        if end_time is not None:
+            query += ' AND first_timestamp <= ?'
+            parameters.append(end_time)
+        if start_time is not None:
+            query += ' AND last_timestamp >= ?'
+            parameters.append(start_time)
+        return [dict(row) for row in self._connection.execute(query + ' ORDER BY first_timestamp', parameters)]
+
+    def export_manifest(self, manifest_path: str) -> None:
+        """
+        Write the logs to a manifest parquet file with the legacy manifest columns.
+
+        The logs are read and written under a file lock, so that a concurrent export
+        never replaces the manifest with an older state of the catalog, and the
+        manifest is replaced atomically so that readers never see a partial file.
+
+        Args:
+            manifest_path (str): Path to the manifest parquet file.
+
+        Returns:
+            None
+        """
+        os.makedirs(os.path.dirname(manifest_path) or '.', exist_ok=True)
+        with open(f'{manifest_path}.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                rows = self._connection.execute('SELECT extracted_at, log_name, start_time, duration FROM logs ORDER BY extracted_at').fetchall()
+                df = pd.DataFrame([tuple(row) for row in rows], columns=MANIFEST_COLUMNS)
+                df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601')
+                df.to_parquet(f'{manifest_path}.tmp', index=False)
+                os.replace(f'{manifest_path}.tmp', manifest_path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _transaction(self) -> 'sqlite3.Connection':
+        """
+        Start an immediate transaction, taking the write lock up front.
+
+        Returns:
+            sqlite3.Connection: Connection to use as a context manager committing or rolling back the transaction.
+        """
+        self._connection.execute('BEGIN IMMEDIATE')
+        return self._connection
+
+
+def open_catalog(config: Dict[str, Any]) -> ExtractionCatalog:
+    """
+    Open the catalog of the configuration, importing the legacy manifest into a new catalog.
+
+    Args:
+        config (dict): Extraction configuration settings.
+
+    Returns:
+        ExtractionCatalog: The catalog.
+    """
+    catalog_path = config.get('catalog_path')
+    is_new = not os.path.exists(catalog_path)
+    catalog = ExtractionCatalog(catalog_path)
+    if is_new and config.get('manifest_parquet'):
+        catalog.import_manifest(config.get('manifest_parquet'))
+    return catalog
+
+
+def record_extraction(config: Dict[str, Any], log_name: str, yaml_file: Union[str, Path], output_directory: str) -> None:
+    """
+    Record an extracted log in the catalog and refresh the manifest exported from it.
+
+    Args:
+        config (dict): Extraction configuration settings.
+        log_name (str): Name of the log.
+        yaml_file (str): Path to the metadata.yaml file of the bag.
+        output_directory (str): Root directory of the extracted log.
+
+    Returns:
+        None
+    """
+    with open_catalog(config) as catalog:
+        catalog.record_log(log_name, yaml_file, output_directory)
+        if config.get('manifest_parquet'):
+            catalog.export_manifest(config.get('manifest_parquet'))
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+
+"""
+Change-only storage of topics repeating the same content, such as camera infos and static transforms.
+
+(c) 2023 Scintilla. All rights reserved.
+Unauthorized reproduction, distribution, or disclosure of this material is strictly
+prohibited without the express written permission of Scintilla.
+"""
+
+import hashlib
+from fnmatch import fnmatchcase
+from typing import Any, Dict, List, Optional, Tuple
+
+import pyarrow as pa
+
+from data_pipeline.extractors.writers.parquet_writer import LOG_TIME_COLUMN
+
+# Last log time a row was seen with the same content, its first one being its log time
+LAST_SEEN_COLUMN = 'last_seen'
+
+# Schema metadata listing the columns identifying the rows of a message, as a comma separated list
+CHANGE_KEY_METADATA = b'change_key_columns'
+
+# Columns left out of the content of a row, matched against their full name or last component
+DEFAULT_IGNORE_COLUMNS = ['sec', 'nanosec']
+
+# Size in bytes of the CDR encapsulation header and of the stamp of a leading std_msgs/Header
+CDR_HEADER_BYTES = 4
+CDR_STAMP_BYTES = 8
+
+
+def _matches(column: str, patterns: List[str]) -> bool:
+    """
+    Check whether a column matches one of the column patterns.
+
+    Args:
+        column (str): Name of the column.
+        patterns (List[str]): Column names or glob patterns.
+
+    Returns:
+        bool: True if the full name or the last component of the column matches.
+    """
+    leaf = column.rsplit('/', 1)[-1]
+    return any(fnmatchcase(column, pattern) or fnmatchcase(leaf, pattern) for pattern in patterns)
+
+
+def _has_leading_header(msg_type: Any) -> bool:
+    """
+    Check whether the first field of a message type is a std_msgs/Header.
+
+    Args:
+        msg_type (Any): Message class.
+
+    Returns:
+        bool: True if the serialized messages start with a stamp.
+    """
+    try:
+        fields = msg_type.get_fields_and_field_types()
+    except AttributeError:
+        return False
+    first = next(iter(fields.values()), None)
+    return first == 'std_msgs/Header'
+
+
+class _Run:
+    """
+    Content of a row over the consecutive messages it was seen in.
+    """
+
+    def __init__(self, digest: bytes, first_seen: int, row: pa.RecordBatch) -> None:
+        """
+        Initialize the _Run.
+
+        Args:
+            digest (bytes): Hash of the content of the row.
+            first_seen (int): Log time of the first message holding the row, in nanoseconds.
+            row (pa.RecordBatch): The row, as converted from that message.
+
+        Returns:
+            None
+        """
+        self.digest = digest
+        self.first_seen = first_seen
+        self.last_seen = first_seen
+        self.row = row
+
+
+class ChangeFilter:
+    """
+    Keep only the rows of a topic whose content changed, with the interval they were valid for.
+
+    Rows are hashed without their log time and stamp columns, and grouped by their
+    key columns, such as the child frame of a transform. A row is held while the
+    following messages repeat its content, and written once with its log time set to
+    the first message holding it and `last_seen` to the last one. Written rows stay
+    sorted by log time: a row is released once every row still held started after it.
+
+    Serialized messages identical to the previous message of the topic, once their
+    header stamp is left out, are recognized before being deserialized and converted,
+    and only extend the rows of that message.
+    """
+
+    def __init__(self, key_columns: Optional[List[str]] = None, ignore_columns: Optional[List[str]] = None) -> None:
+        """
+        Initialize the ChangeFilter.
+
+        Args:
+            key_columns (List[str], optional): Columns identifying the rows of a message, none for one row per message.
+            ignore_columns (List[str], optional): Columns or glob patterns left out of the content, DEFAULT_IGNORE_COLUMNS by default.
+
+        Returns:
+            None
+        """
+        self.key_columns = list(key_columns or [])
+        self.ignore_columns = list(DEFAULT_IGNORE_COLUMNS if ignore_columns is None else ignore_columns)
+        self.last_timestamp: Optional[int] = None
+        self._open: Dict[Tuple[Any, ...], _Run] = {}
+        self._closed: List[_Run] = []
+        self._last_keys: List[Tuple[Any, ...]] = []
+        self._content_columns: Dict[pa.Schema, List[str]] = {}
+        self._raw_digest: Optional[bytes] = None
+        self._raw_headers: Dict[Any, bool] = {}
+
+    def is_repeat(self, data: bytes, msg_type: Any) -> bool:
+        """
+        Check whether a serialized message repeats the previous message of the topic.
+
+        Args:
+            data (bytes): CDR bytes of the message.
+            msg_type (Any): Message class of the topic.
+
+        Returns:
+            bool: True if the message only differs from the previous one by its header stamp.
+        """
+        has_header = self._raw_headers.get(msg_type)
+        if has_header is None:
+            has_header = self._raw_headers[msg_type] = _has_leading_header(msg_type)
+
+        digest = hashlib.blake2b(digest_size=16)
+        if has_header:
+            view = memoryview(data)
+            digest.update(view[:CDR_HEADER_BYTES])
+            digest.update(view[CDR_HEADER_BYTES + CDR_STAMP_BYTES:])
+        else:
+            digest.update(data)
+        digest = digest.digest()
+        repeat = digest == self._raw_digest
+        self._raw_digest = digest
+        return repeat
+
+    def extend(self, timestamp: int) -> None:
+        """
+        Account for a message repeating the previous message of the topic.
+
+        Args:
+            timestamp (int): Log time of the message, in nanoseconds.
+
+        Returns:
+            None
+        """
+        for key in self._last_keys:
+            self._open[key].last_seen = timestamp
+        self.last_timestamp = timestamp
+
+    def update(self, batch: pa.RecordBatch) -> Optional[pa.RecordBatch]:
+        """
+        Filter the converted rows of a batch of messages.
+
+        Args:
+            batch (pa.RecordBatch): Converted rows, starting with their log time column.
+
+        Returns:
+            pa.RecordBatch: Rows whose content ended and can be written in order, None if there is none.
+        """
+        if batch.num_rows == 0:
+            return None
+        log_times = batch.column(LOG_TIME_COLUMN).to_pylist()
+        keys = list(zip(*[batch.column(name).to_pylist() for name in self.key_columns])) or [()] * batch.num_rows
+        content = [batch.column(name).to_pylist() for name in self._content(batch.schema)]
+
+        started = []
+        for index, (log_time, key) in enumerate(zip(log_times, keys)):
+            digest = hashlib.blake2b(repr([column[index] for column in content]).encode(), digest_size=16).digest()
+            run = self._open.get(key)
+            if run is not None and run.digest == digest:
+                run.last_seen = log_time
+                continue
+            if run is not None:
+                self._closed.append(run)
+            run = self._open[key] = _Run(digest, log_time, None)
+            started.append((index, run))
+
+        if started:
+            # One copy per batch, so that held rows do not keep the whole batch alive
+            rows = batch.take(pa.array([index for index, _ in started], type=pa.int64()))
+            for position, (_, run) in enumerate(started):
+                run.row = rows.slice(position, 1)
+
+        last = log_times[-1]
+        self._last_keys = [key for log_time, key in zip(log_times, keys) if log_time == last]
+        self.last_timestamp = last
+        return self._release()
+
+    def close(self) -> Optional[pa.RecordBatch]:
+        """
+        End the rows still held at the end of the extraction.
+
+        Returns:
+            pa.RecordBatch: Every row not written yet, None if there is none.
+        """
+        self._closed.extend(self._open.values())
+        self._open = {}
+        self._last_keys = []
+        return self._release()
+
+    def _content(self, schema: pa.Schema) -> List[str]:
+        """
+        List the columns hashed as the content of the rows.
+
+        Args:
+            schema (pa.Schema): Schema of the converted rows.
+
+        Returns:
+            List[str]: Columns other than the log time, key and ignored columns.
+        """
+        columns = self._content_columns.get(schema)
+        if columns is None:
+            columns = [
+                name for name in schema.names
+                if name != LOG_TIME_COLUMN and name not in self.key_columns and not _matches(name, self.ignore_columns)
+            ]
+            self._content_columns[schema] = columns
+        return columns
+
+    def _release(self) -> Optional[pa.RecordBatch]:
+        """
+        Build the rows of the ended runs that no held run started before.
+
+        Returns:
+            pa.RecordBatch: Rows sorted by log time, with their last seen log time, None if there is none.
+        """
+        if not self._closed:
+            return None
+        held = min((run.first_seen for run in self._open.values()), default=None)
+        ready = [run for run in self._closed if held is None or run.first_seen <= held]
+        if not ready:
+            return None
+        self._closed = [run for run in self._closed if not (held is None or run.first_seen <= held)]
+        ready.sort(key=lambda run: run.first_seen)
+
+        table = pa.Table.from_batches([run.row for run in ready]).combine_chunks()
+        table = table.add_column(1, pa.field(LAST_SEEN_COLUMN, pa.int64()), pa.array([run.last_seen for run in ready], type=pa.int64()))
+        metadata = {**(table.schema.metadata or {}), CHANGE_KEY_METADATA: ','.join(self.key_columns).encode()}
+        return table.replace_schema_metadata(metadata).to_batches()[0]
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+
+"""
+Per-log checkpoint manifest making extractions incremental and resumable.
+
+(c) 2023 Scintilla. All rights reserved.
+Unauthorized reproduction, distribution, or disclosure of this material is strictly
+prohibited without the express written permission of Scintilla.
+"""
+
+import fcntl
+import glob
+import hashlib
+import inspect
+import os
+import shutil
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import yaml
+
+from data_pipeline.extractors.convertors.convertor_interface import ConvertorInterface
+from data_pipeline.extractors.writers.parquet_policy import ParquetPolicies, ParquetPolicy
+from data_pipeline.extractors.writers.parquet_writer import (
+    BUCKET_KEY,
+    BUCKET_PART_FILE,
+    DEFAULT_PARTITIONING,
+    PART_FILE,
+    part_path,
+    topic_to_directory,
+)
+
+CHECKPOINT_FILE = 'checkpoint.yaml'
+
+# Bumped whenever the layout of the extracted files changes, so that topics extracted
+# with an older layout are rebuilt instead of resumed or skipped
+OUTPUT_FORMAT_VERSION = 1
+
+# Actions planned for a topic on a new run
+SKIP = 'skip'
+RESUME = 'resume'
+REBUILD = 'rebuild'
+
+
+def convertor_hash(convertor: ConvertorInterface) -> str:
+    """
+    Fingerprint a convertor by its class, its source code, its configuration and its columns.
+
+    Args:
+        convertor (ConvertorInterface): Convertor of a topic.
+
+    Returns:
+        str: Hexadecimal digest, which changes whenever the output of the convertor may change.
+    """
+    convertor_class = type(convertor)
+    try:
+        source = inspect.getsource(convertor_class)
+    except (OSError, TypeError):
+        source = ''
+
+    digest = hashlib.sha256()
+    digest.update(f'{OUTPUT_FORMAT_VERSION}'.encode())
+    digest.update(f'{convertor_class.__module__}.{convertor_class.__qualname__}'.encode())
+    digest.update(source.encode())
+    digest.update(yaml.safe_dump(convertor.config, sort_keys=True).encode())
+    digest.update(repr(convertor.header).encode())
+    return digest.hexdigest()
+
+
+class CheckpointManifest:
+    """
+    YAML manifest recording how far every topic of an extracted log got.
+
+    Every topic entry holds the hash of its convertor, the time range, the parquet
+    partitioning and the hash of the parquet policy it was extracted with, the
+    number of committed part files and rows, the bag timestamps of the first and
+    last committed messages, whether its output can be resumed and whether it is
+    complete. Updates lock the manifest and replace it atomically, so worker
+    processes extracting shards of the same log can share it.
+    """
+
+    def __init__(self, output_directory: str) -> None:
+        """
+        Initialize the CheckpointManifest.
+
+        Args:
+            output_directory (str): Root directory of the extracted log.
+
+        Returns:
+            None
+        """
+        self.output_directory = output_directory
+        self.path = os.path.join(output_directory, CHECKPOINT_FILE)
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Load the entries of every topic.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Checkpoint entry per topic, empty if there is no manifest.
+        """
+        try:
+            with open(self.path, 'r') as file:
+                manifest = yaml.safe_load(file) or {}
+        except FileNotFoundError:
+            return {}
+        return manifest.get('topics', {})
+
+    def update(self, topic: str, **fields: Any) -> None:
+        """
+        Update fields of the entry of a topic.
+
+        Args:
+            topic (str): Name of the topic.
+            **fields: Fields to set.
+
+        Returns:
+            None
+        """
+        with self._locked():
+            topics = self.load()
+            topics.setdefault(topic, {}).update(fields)
+            self._store(topics)
+
+    def start(
+        self,
+        topic: str,
+        fingerprint: str,
+        start_time: Optional[int],
+        end_time: Optional[int],
+        partitioning: str = DEFAULT_PARTITIONING,
+        policy: Optional[ParquetPolicy] = None
+    ) -> None:
+        """
+        Reset the entry of a topic extracted from scratch.
+
+        Args:
+            topic (str): Name of the topic.
+            fingerprint (str): Hash of the convertor of the topic.
+            start_time (int, optional): First receive timestamp extracted, in nanoseconds.
+            end_time (int, optional): Last receive timestamp extracted, in nanoseconds.
+            partitioning (str): Parquet partitioning of the topic.
+            policy (ParquetPolicy, optional): Parquet policy of the topic, the default policy otherwise.
+
+        Returns:
+            None
+        """
+        with self._locked():
+            topics = self.load()
+            topics[topic] = {
+                'convertor_hash': fingerprint,
+                'start_time': start_time,
+                'end_time': end_time,
+                'partitioning': partitioning,
+                'parquet_policy': (policy or ParquetPolicy()).fingerprint(),
+                'parts': 0,
+                'rows': 0,
+                'first_timestamp': None,
+                'last_timestamp': None,
+                'resumable': True,
+                'complete': False,
+            }
+            self._store(topics)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """
+        Hold an exclusive lock on the manifest across processes.
+
+        Yields:
+            None
+        """
+        os.makedirs(self.output_directory, exist_ok=True)
+        with open(f'{self.path}.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _store(self, topics: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Atomically replace the manifest.
+
+        Args:
+            topics (Dict[str, Dict[str, Any]]): Checkpoint entry per topic.
+
+        Returns:
+            None
+        """
+        with open(f'{self.path}.tmp', 'w') as file:
+            yaml.safe_dump({'topics': topics}, file, sort_keys=True)
+        os.replace(f'{self.path}.tmp', self.path)
+
+
+def plan_topics(
+    entries: Dict[str, Dict[str, Any]],
+    convertors: Dict[str, ConvertorInterface],
+    topics: List[str],
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+    partitioning: str = DEFAULT_PARTITIONING,
+    policies: Optional[ParquetPolicies] = None
+) -> Dict[str, str]:
+    """
+    Decide whether every topic is skipped, resumed or rebuilt.
+
+    A topic is skipped when its last extraction completed with the same convertor,
+    time range, partitioning and parquet policy, resumed when it stopped half-way
+    with them and its output can be appended to, and rebuilt otherwise. Topics
+    without convertor are rebuilt, which only recreates their directory.
+
+    Args:
+        entries (Dict[str, Dict[str, Any]]): Checkpoint entry per topic.
+        convertors (Dict[str, ConvertorInterface]): Convertor of every topic.
+        topics (List[str]): Topics to extract.
+        start_time (int, optional): First receive timestamp to extract, in nanoseconds.
+        end_time (int, optional): Last receive timestamp to extract, in nanoseconds.
+        partitioning (str): Parquet partitioning to extract with.
+        policies (ParquetPolicies, optional): Parquet policy of every topic, the default policy otherwise.
+
+    Returns:
+        Dict[str, str]: SKIP, RESUME or REBUILD per topic.
+    """
+    policies = policies or ParquetPolicies()
+    default_policy = ParquetPolicy().fingerprint()
+    plan = {}
+    for topic in topics:
+        entry = entries.get(topic)
+        if (
+            entry is None or topic not in convertors
+            or entry.get('convertor_hash') != convertor_hash(convertors[topic])
+            or entry.get('start_time') != start_time or entry.get('end_time') != end_time
+            or entry.get('partitioning', DEFAULT_PARTITIONING) != partitioning
+            or entry.get('parquet_policy', default_policy) != policies.get(topic).fingerprint()
+        ):
+            plan[topic] = REBUILD
+        elif entry.get('complete'):
+            plan[topic] = SKIP
+        elif entry.get('resumable') and entry.get('last_timestamp') is not None:
+            plan[topic] = RESUME
+        else:
+            plan[topic] = REBUILD
+    return plan
+
+
+def clear_topic_directory(output_directory: str, topic: str) -> None:
+    """
+    Delete the files and partitions of a topic, keeping the directories of nested topics.
+
+    Args:
+        output_directory (str): Root directory of the extracted log.
+        topic (str): Name of the topic.
+
+    Returns:
+        None
+    """
+    topic_directory = topic_to_directory(output_directory, topic)
+    os.makedirs(topic_directory, exist_ok=True)
+    for entry in os.scandir(topic_directory):
+        if entry.is_file() or entry.is_symlink():
+            os.remove(entry.path)
+        elif entry.name.startswith(f'{BUCKET_KEY}='):
+            shutil.rmtree(entry.path)
+
+
+def discard_uncommitted_parts(output_directory: str, topic: str, parts: int) -> None:
+    """
+    Delete the part files written after the last checkpoint of a resumed topic.
+
+    Args:
+        output_directory (str): Root directory of the extracted log.
+        topic (str): Name of the topic.
+        parts (int): Number of committed parts.
+
+    Returns:
+        None
+    """
+    topic_directory = topic_to_directory(output_directory, topic)
+    committed = {part_path(topic_directory, part) for part in range(parts)}
+    pattern = os.path.join(glob.escape(topic_directory), PART_FILE.replace('{part:05d}', '*'))
+    for path in glob.glob(pattern) + glob.glob(f'{pattern}.tmp'):
+        if path not in committed:
+            os.remove(path)
+
+    # Parts of a partitioned topic are numbered across buckets
+    committed_names = {BUCKET_PART_FILE.format(part=part) for part in range(parts)}
+    pattern = os.path.join(glob.escape(topic_directory), f'{BUCKET_KEY}=*', BUCKET_PART_FILE.replace('{part:05d}', '*'))
+    for path in glob.glob(pattern) + glob.glob(f'{pattern}.tmp'):
+        if os.path.basename(path) not in committed_names:
+            os.remove(path)
+    for bucket_directory in glob.glob(os.path.join(glob.escape(topic_directory), f'{BUCKET_KEY}=*')):
+        if not os.listdir(bucket_directory):
+            os.rmdir(bucket_directory)
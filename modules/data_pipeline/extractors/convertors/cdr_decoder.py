@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+
+"""
+Bulk decoding of serialized CDR messages with a fixed field layout.
+
+(c) 2023 Scintilla. All rights reserved.
+Unauthorized reproduction, distribution, or disclosure of this material is strictly
+prohibited without the express written permission of Scintilla.
+"""
+
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pyarrow as pa
+
+from data_pipeline.extractors.convertors.generated_convertor import _item_type, _message_class, _parse_type
+
+# NumPy types of the ROS 2 primitive types with a fixed CDR size, by their IDL names as
+# returned by get_fields_and_field_types, and by their .msg aliases. Octets are decoded
+# as uint8 and stored as 1-byte binary values.
+CDR_DTYPES = {
+    'boolean': np.dtype(np.bool_),
+    'bool': np.dtype(np.bool_),
+    'octet': np.dtype(np.uint8),
+    'byte': np.dtype(np.uint8),
+    'float': np.dtype(np.float32),
+    'float32': np.dtype(np.float32),
+    'double': np.dtype(np.float64),
+    'float64': np.dtype(np.float64),
+    'int8': np.dtype(np.int8),
+    'uint8': np.dtype(np.uint8),
+    'int16': np.dtype(np.int16),
+    'uint16': np.dtype(np.uint16),
+    'int32': np.dtype(np.int32),
+    'uint32': np.dtype(np.uint32),
+    'int64': np.dtype(np.int64),
+    'uint64': np.dtype(np.uint64),
+}
+
+# Size of the encapsulation header preceding the CDR payload, whose second byte is
+# 0x01 for little endian and 0x00 for big endian payloads
+ENCAPSULATION_SIZE = 4
+LITTLE_ENDIAN_KIND = 1
+
+# A leaf field is its NumPy type, or None for strings, and its number of values
+Leaf = Tuple[Optional[np.dtype], int]
+# A run is a structured dtype of consecutive fixed-size leaves, or None for a string
+Run = Tuple[Optional[np.dtype], List[Leaf]]
+
+
+def _leaves(message_class: Any, leaves: List[Leaf]) -> bool:
+    """
+    Append the leaf fields of a message in serialization order.
+
+    :param message_class: Message class to walk
+    :param leaves: List the leaves are appended to
+    :return: False if a field has no fixed layout (sequences, wide strings or chars)
+    """
+    for type_string in message_class.get_fields_and_field_types().values():
+        kind, item, size = _parse_type(type_string)
+        item = _item_type(item)
+
+        if kind == 'sequence':
+            return False
+        if item == 'string' and kind == 'scalar':
+            leaves.append((None, 1))
+        elif item in CDR_DTYPES:
+            leaves.append((CDR_DTYPES[item], size or 1))
+        elif kind == 'scalar' and '/' in item:
+            if not _leaves(_message_class(item), leaves):
+                return False
+        else:
+            return False
+    return True
+
+
+def _runs(leaves: List[Leaf]) -> List[Run]:
+    """
+    Group consecutive fixed-size leaves into structured dtypes.
+
+    A run starts at every string and at every leaf aligned more strictly than the
+    first leaf of the current run, so that aligning the start of a run to its first
+    leaf aligns every leaf of the run.
+
+    :param leaves: Leaf fields in serialization order
+    :return: Runs in serialization order
+    """
+    runs: List[Run] = []
+    current: List[Leaf] = []
+
+    def close() -> None:
+        if not current:
+            return
+        names, formats, offsets = [], [], []
+        offset = 0
+        for index, (dtype, count) in enumerate(current):
+            offset = -(-offset // dtype.alignment) * dtype.alignment
+            names.append(f'f{index}')
+            formats.append((dtype, (count,)))
+            offsets.append(offset)
+            offset += dtype.itemsize * count
+        runs.append((np.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': offset}), list(current)))
+        current.clear()
+
+    for dtype, count in leaves:
+        if dtype is None:
+            close()
+            runs.append((None, [(None, 1)]))
+            continue
+        if current and dtype.alignment > current[0][0].alignment:
+            close()
+        current.append((dtype, count))
+    close()
+    return runs
+
+
+@lru_cache(maxsize=None)
+def cdr_layout(message_class: Any) -> Optional[List[Run]]:
+    """
+    Derive the CDR layout of a message class, cached per class.
+
+    :param message_class: Message class
+    :return: Runs of the layout, None if the message has no fixed layout
+    """
+    leaves: List[Leaf] = []
+    if not _leaves(message_class, leaves):
+        return None
+    return _runs(leaves)
+
+
+def _gather(data: np.ndarray, positions: np.ndarray, ends: np.ndarray, size: int) -> np.ndarray:
+    """
+    Gather `size` bytes at a position of every message.
+
+    :param data: Concatenated serialized messages
+    :param positions: Start of the bytes to gather in every message
+    :param ends: End of every message
+    :param size: Number of bytes to gather
+    :return: Array of shape (messages, size)
+    """
+    if np.any(positions + size > ends):
+        raise ValueError('Serialized message is shorter than its layout.')
+    return data[positions[:, None] + np.arange(size)]
+
+
+def _decode_strings(data: np.ndarray, positions: np.ndarray, ends: np.ndarray, byte_order: str) -> Tuple[pa.Array, np.ndarray]:
+    """
+    Decode a CDR string of every message without building Python strings.
+
+    :param data: Concatenated serialized messages
+    :param positions: 4-byte aligned position of the string length in every message
+    :param ends: End of every message
+    :param byte_order: '<' or '>', byte order of the string lengths
+    :return: String array and the position following the string in every message
+    """
+    lengths = _gather(data, positions, ends, 4).view(f'{byte_order}u4').ravel().astype(np.int64)
+    if np.any(positions + 4 + lengths > ends):
+        raise ValueError('Serialized message is shorter than its layout.')
+
+    # Serialized lengths count the terminating null character
+    sizes = np.maximum(lengths - 1, 0)
+    offsets = np.zeros(len(sizes) + 1, dtype=np.int32)
+    np.cumsum(sizes, out=offsets[1:])
+    sources = np.repeat(positions + 4 - offsets[:-1], sizes) + np.arange(offsets[-1])
+
+    strings = pa.StringArray.from_buffers(len(sizes), pa.py_buffer(offsets), pa.py_buffer(data[sources].tobytes()))
+    strings.validate(full=True)
+    return strings, positions + 4 + lengths
+
+
+def _leaf_array(values: np.ndarray, data_type: pa.DataType) -> pa.Array:
+    """
+    Convert the values of a leaf to an Arrow array.
+
+    :param values: One-dimensional values
+    :param data_type: Arrow type of the array, binary for octets
+    :return: Arrow array
+    """
+    if pa.types.is_binary(data_type):
+        # Every octet becomes a 1-byte value, without building Python bytes objects
+        offsets = np.arange(len(values) + 1, dtype=np.int32)
+        payload = np.ascontiguousarray(values, dtype=np.uint8)
+        return pa.Array.from_buffers(pa.binary(), len(values), [None, pa.py_buffer(offsets), pa.py_buffer(payload)])
+    return pa.array(values, type=data_type)
+
+
+def _to_arrow(values: np.ndarray, fields: Sequence[pa.Field]) -> List[pa.Array]:
+    """
+    Convert the values of a leaf to the Arrow columns of the given fields.
+
+    :param values: Values of shape (messages, count)
+    :param fields: One fixed_size_list field, or one field per value
+    :return: Arrow columns
+    """
+    if pa.types.is_fixed_size_list(fields[0].type):
+        flat = _leaf_array(values.ravel(), fields[0].type.value_type)
+        return [pa.FixedSizeListArray.from_arrays(flat, values.shape[1])]
+    return [_leaf_array(values[:, index], field.type) for index, field in enumerate(fields)]
+
+
+def decode_cdr_batch(message_class: Any, blobs: Sequence[bytes], schema: pa.Schema) -> pa.RecordBatch:
+    """
+    Decode serialized messages of a fixed-layout type straight into a record batch.
+
+    Messages are concatenated into one buffer and every run of fixed-size fields is
+    gathered for all messages at once and viewed through a structured dtype. Strings
+    move the following fields of every message by a different amount, so positions
+    are tracked per message and realigned after each string, as CDR aligns every
+    primitive relative to the start of the payload.
+
+    The leaves of the message map in order onto the schema fields. Fixed-size arrays
+    fill either one fixed_size_list field or one field per value, strings become
+    string or dictionary fields.
+
+    :param message_class: Message class of the serialized messages
+    :param blobs: Serialized messages, with their encapsulation header
+    :param schema: Arrow schema of the decoded rows
+    :return: Record batch holding one row per message
+    """
+    runs = cdr_layout(message_class)
+    if runs is None:
+        raise ValueError(f'{message_class.__name__} has no fixed CDR layout.')
+
+    if not blobs:
+        return pa.RecordBatch.from_pylist([], schema=schema)
+
+    sizes = np.fromiter((len(blob) for blob in blobs), dtype=np.int64, count=len(blobs))
+    starts = np.zeros(len(blobs), dtype=np.int64)
+    np.cumsum(sizes[:-1], out=starts[1:])
+    ends = starts + sizes
+    data = np.frombuffer(b''.join(blobs), dtype=np.uint8)
+
+    if np.any(sizes < ENCAPSULATION_SIZE):
+        raise ValueError('Serialized message is shorter than its encapsulation header.')
+    kinds = data[starts + 1]
+    if np.any(kinds != kinds[0]):
+        raise ValueError('Serialized messages mix byte orders.')
+    byte_order = '<' if kinds[0] == LITTLE_ENDIAN_KIND else '>'
+
+    origins = starts + ENCAPSULATION_SIZE
+    positions = origins.copy()
+    arrays: List[pa.Array] = []
+    field_index = 0
+
+    for run_dtype, leaves in runs:
+        if field_index >= len(schema):
+            raise ValueError(f'{message_class.__name__} decodes to more than {len(schema)} columns.')
+
+        if run_dtype is None:
+            positions = origins + -(-(positions - origins) // 4) * 4
+            strings, positions = _decode_strings(data, positions, ends, byte_order)
+            field = schema.field(field_index)
+            arrays.append(strings.dictionary_encode() if pa.types.is_dictionary(field.type) else strings)
+            field_index += 1
+            continue
+
+        alignment = leaves[0][0].alignment
+        positions = origins + -(-(positions - origins) // alignment) * alignment
+        records = _gather(data, positions, ends, run_dtype.itemsize).view(run_dtype.newbyteorder(byte_order)).ravel()
+        positions = positions + run_dtype.itemsize
+
+        for name, (dtype, count) in zip(run_dtype.names, leaves):
+            if field_index >= len(schema):
+                raise ValueError(f'{message_class.__name__} decodes to more than {len(schema)} columns.')
+            values = records[name].reshape(len(blobs), count).astype(dtype)
+            width = 1 if pa.types.is_fixed_size_list(schema.field(field_index).type) else count
+            arrays.extend(_to_arrow(values, list(schema)[field_index:field_index + width]))
+            field_index += width
+
+    if field_index != len(schema):
+        raise ValueError(f'{message_class.__name__} decodes to {field_index} columns, expected {len(schema)}.')
+    return pa.record_batch(arrays, schema=schema)
+
+
+def _without_nan(values: Any) -> Any:
+    """
+    Replace NaN values with None, so that they compare equal to each other.
+
+    :param values: Python values of a column, possibly nested in lists
+    :return: The same values without NaN
+    """
+    if isinstance(values, list):
+        return [_without_nan(value) for value in values]
+    return None if values != values else values
+
+
+def check_cdr_batch(message_class: Any, decoded: pa.RecordBatch, expected: pa.RecordBatch) -> None:
+    """
+    Check that messages decoded in bulk match the rows of their convertor.
+
+    :param message_class: Message class of the messages
+    :param decoded: Rows returned by decode_cdr_batch
+    :param expected: Rows returned by the convertor for the same deserialized messages
+    :raises ValueError: If a column differs in name, type or values
+    """
+    if decoded.num_rows != expected.num_rows or decoded.schema.names != expected.schema.names:
+        raise ValueError(f'{message_class.__name__} decodes to other rows than its convertor.')
+    for name, column, reference in zip(decoded.schema.names, decoded.columns, expected.columns):
+        if column.type != reference.type:
+            raise ValueError(f'{message_class.__name__} decodes {name} as {column.type}, its convertor as {reference.type}.')
+        if pa.types.is_dictionary(column.type):
+            column, reference = column.dictionary_decode(), reference.dictionary_decode()
+        if _without_nan(column.to_pylist()) != _without_nan(reference.to_pylist()):
+            raise ValueError(f'{message_class.__name__} decodes other values of {name} than its convertor.')
@@ -8,9 +8,41 @@ Unauthorized reproduction, distribution, or disclosure of this material is stric
 prohibited without the express written permission of Scintilla.
 """
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Sequence
 from copy import deepcopy
 
+import pandas as pd
+import pyarrow as pa
+
+
+def columns_to_record_batch(columns: Sequence[Sequence[Any]], schema: pa.Schema) -> pa.RecordBatch:
+    """
+    Build a record batch from column-major data with an explicit schema.
+
+    :param columns: One sequence (list or NumPy array) of values per schema field
+    :param schema: Arrow schema of the batch
+    :return: Record batch holding the columns
+    """
+    assert len(columns) == len(schema), f'Expected {len(schema)} columns, got {len(columns)}.'
+    arrays = [pa.array(column, type=field.type) for column, field in zip(columns, schema)]
+    return pa.record_batch(arrays, schema=schema)
+
+
+def rows_to_record_batch(rows: List[List[Any]], header: List[str], schema: Optional[pa.Schema] = None) -> pa.RecordBatch:
+    """
+    Build a record batch from converted rows.
+
+    :param rows: Converted rows
+    :param header: Column names of the rows
+    :param schema: Arrow schema of the batch, inferred by pandas when None
+    :return: Record batch holding the rows
+    """
+    if schema is None:
+        return pa.RecordBatch.from_pandas(pd.DataFrame(rows, columns=header), preserve_index=False)
+    columns = [list(column) for column in zip(*rows)] if rows else [[] for _ in schema]
+    return columns_to_record_batch(columns, schema)
+
+
 class ConvertorInterface:
     def __init__(self, config: Dict[str, Any] = None):
         self.__config = config
@@ -19,9 +51,59 @@ class ConvertorInterface:
     def header() -> List:
         raise NotImplementedError('Subclasses must implement the convert method.')
 
+    @property
+    def schema(self) -> Optional[pa.Schema]:
+        """
+        Return the Arrow schema of the converted rows, None to let pandas infer it.
+
+        :return: Arrow schema of the converted rows
+        """
+        return None
+
     @property
     def config(self) -> Dict[str, Any]:
         return deepcopy(self.__config)
 
+    @property
+    def stateful(self) -> bool:
+        """
+        Whether the rows of a message depend on the previous messages of its topic.
+
+        Stateful convertors get one instance per topic and must see the messages of
+        their topic in order.
+
+        :return: False by default
+        """
+        return False
+
     def convert(self, data: Any):
         raise NotImplementedError('Subclasses must implement the convert method.')
+
+    def convert_batch(self, messages: List[Any]) -> pa.RecordBatch:
+        """
+        Convert a batch of messages to a single record batch.
+
+        The default implementation converts messages one by one with `convert`, so
+        convertors that only implement `convert` keep working. Subclasses override it
+        to build the columns directly.
+
+        :param messages: Messages of a single topic
+        :return: Record batch holding the converted rows of every message
+        """
+        rows = []
+        for message in messages:
+            rows.extend(self.convert(message))
+        return rows_to_record_batch(rows, self.header, self.schema)
+
+    def row_counts(self, messages: List[Any]) -> Optional[List[int]]:
+        """
+        Return the number of rows every message of a batch converts to.
+
+        The rows of a batch are matched to their messages, and to their log times,
+        through these counts. The default returns None, which stands for one row per
+        message; convertors emitting any other number of rows per message override it.
+
+        :param messages: Messages of a single topic
+        :return: Number of rows per message, None for one row per message
+        """
+        return None
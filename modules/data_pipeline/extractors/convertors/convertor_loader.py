@@ -10,14 +10,19 @@ prohibited without the express written permission of Scintilla.
 
 from importlib import import_module
 import yaml
-from typing import Dict
+from typing import Dict, Optional
 from data_pipeline.extractors.convertors.convertor_interface import ConvertorInterface
+from data_pipeline.extractors.convertors.generated_convertor import GeneratedConvertor
 
-def load_convertors(config_file: str) -> Dict[str, ConvertorInterface]:
+def load_convertors(config_file: str, topic_types: Optional[Dict[str, str]] = None) -> Dict[str, ConvertorInterface]:
     """
     Load convertors based on a YAML configuration file.
 
+    Topics of `topic_types` without an explicit convertor fall back to a convertor
+    generated from the introspection of their message type.
+
     :param config_file: The path to the YAML configuration file.
+    :param topic_types: Optional message type name of every topic to convert.
     :return: A dictionary of instantiated conversion classes.
     """
     with open(config_file, 'r') as file:
@@ -36,8 +41,17 @@ def load_convertors(config_file: str) -> Dict[str, ConvertorInterface]:
         if issubclass(convertor_class, ConvertorInterface):
             convertor_instance: ConvertorInterface = convertor_class(convertor_config)
             for topic in convertor_config.get('topics'):
-                convertors[topic] = convertor_instance
+                # Convertors keeping state across messages must not be shared by topics
+                convertors[topic] = convertor_class(convertor_config) if convertor_instance.stateful else convertor_instance
         else:
             raise ValueError(f"{convertor_class_path} must implement ConvertorInterface.")
 
+    for topic, message_type in (topic_types or {}).items():
+        if topic not in convertors:
+            convertors[topic] = GeneratedConvertor({
+                'name': f'{GeneratedConvertor.__module__}.{GeneratedConvertor.__name__}',
+                'topics': [topic],
+                'message_type': message_type,
+            })
+
     return convertors
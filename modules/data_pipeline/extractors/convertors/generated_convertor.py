@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+
+"""
+Convertor generated from the introspection of a ROS 2 message type.
+
+(c) 2023 Scintilla. All rights reserved.
+Unauthorized reproduction, distribution, or disclosure of this material is strictly
+prohibited without the express written permission of Scintilla.
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Tuple
+
+import pyarrow as pa
+from rosidl_runtime_py.utilities import get_message
+
+from data_pipeline.extractors.convertors.convertor_interface import ConvertorInterface, columns_to_record_batch
+
+# Arrow types of the ROS 2 primitive types, by their IDL names as returned by
+# get_fields_and_field_types, and by their .msg aliases. A .msg char is an IDL uint8.
+PRIMITIVE_TYPES = {
+    'boolean': pa.bool_(),
+    'bool': pa.bool_(),
+    'octet': pa.binary(),
+    'byte': pa.binary(),
+    'char': pa.string(),
+    'float': pa.float32(),
+    'float32': pa.float32(),
+    'double': pa.float64(),
+    'float64': pa.float64(),
+    'int8': pa.int8(),
+    'uint8': pa.uint8(),
+    'int16': pa.int16(),
+    'uint16': pa.uint16(),
+    'int32': pa.int32(),
+    'uint32': pa.uint32(),
+    'int64': pa.int64(),
+    'uint64': pa.uint64(),
+    'string': pa.string(),
+    'wstring': pa.string(),
+}
+
+# Sequences of these types are stored as a single binary value, read by these
+# expressions: rclpy holds uint8 sequences as array('B') and octet sequences as lists
+# of 1-byte bytes objects
+BINARY_SEQUENCE_EXPRESSIONS = {
+    'uint8': 'bytes({})',
+    'octet': "b''.join({})",
+    'byte': "b''.join({})",
+}
+
+# String fields naming frames are dictionary encoded
+DICTIONARY_FIELDS = {'frame_id', 'child_frame_id'}
+
+SEQUENCE_PATTERN = re.compile(r'sequence<(?P<item>.+?)(?:, ?\d+)?>')
+ARRAY_PATTERN = re.compile(r'(?P<item>.+)\[(?P<size>\d+)\]')
+BOUNDED_STRING_PATTERN = re.compile(r'(?P<item>w?string)<=\d+')
+
+# A column is its name, its Arrow type and the Python expression reading it from `msg`
+Column = Tuple[str, pa.DataType, str]
+
+
+def _message_class(type_name: str) -> Any:
+    """
+    Import the message class of a type name.
+
+    :param type_name: Type name such as 'std_msgs/Header' or 'std_msgs/msg/Header'
+    :return: Message class
+    """
+    package, _, name = type_name.rpartition('/')
+    if '/' not in package:
+        package = f'{package}/msg'
+    return get_message(f'{package}/{name}')
+
+
+def _parse_type(type_string: str) -> Tuple[str, str, int]:
+    """
+    Split a field type string into its kind, item type and fixed size.
+
+    :param type_string: Field type as returned by get_fields_and_field_types
+    :return: Kind ('scalar', 'array' or 'sequence'), item type and size of fixed arrays
+    """
+    match = SEQUENCE_PATTERN.fullmatch(type_string)
+    if match:
+        return 'sequence', match.group('item').strip(), 0
+    match = ARRAY_PATTERN.fullmatch(type_string)
+    if match:
+        return 'array', match.group('item'), int(match.group('size'))
+    return 'scalar', type_string, 0
+
+
+def _item_type(item: str) -> str:
+    """
+    Normalize bounded strings to their unbounded type.
+
+    :param item: Item type of a field
+    :return: Item type without bound
+    """
+    match = BOUNDED_STRING_PATTERN.fullmatch(item)
+    return match.group('item') if match else item
+
+
+def _value(item: str, expression: str, depth: int) -> Tuple[pa.DataType, str]:
+    """
+    Build the Arrow type and reading expression of a single value.
+
+    Nested messages become structs.
+
+    :param item: Item type of the value
+    :param expression: Python expression evaluating to the value
+    :param depth: Nesting depth, used to name comprehension variables
+    :return: Arrow type and Python expression of the value
+    """
+    if item in PRIMITIVE_TYPES:
+        return PRIMITIVE_TYPES[item], expression
+
+    fields = []
+    expressions = []
+    for name, type_string in _message_class(item).get_fields_and_field_types().items():
+        field_type, field_expression = _field(type_string, f'{expression}.{name}', depth + 1)
+        fields.append(pa.field(name, field_type))
+        expressions.append(f'{name!r}: {field_expression}')
+    return pa.struct(fields), '{' + ', '.join(expressions) + '}'
+
+
+def _field(type_string: str, expression: str, depth: int) -> Tuple[pa.DataType, str]:
+    """
+    Build the Arrow type and reading expression of a field kept as one column.
+
+    Fixed-size arrays become fixed_size_list columns, sequences become list columns,
+    except sequences of bytes which become a single binary value.
+
+    :param type_string: Field type as returned by get_fields_and_field_types
+    :param expression: Python expression evaluating to the field
+    :param depth: Nesting depth, used to name comprehension variables
+    :return: Arrow type and Python expression of the field
+    """
+    kind, item, size = _parse_type(type_string)
+    item = _item_type(item)
+
+    if kind == 'scalar':
+        return _value(item, expression, depth)
+
+    if kind == 'sequence' and item in BINARY_SEQUENCE_EXPRESSIONS:
+        return pa.binary(), BINARY_SEQUENCE_EXPRESSIONS[item].format(expression)
+
+    variable = f'item{depth}'
+    item_type, item_expression = _value(item, variable, depth)
+    list_type = pa.list_(item_type, size) if kind == 'array' else pa.list_(item_type)
+    if item_expression == variable:
+        return list_type, f'list({expression})'
+    return list_type, f'[{item_expression} for {variable} in {expression}]'
+
+
+def _flatten(message_class: Any, prefix: str, expression: str, columns: List[Column]) -> None:
+    """
+    Flatten the fields of a message into columns, recursing into nested messages.
+
+    :param message_class: Message class to flatten
+    :param prefix: Column name prefix of the message
+    :param expression: Python expression evaluating to the message
+    :param columns: List the columns are appended to
+    """
+    for name, type_string in message_class.get_fields_and_field_types().items():
+        column_name = f'{prefix}{name}'
+        field_expression = f'{expression}.{name}'
+        kind, item, _ = _parse_type(type_string)
+        item = _item_type(item)
+
+        if kind == 'scalar' and item not in PRIMITIVE_TYPES:
+            _flatten(_message_class(item), f'{column_name}/', field_expression, columns)
+        elif kind == 'scalar' and item == 'string' and name in DICTIONARY_FIELDS:
+            columns.append((column_name, pa.dictionary(pa.int32(), pa.string()), field_expression))
+        else:
+            field_type, field_expression = _field(type_string, field_expression, 0)
+            columns.append((column_name, field_type, field_expression))
+
+
+@lru_cache(maxsize=None)
+def generate_layout(type_name: str) -> Tuple[List[str], pa.Schema, Callable[[Any], Tuple]]:
+    """
+    Generate the flattened columns of a message type, cached per type.
+
+    :param type_name: Type name such as 'sensor_msgs/msg/Imu'
+    :return: Column names, Arrow schema and a compiled function reading one row from a message
+    """
+    columns: List[Column] = []
+    _flatten(_message_class(type_name), '', 'msg', columns)
+
+    header = [name for name, _, _ in columns]
+    schema = pa.schema([pa.field(name, field_type) for name, field_type, _ in columns])
+    source = 'lambda msg: (' + ''.join(f'{expression}, ' for _, _, expression in columns) + ')'
+    accessor = eval(compile(source, f'<convertor {type_name}>', 'eval'), {})
+    return header, schema, accessor
+
+
+class GeneratedConvertor(ConvertorInterface):
+    def __init__(self, config: Dict[str, Any] = None) -> None:
+        """
+        Build a convertor for the message type named by `config['message_type']`.
+
+        :param config: Convertor configuration holding the message type name
+        """
+        super().__init__(config)
+        self.__header, self.__schema, self.__accessor = generate_layout(config['message_type'])
+
+    @property
+    def header(self) -> List[str]:
+        """
+        Return a list of field names for the header.
+
+        :return: List of header field names
+        """
+        return list(self.__header)
+
+    @property
+    def schema(self) -> pa.Schema:
+        """
+        Return the Arrow schema of the converted rows.
+
+        :return: Arrow schema
+        """
+        return self.__schema
+
+    def convert(self, data: Any) -> List:
+        """
+        Convert a message instance to a single-row list.
+
+        :param data: Message instance
+        :return: List containing the converted data
+        """
+        return [list(self.__accessor(data))]
+
+    def convert_batch(self, messages: List[Any]) -> pa.RecordBatch:
+        """
+        Convert a batch of message instances to a record batch.
+
+        :param messages: Message instances
+        :return: Record batch holding the converted rows
+        """
+        rows = [self.__accessor(message) for message in messages]
+        columns = list(zip(*rows)) if rows else [[] for _ in self.__schema]
+        return columns_to_record_batch(columns, self.__schema)
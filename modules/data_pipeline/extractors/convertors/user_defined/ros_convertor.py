@@ -8,10 +8,12 @@ Unauthorized reproduction, distribution, or disclosure of this material is stric
 prohibited without the express written permission of Scintilla.
 """
 
-from data_pipeline.extractors.convertors.convertor_interface import ConvertorInterface
-from typing import Any, Dict, List, Tuple
+from data_pipeline.extractors.convertors.convertor_interface import ConvertorInterface, columns_to_record_batch
+from data_pipeline.extractors.readers.path_reader import PATH_SIZE_COLUMN, PATH_SNAPSHOT_COLUMN
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from copy import deepcopy
 import numpy as np
+import pyarrow as pa
 from cv_bridge import CvBridge
 import open3d as o3d
 from ctypes import *
@@ -31,6 +33,168 @@ from sensor_msgs_py import point_cloud2
 
 from zed_interfaces.msg import PosTrackStatus, DepthInfoStamped, PlaneStamped
 
+# Arrow types of the stamp and frame columns shared by most messages
+FRAME_ID_TYPE = pa.dictionary(pa.int32(), pa.string())
+LEAF_TYPES = {
+    'sec': pa.int32(),
+    'nanosec': pa.uint32(),
+    'frame_id': FRAME_ID_TYPE,
+    'child_frame_id': FRAME_ID_TYPE,
+}
+
+
+def _build_schema(header: List[str], types: Dict[str, pa.DataType] = None) -> pa.Schema:
+    """
+    Build the Arrow schema of a convertor from its header.
+
+    Stamp and frame columns are typed by their last path element, columns listed in
+    `types` get the given type and every other column is float64.
+
+    :param header: Column names of the convertor
+    :param types: Arrow type per column name, overriding the defaults
+    :return: Arrow schema of the converted rows
+    """
+    types = types or {}
+    fields = []
+    for name in header:
+        leaf = name.rsplit('/', 1)[-1]
+        fields.append(pa.field(name, types.get(name, LEAF_TYPES.get(leaf, pa.float64()))))
+    return pa.schema(fields)
+
+
+# Messages between two full snapshots of a path converted in delta mode
+DEFAULT_PATH_SNAPSHOT_MESSAGES = 100
+
+# Arrow types of the geometry held in list columns
+POINT_TYPE = pa.struct([('x', pa.float64()), ('y', pa.float64()), ('z', pa.float64())])
+POINT32_TYPE = pa.struct([('x', pa.float32()), ('y', pa.float32()), ('z', pa.float32())])
+COLOR_TYPE = pa.struct([('r', pa.float32()), ('g', pa.float32()), ('b', pa.float32()), ('a', pa.float32())])
+TRIANGLE_TYPE = pa.list_(pa.uint32(), 3)
+
+
+def _geometry_array(objects: Sequence[Any], names: str, dtype: Any) -> np.ndarray:
+    """
+    Gather the attributes of a sequence of geometry messages into a NumPy array.
+
+    :param objects: Message instances, such as Point or ColorRGBA
+    :param names: Attribute names, or a string of one-character names (e.g. 'xyz')
+    :param dtype: NumPy type of the values
+    :return: Array of shape (len(objects), len(names))
+    """
+    values = np.fromiter(
+        (getattr(obj, name) for obj in objects for name in names), dtype=dtype, count=len(objects) * len(names)
+    )
+    return values.reshape(len(objects), len(names))
+
+
+def _triangle_array(triangles: Sequence[Any]) -> np.ndarray:
+    """
+    Gather the vertex indices of a sequence of MeshTriangle messages into a NumPy array.
+
+    :param triangles: MeshTriangle message instances
+    :return: Array of shape (len(triangles), 3)
+    """
+    values = np.fromiter(
+        (index for triangle in triangles for index in triangle.vertex_indices), dtype=np.uint32, count=len(triangles) * 3
+    )
+    return values.reshape(len(triangles), 3)
+
+
+def _list_array(arrays: Sequence[np.ndarray], item_type: pa.DataType) -> pa.ListArray:
+    """
+    Build a list column holding one NumPy array of items per row.
+
+    Items of struct types take one array column per field, and items of fixed-size
+    list types take every array column as list values.
+
+    :param arrays: Arrays of shape (number of items, item width), one per row
+    :param item_type: Arrow type of the items, a struct or a fixed_size_list
+    :return: List array with one list of items per row
+    """
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int32)
+    np.cumsum([len(array) for array in arrays], out=offsets[1:])
+    width = item_type.num_fields if pa.types.is_struct(item_type) else item_type.list_size
+    values = np.concatenate(arrays) if len(arrays) else np.empty((0, width))
+
+    if pa.types.is_struct(item_type):
+        fields = [item_type.field(index) for index in range(item_type.num_fields)]
+        items = pa.StructArray.from_arrays(
+            [pa.array(values[:, index], type=field.type) for index, field in enumerate(fields)], fields=fields
+        )
+    else:
+        items = pa.FixedSizeListArray.from_arrays(pa.array(values.reshape(-1), type=item_type.value_type), item_type.list_size)
+    return pa.ListArray.from_arrays(pa.array(offsets), items)
+
+
+def _stamp_columns(headers: Sequence[Any]) -> List[List[Any]]:
+    """
+    Extract the sec, nanosec and frame_id columns of a sequence of headers.
+
+    :param headers: std_msgs/Header instances
+    :return: List of three columns
+    """
+    return [
+        [header.stamp.sec for header in headers],
+        [header.stamp.nanosec for header in headers],
+        [header.frame_id for header in headers],
+    ]
+
+
+def _attribute_columns(objects: Sequence[Any], names: Sequence[str]) -> List[List[Any]]:
+    """
+    Extract one column per attribute name from a sequence of messages.
+
+    :param objects: Message instances
+    :param names: Attribute names, or a string of one-character names (e.g. 'xyzw')
+    :return: List of columns, one per attribute
+    """
+    return [[getattr(obj, name) for obj in objects] for name in names]
+
+
+def _array_columns(arrays: Sequence[Sequence[float]], width: int) -> List[np.ndarray]:
+    """
+    Split fixed-size float arrays of a sequence of messages into columns.
+
+    :param arrays: Fixed-size arrays, one per message
+    :param width: Size of the arrays
+    :return: List of `width` columns
+    """
+    return list(np.asarray(arrays, dtype=np.float64).reshape(len(arrays), width).T.copy())
+
+
+# Fields decoded from point clouds, with the packed color last
+POINTCLOUD_FIELDS = ['x', 'y', 'z', 'rgb']
+
+# NumPy pixel type and channel count of the image encodings decoded without a copy
+IMAGE_ENCODINGS = {
+    'bgra8': (np.uint8, 4),
+    'bgr8': (np.uint8, 3),
+    'mono8': (np.uint8, 1),
+    '32FC1': (np.float32, 1),
+    '16UC1': (np.uint16, 1),
+}
+
+# Arrow types of the Image metadata columns
+IMAGE_TYPES = {
+    'height': pa.uint32(),
+    'width': pa.uint32(),
+    'encoding': FRAME_ID_TYPE,
+    'is_bigendian': pa.uint8(),
+    'step': pa.uint32(),
+}
+
+# NumPy equivalents of the PointField datatypes
+POINTFIELD_DTYPES = {
+    PointField.INT8: np.int8,
+    PointField.UINT8: np.uint8,
+    PointField.INT16: np.int16,
+    PointField.UINT16: np.uint16,
+    PointField.INT32: np.int32,
+    PointField.UINT32: np.uint32,
+    PointField.FLOAT32: np.float32,
+    PointField.FLOAT64: np.float64,
+}
+
 class MagneticFieldConvertor(ConvertorInterface):
     def __init__(self, config: Dict[str, Any]=None) -> None:
         super().__init__(config)
@@ -39,6 +203,7 @@ class MagneticFieldConvertor(ConvertorInterface):
                          'magnetic_field_covariance/0', 'magnetic_field_covariance/1', 'magnetic_field_covariance/2',
                          'magnetic_field_covariance/3', 'magnetic_field_covariance/4', 'magnetic_field_covariance/5',
                          'magnetic_field_covariance/6', 'magnetic_field_covariance/7', 'magnetic_field_covariance/8']
+        self.__schema = _build_schema(self.__header)
 
     @property
     def header(self) -> List:
@@ -49,6 +214,15 @@ class MagneticFieldConvertor(ConvertorInterface):
         """
         return deepcopy(self.__header)
 
+    @property
+    def schema(self) -> pa.Schema:
+        """
+        Return the Arrow schema of the converted rows.
+
+        :return: Arrow schema
+        """
+        return self.__schema
+
     def convert(self, data: MagneticField) -> List:
         """
         Convert a MagneticField instance to a single-row list.
@@ -68,6 +242,22 @@ class MagneticFieldConvertor(ConvertorInterface):
         
         return [converted_data]
 
+    def convert_batch(self, messages: List[MagneticField]) -> pa.RecordBatch:
+        """
+        Convert a batch of MagneticField message instances to a record batch.
+
+        :param messages: MagneticField message instances
+        :return: Record batch holding the converted rows
+        """
+        columns = (
+            _stamp_columns([msg.header for msg in messages]) +
+            _attribute_columns([msg.magnetic_field for msg in messages], 'xyz') +
+            _array_columns([msg.magnetic_field_covariance for msg in messages], 9)
+        )
+
+        return columns_to_record_batch(columns, self.__schema)
+
+
 class IMUConvertor(ConvertorInterface):
     def __init__(self, config: Dict[str, Any] = None) -> None:
         super().__init__(config)
@@ -86,6 +276,7 @@ class IMUConvertor(ConvertorInterface):
             "linear_acceleration_covariance/3", "linear_acceleration_covariance/4", "linear_acceleration_covariance/5",
             "linear_acceleration_covariance/6", "linear_acceleration_covariance/7", "linear_acceleration_covariance/8",
         ]
+        self.__schema = _build_schema(self.__header)
 
     @property
     def header(self) -> List[str]:
@@ -96,6 +287,15 @@ class IMUConvertor(ConvertorInterface):
         """
         return deepcopy(self.__header)
 
+    @property
+    def schema(self) -> pa.Schema:
+        """
+        Return the Arrow schema of the converted rows.
+
+        :return: Arrow schema
+        """
+        return self.__schema
+
     def convert(self, data: Imu) -> List:
         """
         Convert an IMU measurement instance to a single-row list.
@@ -132,6 +332,25 @@ class IMUConvertor(ConvertorInterface):
 
         return [converted_data]
 
+    def convert_batch(self, messages: List[Imu]) -> pa.RecordBatch:
+        """
+        Convert a batch of Imu message instances to a record batch.
+
+        :param messages: Imu message instances
+        :return: Record batch holding the converted rows
+        """
+        columns = (
+            _stamp_columns([msg.header for msg in messages]) +
+            _attribute_columns([msg.orientation for msg in messages], 'xyzw') +
+            _array_columns([msg.orientation_covariance for msg in messages], 9) +
+            _attribute_columns([msg.angular_velocity for msg in messages], 'xyz') +
+            _array_columns([msg.angular_velocity_covariance for msg in messages], 9) +
+            _attribute_columns([msg.linear_acceleration for msg in messages], 'xyz') +
+            _array_columns([msg.linear_acceleration_covariance for msg in messages], 9)
+        )
+
+        return columns_to_record_batch(columns, self.__schema)
+
 
 class PoseConvertor(ConvertorInterface):
     def __init__(self, config: Dict[str, Any] = None) -> None:
@@ -141,6 +360,7 @@ class PoseConvertor(ConvertorInterface):
             "pose/position/x", "pose/position/y", "pose/position/z",
             "pose/orientation/x", "pose/orientation/y", "pose/orientation/z", "pose/orientation/w"
         ]
+        self.__schema = _build_schema(self.__header)
 
     @property
     def header(self) -> List[str]:
@@ -151,6 +371,15 @@ class PoseConvertor(ConvertorInterface):
         """
         return deepcopy(self.__header)
 
+    @property
+    def schema(self) -> pa.Schema:
+        """
+        Return the Arrow schema of the converted rows.
+
+        :return: Arrow schema
+        """
+        return self.__schema
+
     def convert(self, data: PoseStamped) -> List:
         """
         Convert a Pose message instance to a single-row list.
@@ -173,7 +402,34 @@ class PoseConvertor(ConvertorInterface):
 
         return [converted_data]
 
+    def convert_batch(self, messages: List[PoseStamped]) -> pa.RecordBatch:
+        """
+        Convert a batch of PoseStamped message instances to a record batch.
+
+        :param messages: PoseStamped message instances
+        :return: Record batch holding the converted rows
+        """
+        columns = (
+            _stamp_columns([msg.header for msg in messages]) +
+            _attribute_columns([msg.pose.position for msg in messages], 'xyz') +
+            _attribute_columns([msg.pose.orientation for msg in messages], 'xyzw')
+        )
+
+        return columns_to_record_batch(columns, self.__schema)
+
+
 class PathConvertor(ConvertorInterface):
+    """
+    Convert Path messages to one row per pose.
+
+    Paths republish their whole trajectory in every message. In delta mode, enabled
+    by the 'delta' key of the configuration, a message only contributes the poses
+    appended since the previous message, along with the size of the path, and every
+    'snapshot_messages' messages, or whenever earlier poses changed, the full path
+    is written again as a snapshot. A snapshot of an empty path is a single row
+    without pose. `load_path` reconstructs the path at any time.
+    """
+
     def __init__(self, config: Dict[str, Any] = None) -> None:
         super().__init__(config)
         self.__header = [
@@ -182,6 +438,14 @@ class PathConvertor(ConvertorInterface):
             "poses/pose/position/x", "poses/pose/position/y", "poses/pose/position/z",
             "poses/pose/orientation/x", "poses/pose/orientation/y", "poses/pose/orientation/z", "poses/pose/orientation/w"
         ]
+        self.delta = bool((config or {}).get('delta', False))
+        self.snapshot_messages = (config or {}).get('snapshot_messages', DEFAULT_PATH_SNAPSHOT_MESSAGES)
+        if self.delta:
+            self.__header += [PATH_SNAPSHOT_COLUMN, PATH_SIZE_COLUMN]
+        self.__schema = _build_schema(self.__header, {PATH_SNAPSHOT_COLUMN: pa.bool_(), PATH_SIZE_COLUMN: pa.uint32()})
+        self._previous: Optional[np.ndarray] = None
+        self._since_snapshot = 0
+        self._row_counts: List[int] = []
 
     @property
     def header(self) -> List[str]:
@@ -192,6 +456,24 @@ class PathConvertor(ConvertorInterface):
         """
         return deepcopy(self.__header)
 
+    @property
+    def schema(self) -> pa.Schema:
+        """
+        Return the Arrow schema of the converted rows.
+
+        :return: Arrow schema
+        """
+        return self.__schema
+
+    @property
+    def stateful(self) -> bool:
+        """
+        Whether the rows of a message depend on the previous messages, true in delta mode.
+
+        :return: True in delta mode
+        """
+        return self.delta
+
     def convert(self, data: Path) -> List:
         """
         Convert a Path message instance to a single-row list.
@@ -204,18 +486,122 @@ class PathConvertor(ConvertorInterface):
 
         header_data = list([data.header.stamp.sec, data.header.stamp.nanosec, data.header.frame_id])
 
+        poses = data.poses
+        delta_data = []
+        if self.delta:
+            start, snapshot = self._new_poses(self._pose_array(poses))
+            poses = poses[start:]
+            delta_data = [snapshot, len(data.poses)]
+
         poses_data = []
-        for pose_stamped in data.poses:
+        for pose_stamped in poses:
             pose_data = self._extract_pose_data(pose_stamped)
-            poses_data.append(header_data + pose_data)
+            poses_data.append(header_data + pose_data + delta_data)
+        if self.delta and snapshot and not poses:
+            poses_data.append(header_data + [None] * 10 + delta_data)
 
         converted_data = poses_data
 
         # Use assert to check the length of converted_data
-        assert len(converted_data[0]) == self.config.get('num_output_columns'), f'Converted data must have a length of {self.config.get("num_output_columns")}.'
+        assert not converted_data or len(converted_data[0]) == self.config.get('num_output_columns'), f'Converted data must have a length of {self.config.get("num_output_columns")}.'
 
         return converted_data
 
+    def convert_batch(self, messages: List[Path]) -> pa.RecordBatch:
+        """
+        Convert a batch of Path message instances to a record batch.
+
+        :param messages: Path message instances
+        :return: Record batch holding the converted rows
+        """
+        if not self.delta:
+            selected = [msg.poses for msg in messages]
+        else:
+            selected = []
+            snapshots = []
+            for msg in messages:
+                start, snapshot = self._new_poses(self._pose_array(msg.poses))
+                # The snapshot of an empty path is a row without pose, so that it records its size
+                selected.append(msg.poses[start:] if msg.poses or not snapshot else [None])
+                snapshots.append(snapshot)
+        self._row_counts = [len(poses) for poses in selected]
+
+        # One row per pose, repeating the header of the path
+        paths = [msg for msg, poses in zip(messages, selected) for _ in poses]
+        poses = [pose for msg_poses in selected for pose in msg_poses]
+        present = [pose for pose in poses if pose is not None]
+        pose_columns = (
+            _stamp_columns([pose.header for pose in present]) +
+            _attribute_columns([pose.pose.position for pose in present], 'xyz') +
+            _attribute_columns([pose.pose.orientation for pose in present], 'xyzw')
+        )
+        if len(present) < len(poses):
+            indices = np.cumsum([pose is not None for pose in poses]) - 1
+            pose_columns = [
+                [column[index] if pose is not None else None for index, pose in zip(indices, poses)]
+                for column in pose_columns
+            ]
+        columns = _stamp_columns([msg.header for msg in paths]) + pose_columns
+        if self.delta:
+            columns += [
+                np.repeat(snapshots, self._row_counts),
+                np.repeat([len(msg.poses) for msg in messages], self._row_counts),
+            ]
+
+        return columns_to_record_batch(columns, self.__schema)
+
+    def row_counts(self, messages: List[Path]) -> List[int]:
+        """
+        Return the number of rows every Path message converts to.
+
+        In delta mode, these are the counts of the batch converted last, which must be `messages`.
+
+        :param messages: Path message instances
+        :return: Number of poses, or of new poses in delta mode, per message
+        """
+        if self.delta:
+            return list(self._row_counts)
+        return [len(msg.poses) for msg in messages]
+
+    def _pose_array(self, poses: Sequence[PoseStamped]) -> np.ndarray:
+        """
+        Gather the stamps, positions and orientations of poses into an array to compare them.
+
+        :param poses: PoseStamped message instances
+        :return: Array of shape (len(poses), 9)
+        """
+        return np.hstack([
+            _geometry_array([pose.header.stamp for pose in poses], ['sec', 'nanosec'], np.float64),
+            _geometry_array([pose.pose.position for pose in poses], 'xyz', np.float64),
+            _geometry_array([pose.pose.orientation for pose in poses], 'xyzw', np.float64),
+        ])
+
+    def _new_poses(self, poses: np.ndarray) -> Tuple[int, bool]:
+        """
+        Find the poses of a path that the previous message did not hold.
+
+        The path continues the previous one when its first poses are the last poses
+        of the previous path, whose oldest poses may have been dropped. Otherwise, or
+        when a snapshot is due, the whole path is new. A path that only lost poses is
+        new as well, as no row would record its size.
+
+        :param poses: Poses of the path, as returned by `_pose_array`
+        :return: Index of the first new pose and whether the rows are a snapshot
+        """
+        previous = self._previous
+        self._previous = poses
+        self._since_snapshot += 1
+        if previous is not None and self._since_snapshot < self.snapshot_messages:
+            if len(poses) >= len(previous) and np.array_equal(poses[:len(previous)], previous):
+                return len(previous), False
+            if len(poses) > 0:
+                for dropped in np.flatnonzero((previous == poses[0]).all(axis=1)):
+                    kept = len(previous) - dropped
+                    if kept < len(poses) and np.array_equal(poses[:kept], previous[dropped:]):
+                        return kept, False
+        self._since_snapshot = 0
+        return 0, True
+
     def _extract_pose_data(self, pose: PoseStamped) -> List:
         """
         Extract and return a list of data from a Pose message.
@@ -257,6 +643,7 @@ class OdometryConvertor(ConvertorInterface):
             "twist/covariance/28", "twist/covariance/29", "twist/covariance/30", "twist/covariance/31",
             "twist/covariance/32", "twist/covariance/33", "twist/covariance/34", "twist/covariance/35",
         ]
+        self.__schema = _build_schema(self.__header)
 
     @property
     def header(self) -> List[str]:
@@ -267,6 +654,15 @@ class OdometryConvertor(ConvertorInterface):
         """
         return deepcopy(self.__header)
 
+    @property
+    def schema(self) -> pa.Schema:
+        """
+        Return the Arrow schema of the converted rows.
+
+        :return: Arrow schema
+        """
+        return self.__schema
+
     def convert(self, data: Odometry) -> List:
         """
         Convert a TransformStamped message instance to a single-row list.
@@ -291,6 +687,26 @@ class OdometryConvertor(ConvertorInterface):
 
         return [converted_data]
 
+    def convert_batch(self, messages: List[Odometry]) -> pa.RecordBatch:
+        """
+        Convert a batch of Odometry message instances to a record batch.
+
+        :param messages: Odometry message instances
+        :return: Record batch holding the converted rows
+        """
+        columns = (
+            _stamp_columns([msg.header for msg in messages]) +
+            [[msg.child_frame_id for msg in messages]] +
+            _attribute_columns([msg.pose.pose.position for msg in messages], 'xyz') +
+            _attribute_columns([msg.pose.pose.orientation for msg in messages], 'xyzw') +
+            _array_columns([msg.pose.covariance for msg in messages], 36) +
+            _attribute_columns([msg.twist.twist.linear for msg in messages], 'xyz') +
+            _attribute_columns([msg.twist.twist.angular for msg in messages], 'xyz') +
+            _array_columns([msg.twist.covariance for msg in messages], 36)
+        )
+
+        return columns_to_record_batch(columns, self.__schema)
+
     def _extract_pose_with_covariance_data(self, pose_with_covariance: PoseWithCovariance) -> List:
         """
         Extract and return a list of data from a PoseWithCovariance message.
@@ -349,6 +765,12 @@ class CameraInfoConvertor(ConvertorInterface):
             "binning_x", "binning_y",
             "roi/x_offset", "roi/y_offset", "roi/height", "roi/width", "roi/do_rectify"
         ]
+        self.__schema = _build_schema(self.__header, {
+            'height': pa.uint32(), 'width': pa.uint32(), 'distortion_model': FRAME_ID_TYPE,
+            'binning_x': pa.uint32(), 'binning_y': pa.uint32(),
+            'roi/x_offset': pa.uint32(), 'roi/y_offset': pa.uint32(), 'roi/height': pa.uint32(), 'roi/width': pa.uint32(),
+            'roi/do_rectify': pa.bool_(),
+        })
 
     @property
     def header(self) -> List[str]:
@@ -359,6 +781,15 @@ class CameraInfoConvertor(ConvertorInterface):
         """
         return deepcopy(self.__header)
 
+    @property
+    def schema(self) -> pa.Schema:
+        """
+        Return the Arrow schema of the converted rows.
+
+        :return: Arrow schema
+        """
+        return self.__schema
+
     def convert(self, data: CameraInfo) -> List:
         """
         Convert a CameraInfo message instance to a single-row list.
@@ -394,6 +825,34 @@ class CameraInfoConvertor(ConvertorInterface):
 
         return [converted_data]
 
+    def convert_batch(self, messages: List[CameraInfo]) -> pa.RecordBatch:
+        """
+        Convert a batch of CameraInfo message instances to a record batch.
+
+        :param messages: CameraInfo message instances
+        :return: Record batch holding the converted rows
+        """
+        distortions = []
+        for msg in messages:
+            assert len(msg.d) < 10, f'We assumed distortion parameters are at most 10.'
+            distortions.append(list(msg.d) + [0.0] * (10 - len(msg.d)))
+
+        rois = [msg.roi for msg in messages]
+        columns = (
+            _stamp_columns([msg.header for msg in messages]) +
+            [[msg.height for msg in messages], [msg.width for msg in messages], [msg.distortion_model for msg in messages]] +
+            _array_columns(distortions, 10) +
+            _array_columns([msg.k for msg in messages], 9) +
+            _array_columns([msg.r for msg in messages], 9) +
+            _array_columns([msg.p for msg in messages], 12) +
+            [[msg.binning_x for msg in messages], [msg.binning_y for msg in messages]] +
+            [[roi.x_offset for roi in rois], [roi.y_offset for roi in rois], [roi.height for roi in rois],
+             [roi.width for roi in rois], [roi.do_rectify for roi in rois]]
+        )
+
+        return columns_to_record_batch(columns, self.__schema)
+
+
 class TransformStampedConvertor(ConvertorInterface):
     def __init__(self, config: Dict[str, Any] = None) -> None:
         super().__init__(config)
@@ -402,6 +861,7 @@ class TransformStampedConvertor(ConvertorInterface):
             "transform/translation/x", "transform/translation/y", "transform/translation/z",
             "transform/rotation/x", "transform/rotation/y", "transform/rotation/z", "transform/rotation/w"
         ]
+        self.__schema = _build_schema(self.__header)
 
     @property
     def header(self) -> List[str]:
@@ -412,6 +872,15 @@ class TransformStampedConvertor(ConvertorInterface):
         """
         return deepcopy(self.__header)
 
+    @property
+    def schema(self) -> pa.Schema:
+        """
+        Return the Arrow schema of the converted rows.
+
+        :return: Arrow schema
+        """
+        return self.__schema
+
     def convert(self, data: TransformStamped) -> List:
         """
         Convert a TransformStamped message instance to a single-row list.
@@ -436,11 +905,28 @@ class TransformStampedConvertor(ConvertorInterface):
 
         return [converted_data]
 
+    def convert_batch(self, messages: List[TransformStamped]) -> pa.RecordBatch:
+        """
+        Convert a batch of TransformStamped message instances to a record batch.
+
+        :param messages: TransformStamped message instances
+        :return: Record batch holding the converted rows
+        """
+        columns = (
+            _stamp_columns([msg.header for msg in messages]) +
+            [[msg.child_frame_id for msg in messages]] +
+            _attribute_columns([msg.transform.translation for msg in messages], 'xyz') +
+            _attribute_columns([msg.transform.rotation for msg in messages], 'xyzw')
+        )
+
+        return columns_to_record_batch(columns, self.__schema)
+
 
 class PosTrackStatusConvertor(ConvertorInterface):
     def __init__(self, config: Dict[str, Any] = None) -> None:
         super().__init__(config)
         self.__header = ["status"]
+        self.__schema = _build_schema(self.__header, {'status': pa.uint8()})
 
     @property
     def header(self) -> List[str]:
@@ -451,6 +937,15 @@ class PosTrackStatusConvertor(ConvertorInterface):
         """
         return deepcopy(self.__header)
 
+    @property
+    def schema(self) -> pa.Schema:
+        """
+        Return the Arrow schema of the converted rows.
+
+        :return: Arrow schema
+        """
+        return self.__schema
+
     def convert(self, data: PosTrackStatus) -> List:
         """
         Convert a PosTrackStatus message instance to a single-row list.
@@ -470,6 +965,17 @@ class PosTrackStatusConvertor(ConvertorInterface):
 
         return [converted_data]
 
+    def convert_batch(self, messages: List[PosTrackStatus]) -> pa.RecordBatch:
+        """
+        Convert a batch of PosTrackStatus message instances to a record batch.
+
+        :param messages: PosTrackStatus message instances
+        :return: Record batch holding the converted rows
+        """
+        columns = [[msg.status for msg in messages]]
+
+        return columns_to_record_batch(columns, self.__schema)
+
 
 class MarkerConvertor(ConvertorInterface):
     def __init__(self, config: Dict[str, Any] = None) -> None:
@@ -487,9 +993,14 @@ class MarkerConvertor(ConvertorInterface):
             "colors",
             "text",
             "mesh_resource",
-            "mesh_use_embedded_materials",
-            "points_colors"
+            "mesh_use_embedded_materials"
         ]
+        self.__schema = _build_schema(self.__header, {
+            'ns': FRAME_ID_TYPE, 'id': pa.int32(), 'type': pa.int32(), 'action': pa.int32(),
+            'color/r': pa.float32(), 'color/g': pa.float32(), 'color/b': pa.float32(), 'color/a': pa.float32(),
+            'frame_locked': pa.bool_(), 'points': pa.list_(POINT_TYPE), 'colors': pa.list_(COLOR_TYPE), 'text': pa.string(),
+            'mesh_resource': pa.string(), 'mesh_use_embedded_materials': pa.bool_(),
+        })
 
     @property
     def header(self) -> List[str]:
@@ -500,6 +1011,15 @@ class MarkerConvertor(ConvertorInterface):
         """
         return deepcopy(self.__header)
 
+    @property
+    def schema(self) -> pa.Schema:
+        """
+        Return the Arrow schema of the converted rows.
+
+        :return: Arrow schema
+        """
+        return self.__schema
+
     def convert(self, data: Marker) -> List:
         """
         Convert a Marker message instance to a single-row list.
@@ -526,15 +1046,9 @@ class MarkerConvertor(ConvertorInterface):
 
         lifetime_data = [data.lifetime.sec, data.lifetime.nanosec]
 
-        points = ""
-        for point in data.points:
-            # Store points as strings in a single column
-            points = points + f'{point.x},{point.y},{point.z};'
+        points = [{'x': point.x, 'y': point.y, 'z': point.z} for point in data.points]
 
-        colors = ""
-        for color in data.colors:
-            # Store colors as strings in a single column
-            colors = colors + f'{color.r},{color.g},{color.b},{color.a};'
+        colors = [{'r': color.r, 'g': color.g, 'b': color.b, 'a': color.a} for color in data.colors]
 
         text_data = [data.text] if data.text else [""]
 
@@ -561,6 +1075,30 @@ class MarkerConvertor(ConvertorInterface):
 
         return [converted_data]
 
+    def convert_batch(self, messages: List[Marker]) -> pa.RecordBatch:
+        """
+        Convert a batch of Marker message instances to a record batch.
+
+        :param messages: Marker message instances
+        :return: Record batch holding the converted rows
+        """
+        columns = (
+            _stamp_columns([msg.header for msg in messages]) +
+            _attribute_columns(messages, ['ns', 'id', 'type', 'action']) +
+            _attribute_columns([msg.pose.position for msg in messages], 'xyz') +
+            _attribute_columns([msg.pose.orientation for msg in messages], 'xyzw') +
+            _attribute_columns([msg.scale for msg in messages], 'xyz') +
+            _attribute_columns([msg.color for msg in messages], 'rgba') +
+            [[msg.lifetime.sec for msg in messages], [msg.lifetime.nanosec for msg in messages]] +
+            [[msg.frame_locked for msg in messages]] +
+            [_list_array([_geometry_array(msg.points, 'xyz', np.float64) for msg in messages], POINT_TYPE)] +
+            [_list_array([_geometry_array(msg.colors, 'rgba', np.float32) for msg in messages], COLOR_TYPE)] +
+            _attribute_columns(messages, ['text', 'mesh_resource', 'mesh_use_embedded_materials'])
+        )
+
+        return columns_to_record_batch(columns, self.__schema)
+
+
 class TFMessageConvertor(ConvertorInterface):
     def __init__(self, config: Dict[str, Any] = None) -> None:
         super().__init__(config)
@@ -570,6 +1108,7 @@ class TFMessageConvertor(ConvertorInterface):
             "transforms/transform/translation/x", "transform/translation/y", "transforms/transform/translation/z",
             "transforms/transform/rotation/x", "transforms/transform/rotation/y", "transforms/transform/rotation/z", "transforms/transform/rotation/w"
         ]
+        self.__schema = _build_schema(self.__header)
 
     @property
     def header(self) -> List[str]:
@@ -580,6 +1119,15 @@ class TFMessageConvertor(ConvertorInterface):
         """
         return deepcopy(self.__header)
 
+    @property
+    def schema(self) -> pa.Schema:
+        """
+        Return the Arrow schema of the converted rows.
+
+        :return: Arrow schema
+        """
+        return self.__schema
+
     def convert(self, data: TFMessage) -> List:
         """
         Convert a TFMessage message instance to a list of rows.
@@ -600,11 +1148,39 @@ class TFMessageConvertor(ConvertorInterface):
 
         return converted_data
 
+    def convert_batch(self, messages: List[TFMessage]) -> pa.RecordBatch:
+        """
+        Convert a batch of TFMessage message instances to a record batch.
+
+        :param messages: TFMessage message instances
+        :return: Record batch holding the converted rows
+        """
+        # One row per transform
+        transforms = [transform for msg in messages for transform in msg.transforms]
+        columns = (
+            _stamp_columns([transform.header for transform in transforms]) +
+            [[transform.child_frame_id for transform in transforms]] +
+            _attribute_columns([transform.transform.translation for transform in transforms], 'xyz') +
+            _attribute_columns([transform.transform.rotation for transform in transforms], 'xyzw')
+        )
+
+        return columns_to_record_batch(columns, self.__schema)
+
+    def row_counts(self, messages: List[TFMessage]) -> List[int]:
+        """
+        Return the number of rows every TFMessage message converts to.
+
+        :param messages: TFMessage message instances
+        :return: Number of transforms per message
+        """
+        return [len(msg.transforms) for msg in messages]
+
 
 class DepthInfoStampedConvertor(ConvertorInterface):
     def __init__(self, config: Dict[str, Any] = None) -> None:
         super().__init__(config)
         self.__header = ["header/sec", "header/nanosec", "header/frame_id", "min_depth", "max_depth"]
+        self.__schema = _build_schema(self.__header, {'min_depth': pa.float32(), 'max_depth': pa.float32()})
 
     @property
     def header(self) -> List[str]:
@@ -615,6 +1191,15 @@ class DepthInfoStampedConvertor(ConvertorInterface):
         """
         return deepcopy(self.__header)
 
+    @property
+    def schema(self) -> pa.Schema:
+        """
+        Return the Arrow schema of the converted rows.
+
+        :return: Arrow schema
+        """
+        return self.__schema
+
     def convert(self, data: DepthInfoStamped) -> List:
         """
         Convert a DepthInfoStamped message instance to a single-row list.
@@ -638,11 +1223,26 @@ class DepthInfoStampedConvertor(ConvertorInterface):
 
         return [header_data]
 
+    def convert_batch(self, messages: List[DepthInfoStamped]) -> pa.RecordBatch:
+        """
+        Convert a batch of DepthInfoStamped message instances to a record batch.
+
+        :param messages: DepthInfoStamped message instances
+        :return: Record batch holding the converted rows
+        """
+        columns = (
+            _stamp_columns([msg.header for msg in messages]) +
+            _attribute_columns(messages, ['min_depth', 'max_depth'])
+        )
+
+        return columns_to_record_batch(columns, self.__schema)
+
 
 class FluidPressureConvertor(ConvertorInterface):
     def __init__(self, config: Dict[str, Any] = None) -> None:
         super().__init__(config)
         self.__header = ["header/sec", "header/nanosec", "header/frame_id", "fluid_pressure", "variance"]
+        self.__schema = _build_schema(self.__header)
 
     @property
     def header(self) -> List[str]:
@@ -653,6 +1253,15 @@ class FluidPressureConvertor(ConvertorInterface):
         """
         return deepcopy(self.__header)
 
+    @property
+    def schema(self) -> pa.Schema:
+        """
+        Return the Arrow schema of the converted rows.
+
+        :return: Arrow schema
+        """
+        return self.__schema
+
     def convert(self, data: FluidPressure) -> List:
         """
         Convert a FluidPressure message instance to a single-row list.
@@ -676,6 +1285,20 @@ class FluidPressureConvertor(ConvertorInterface):
 
         return [header_data]
 
+    def convert_batch(self, messages: List[FluidPressure]) -> pa.RecordBatch:
+        """
+        Convert a batch of FluidPressure message instances to a record batch.
+
+        :param messages: FluidPressure message instances
+        :return: Record batch holding the converted rows
+        """
+        columns = (
+            _stamp_columns([msg.header for msg in messages]) +
+            _attribute_columns(messages, ['fluid_pressure', 'variance'])
+        )
+
+        return columns_to_record_batch(columns, self.__schema)
+
 
 class PoseWithCovarianceStampedConvertor(ConvertorInterface):
     def __init__(self, config: Dict[str, Any] = None) -> None:
@@ -691,6 +1314,7 @@ class PoseWithCovarianceStampedConvertor(ConvertorInterface):
             "covariance/24", "covariance/25", "covariance/26", "covariance/27", "covariance/28", "covariance/29",
             "covariance/30", "covariance/31", "covariance/32", "covariance/33", "covariance/34", "covariance/35"
         ]
+        self.__schema = _build_schema(self.__header)
 
     @property
     def header(self) -> List[str]:
@@ -701,6 +1325,15 @@ class PoseWithCovarianceStampedConvertor(ConvertorInterface):
         """
         return deepcopy(self.__header)
 
+    @property
+    def schema(self) -> pa.Schema:
+        """
+        Return the Arrow schema of the converted rows.
+
+        :return: Arrow schema
+        """
+        return self.__schema
+
     def convert(self, data: PoseWithCovarianceStamped) -> List:
         """
         Convert a PoseWithCovarianceStamped message instance to a single-row list.
@@ -737,11 +1370,28 @@ class PoseWithCovarianceStampedConvertor(ConvertorInterface):
 
         return [converted_data]
 
+    def convert_batch(self, messages: List[PoseWithCovarianceStamped]) -> pa.RecordBatch:
+        """
+        Convert a batch of PoseWithCovarianceStamped message instances to a record batch.
+
+        :param messages: PoseWithCovarianceStamped message instances
+        :return: Record batch holding the converted rows
+        """
+        columns = (
+            _stamp_columns([msg.header for msg in messages]) +
+            _attribute_columns([msg.pose.pose.position for msg in messages], 'xyz') +
+            _attribute_columns([msg.pose.pose.orientation for msg in messages], 'xyzw') +
+            _array_columns([msg.pose.covariance for msg in messages], 36)
+        )
+
+        return columns_to_record_batch(columns, self.__schema)
+
 
 class TemperatureConvertor(ConvertorInterface):
     def __init__(self, config: Dict[str, Any] = None) -> None:
         super().__init__(config)
         self.__header = ["header/sec", "header/nanosec", "header/frame_id", "temperature", "variance"]
+        self.__schema = _build_schema(self.__header)
 
     @property
     def header(self) -> List[str]:
@@ -752,6 +1402,15 @@ class TemperatureConvertor(ConvertorInterface):
         """
         return deepcopy(self.__header)
 
+    @property
+    def schema(self) -> pa.Schema:
+        """
+        Return the Arrow schema of the converted rows.
+
+        :return: Arrow schema
+        """
+        return self.__schema
+
     def convert(self, data: Temperature) -> List:
         """
         Convert a Temperature message instance to a single-row list.
@@ -775,6 +1434,20 @@ class TemperatureConvertor(ConvertorInterface):
 
         return [header_data]
 
+    def convert_batch(self, messages: List[Temperature]) -> pa.RecordBatch:
+        """
+        Convert a batch of Temperature message instances to a record batch.
+
+        :param messages: Temperature message instances
+        :return: Record batch holding the converted rows
+        """
+        columns = (
+            _stamp_columns([msg.header for msg in messages]) +
+            _attribute_columns(messages, ['temperature', 'variance'])
+        )
+
+        return columns_to_record_batch(columns, self.__schema)
+
 
 class DiagnosticArrayConvertor(ConvertorInterface):
     def __init__(self, config: Dict[str, Any] = None) -> None:
@@ -783,6 +1456,10 @@ class DiagnosticArrayConvertor(ConvertorInterface):
         self.__status = [
             "status/values/key", "status/values/value"
         ]
+        self.__schema = _build_schema(self.__header + self.__status, {
+            'status/level': pa.binary(), 'status/name': pa.string(), 'status/message': pa.string(),
+            'status/hardware_id': pa.string(), 'status/values/key': pa.string(), 'status/values/value': pa.string(),
+        })
 
     @property
     def header(self) -> List[str]:
@@ -793,6 +1470,15 @@ class DiagnosticArrayConvertor(ConvertorInterface):
         """
         return deepcopy(self.__header + self.__status)
 
+    @property
+    def schema(self) -> pa.Schema:
+        """
+        Return the Arrow schema of the converted rows.
+
+        :return: Arrow schema
+        """
+        return self.__schema
+
     def convert(self, data: Any) -> List:
         """
         Convert a DiagnosticArray message instance to a single-row list.
@@ -824,10 +1510,38 @@ class DiagnosticArrayConvertor(ConvertorInterface):
 
         return converted_data
 
+    def convert_batch(self, messages: List[DiagnosticArray]) -> pa.RecordBatch:
+        """
+        Convert a batch of DiagnosticArray message instances to a record batch.
+
+        :param messages: DiagnosticArray message instances
+        :return: Record batch holding the converted rows
+        """
+        # One row per key/value pair of every status
+        rows = [(msg, status, value) for msg in messages for status in msg.status for value in status.values]
+        columns = (
+            _stamp_columns([msg.header for msg, _, _ in rows]) +
+            _attribute_columns([status for _, status, _ in rows], ['level', 'name', 'message', 'hardware_id']) +
+            _attribute_columns([value for _, _, value in rows], ['key', 'value'])
+        )
+
+        return columns_to_record_batch(columns, self.__schema)
+
+    def row_counts(self, messages: List[DiagnosticArray]) -> List[int]:
+        """
+        Return the number of rows every DiagnosticArray message converts to.
+
+        :param messages: DiagnosticArray message instances
+        :return: Number of key/value pairs over the statuses of every message
+        """
+        return [sum(len(status.values) for status in msg.status) for msg in messages]
+
+
 class StringConvertor(ConvertorInterface):
     def __init__(self, config: Dict[str, Any] = None) -> None:
         super().__init__(config)
         self.__header = ["data"]
+        self.__schema = _build_schema(self.__header, {'data': pa.string()})
 
     @property
     def header(self) -> List[str]:
@@ -838,6 +1552,15 @@ class StringConvertor(ConvertorInterface):
         """
         return deepcopy(self.__header)
 
+    @property
+    def schema(self) -> pa.Schema:
+        """
+        Return the Arrow schema of the converted rows.
+
+        :return: Arrow schema
+        """
+        return self.__schema
+
     def convert(self, data: String) -> List:
         """
         Convert a String message instance to a single-row list.
@@ -857,11 +1580,26 @@ class StringConvertor(ConvertorInterface):
 
         return [header_data]
 
+    def convert_batch(self, messages: List[String]) -> pa.RecordBatch:
+        """
+        Convert a batch of String message instances to a record batch.
+
+        :param messages: String message instances
+        :return: Record batch holding the converted rows
+        """
+        columns = [[msg.data for msg in messages]]
+
+        return columns_to_record_batch(columns, self.__schema)
+
 
 class LogConvertor(ConvertorInterface):
     def __init__(self, config: Dict[str, Any] = None) -> None:
         super().__init__(config)
         self.__header = ["stamp/sec", "stamp/nanosec", "level", "name", "msg", "file", "function", "line"]
+        self.__schema = _build_schema(self.__header, {
+            'level': pa.uint8(), 'name': pa.string(), 'msg': pa.string(), 'file': pa.string(),
+            'function': pa.string(), 'line': pa.uint32(),
+        })
 
     @property
     def header(self) -> List[str]:
@@ -872,6 +1610,15 @@ class LogConvertor(ConvertorInterface):
         """
         return deepcopy(self.__header)
 
+    @property
+    def schema(self) -> pa.Schema:
+        """
+        Return the Arrow schema of the converted rows.
+
+        :return: Arrow schema
+        """
+        return self.__schema
+
     def convert(self, data: Log) -> List:
         """
         Convert a Log message instance to a single-row list.
@@ -898,6 +1645,20 @@ class LogConvertor(ConvertorInterface):
 
         return [header_data]
 
+    def convert_batch(self, messages: List[Log]) -> pa.RecordBatch:
+        """
+        Convert a batch of Log message instances to a record batch.
+
+        :param messages: Log message instances
+        :return: Record batch holding the converted rows
+        """
+        columns = (
+            [[msg.stamp.sec for msg in messages], [msg.stamp.nanosec for msg in messages]] +
+            _attribute_columns(messages, ['level', 'name', 'msg', 'file', 'function', 'line'])
+        )
+
+        return columns_to_record_batch(columns, self.__schema)
+
 
 class PlaneStampedConvertor(ConvertorInterface):
     def __init__(self, config: Dict[str, Any] = None) -> None:
@@ -913,6 +1674,12 @@ class PlaneStampedConvertor(ConvertorInterface):
             "extents/0", "extents/1",
             "bounds/points"
         ]
+        self.__schema = _build_schema(self.__header, {
+            'mesh/triangles': pa.list_(TRIANGLE_TYPE), 'mesh/vertices': pa.list_(POINT_TYPE),
+            'normal/x': pa.float32(), 'normal/y': pa.float32(), 'normal/z': pa.float32(),
+            'center/x': pa.float32(), 'center/y': pa.float32(), 'center/z': pa.float32(),
+            'extents/0': pa.float32(), 'extents/1': pa.float32(), 'bounds/points': pa.list_(POINT32_TYPE),
+        })
 
     @property
     def header(self) -> List[str]:
@@ -923,6 +1690,15 @@ class PlaneStampedConvertor(ConvertorInterface):
         """
         return deepcopy(self.__header)
 
+    @property
+    def schema(self) -> pa.Schema:
+        """
+        Return the Arrow schema of the converted rows.
+
+        :return: Arrow schema
+        """
+        return self.__schema
+
     def convert(self, data: PlaneStamped) -> List:
         """
         Convert a PlaneStamped message instance to a single-row list.
@@ -963,38 +1739,50 @@ class PlaneStampedConvertor(ConvertorInterface):
 
         return [converted_data]
 
+    def convert_batch(self, messages: List[PlaneStamped]) -> pa.RecordBatch:
+        """
+        Convert a batch of PlaneStamped message instances to a record batch.
+
+        :param messages: PlaneStamped message instances
+        :return: Record batch holding the converted rows
+        """
+        columns = (
+            _stamp_columns([msg.header for msg in messages]) +
+            [_list_array([_triangle_array(msg.mesh.triangles) for msg in messages], TRIANGLE_TYPE)] +
+            [_list_array([_geometry_array(msg.mesh.vertices, 'xyz', np.float64) for msg in messages], POINT_TYPE)] +
+            _array_columns([msg.coefficients.coef for msg in messages], 4) +
+            _attribute_columns([msg.normal for msg in messages], 'xyz') +
+            _attribute_columns([msg.center for msg in messages], 'xyz') +
+            _attribute_columns([msg.pose.translation for msg in messages], 'xyz') +
+            _attribute_columns([msg.pose.rotation for msg in messages], 'xyzw') +
+            _array_columns([msg.extents for msg in messages], 2) +
+            [_list_array([_geometry_array(msg.bounds.points, 'xyz', np.float32) for msg in messages], POINT32_TYPE)]
+        )
+
+        return columns_to_record_batch(columns, self.__schema)
+
     def _extract_mesh_data(self, mesh: Mesh) -> List:
         """
         Extract and return a list of data from a Mesh message.
 
         :param mesh: Mesh message instance
-        :return: List containing the extracted mesh data
+        :return: List containing the triangles, as vertex index triplets, and the vertices of the mesh
         """
-        triangles_data = []
-        vertices_data = []
-
-        # Extract triangles and vertices data
-        for triangle in mesh.triangles:
-            triangles_data.append(f"{triangle.vertex_indices[0]},{triangle.vertex_indices[1]},{triangle.vertex_indices[2]}")
-        for vertex in mesh.vertices:
-            vertices_data.append(f"{vertex.x},{vertex.y},{vertex.z}")
+        triangles_data = _triangle_array(mesh.triangles).tolist()
+        vertices_data = [{'x': vertex.x, 'y': vertex.y, 'z': vertex.z} for vertex in mesh.vertices]
 
-        return [",".join(triangles_data), ",".join(vertices_data)]
+        return [triangles_data, vertices_data]
 
     def _extract_polygon_data(self, polygon: Polygon) -> List:
         """
         Extract and return a list of data from a Polygon message.
 
         :param polygon: Polygon message instance
-        :return: List containing the extracted polygon data
+        :return: List containing the points of the polygon
         """
-        points_data = []
+        points_data = [{'x': point.x, 'y': point.y, 'z': point.z} for point in polygon.points]
 
-        # Extract points data
-        for point in polygon.points:
-            points_data.append(f"{point.x},{point.y},{point.z}")
-
-        return [",".join(points_data)]
+        return [points_data]
 
 
 class ImageConvertor(ConvertorInterface):
@@ -1004,6 +1792,10 @@ class ImageConvertor(ConvertorInterface):
             "header/sec", "header/nanosec", "header/frame_id",
             "height", "width", "encoding", "is_bigendian", "step"
         ]
+        self.__schema = _build_schema(self.__header, IMAGE_TYPES)
+
+        # Created on first use, only for encodings without a zero-copy decoder
+        self._bridge = None
 
     @property
     def header(self) -> List[str]:
@@ -1014,11 +1806,21 @@ class ImageConvertor(ConvertorInterface):
         """
         return deepcopy(self.__header)
 
-    def convert(self, data: Image) -> Tuple[List, np.ndarray]:
+    @property
+    def schema(self) -> pa.Schema:
+        """
+        Return the Arrow schema of the converted rows.
+
+        :return: Arrow schema
+        """
+        return self.__schema
+
+    def convert(self, data: Image, payload: Optional[memoryview] = None) -> Tuple[List, np.ndarray]:
         """
         Convert a ROS2 Image message instance to a tuple with metadata and image.
 
         :param data: ROS2 Image message instance
+        :param payload: Pixel buffer to decode instead of `data.data`, e.g. a shared memory slot
         :return: Tuple containing metadata list and image
         """
         # Use assert to check the type of data
@@ -1036,9 +1838,8 @@ class ImageConvertor(ConvertorInterface):
             data.step
         ]
 
-        # Convert ROS Image to OpenCV Mat using cv_bridge
-        bridge = CvBridge()
-        cv_image = bridge.imgmsg_to_cv2(data)
+        # Convert ROS Image to an OpenCV compatible array
+        cv_image = self._decode_image(data, payload)
 
         # Combine metadata and image
         result_tuple = ([header_data], cv_image)
@@ -1048,6 +1849,57 @@ class ImageConvertor(ConvertorInterface):
         return result_tuple
 
 
+    def convert_batch(self, messages: List[Image]) -> pa.RecordBatch:
+        """
+        Convert a batch of Image message instances to a record batch (pixels are not included).
+
+        :param messages: Image message instances
+        :return: Record batch holding the converted rows
+        """
+        columns = (
+            _stamp_columns([msg.header for msg in messages]) +
+            _attribute_columns(messages, ['height', 'width', 'encoding', 'is_bigendian', 'step'])
+        )
+
+        return columns_to_record_batch(columns, self.__schema)
+
+    def _decode_image(self, data: Image, payload: Optional[memoryview] = None) -> np.ndarray:
+        """
+        Decode the pixels of an Image message as a view on its data buffer.
+
+        Common encodings are mapped directly to a NumPy view honoring the row step,
+        so no copy is made. Other encodings go through a cached CvBridge.
+
+        :param data: ROS2 Image message instance
+        :param payload: Pixel buffer to decode instead of `data.data`
+        :return: Image array of shape (height, width) or (height, width, channels)
+        """
+        if data.encoding not in IMAGE_ENCODINGS:
+            if self._bridge is None:
+                self._bridge = CvBridge()
+            if payload is not None:
+                data.data = bytes(payload)
+            return self._bridge.imgmsg_to_cv2(data)
+
+        pixel_type, channels = IMAGE_ENCODINGS[data.encoding]
+        dtype = np.dtype(pixel_type).newbyteorder('>' if data.is_bigendian else '<')
+
+        # Rows may be padded, so map full rows of `step` bytes and crop to the width
+        buffer = data.data if payload is None else payload
+        row = np.frombuffer(buffer, dtype=np.uint8, count=data.height * data.step)
+        image = row.reshape(data.height, data.step)[:, :data.width * channels * dtype.itemsize]
+        image = image.view(dtype)
+
+        if channels > 1:
+            image = image.reshape(data.height, data.width, channels)
+
+        # OpenCV only understands native byte order, swap in the rare mismatching case
+        if not dtype.isnative:
+            image = image.astype(dtype.newbyteorder('='))
+
+        return image
+
+
 class DisparityImageConvertor(ConvertorInterface):
     def __init__(self, config: Dict[str, Any] = None) -> None:
         super().__init__(config)
@@ -1059,6 +1911,13 @@ class DisparityImageConvertor(ConvertorInterface):
             "image/header/sec", "image/header/nanosec", "image/header/frame_id",
             "image/height", "image/width", "image/encoding", "image/is_bigendian", "image/step" 
         ]
+        self.__schema = _build_schema(self.__header, {
+            'f': pa.float32(), 't': pa.float32(),
+            'valid_window/x_offset': pa.uint32(), 'valid_window/y_offset': pa.uint32(),
+            'valid_window/height': pa.uint32(), 'valid_window/width': pa.uint32(), 'valid_windiw/do_rectify': pa.bool_(),
+            'min_disparity': pa.float32(), 'max_disparity': pa.float32(), 'delta_d': pa.float32(),
+            **{f'image/{name}': image_type for name, image_type in IMAGE_TYPES.items()},
+        })
 
         # ImageConvertor to convert the image part of DisparityImage
         image_config = deepcopy(config)
@@ -1074,11 +1933,21 @@ class DisparityImageConvertor(ConvertorInterface):
         """
         return deepcopy(self.__header)
 
-    def convert(self, data: Any) -> Tuple[List, np.ndarray]:
+    @property
+    def schema(self) -> pa.Schema:
+        """
+        Return the Arrow schema of the converted rows.
+
+        :return: Arrow schema
+        """
+        return self.__schema
+
+    def convert(self, data: Any, payload: Optional[memoryview] = None) -> Tuple[List, np.ndarray]:
         """
         Convert a DisparityImage message instance to a list.
 
         :param data: DisparityImage message instance
+        :param payload: Pixel buffer to decode instead of `data.image.data`, e.g. a shared memory slot
         :return: List containing the converted data
         """
         # Use assert to check the type of data
@@ -1102,7 +1971,7 @@ class DisparityImageConvertor(ConvertorInterface):
         ]
 
         # Convert the image part of DisparityImage using ImageConvertor
-        image_data = self.image_convertor.convert(data.image)
+        image_data = self.image_convertor.convert(data.image, payload)
         header_data.extend(image_data[0][0])
 
         # Combine metadata and image data
@@ -1113,6 +1982,28 @@ class DisparityImageConvertor(ConvertorInterface):
 
         return result_list
 
+    def convert_batch(self, messages: List[DisparityImage]) -> pa.RecordBatch:
+        """
+        Convert a batch of DisparityImage message instances to a record batch (pixels are not included).
+
+        :param messages: DisparityImage message instances
+        :return: Record batch holding the converted rows
+        """
+        windows = [msg.valid_window for msg in messages]
+        images = [msg.image for msg in messages]
+        columns = (
+            _stamp_columns([msg.header for msg in messages]) +
+            _attribute_columns(messages, ['f', 't']) +
+            [[window.x_offset for window in windows], [window.y_offset for window in windows],
+             [window.height for window in windows], [window.width for window in windows],
+             [window.do_rectify for window in windows]] +
+            _attribute_columns(messages, ['min_disparity', 'max_disparity', 'delta_d']) +
+            _stamp_columns([image.header for image in images]) +
+            _attribute_columns(images, ['height', 'width', 'encoding', 'is_bigendian', 'step'])
+        )
+
+        return columns_to_record_batch(columns, self.__schema)
+
 
 class PointCloudConvertor(ConvertorInterface):
     def __init__(self, config: Dict[str, Any] = None):
@@ -1121,6 +2012,7 @@ class PointCloudConvertor(ConvertorInterface):
             "header/sec", "header/nanosec", "header/frame_id",
             "height", "width", "is_dense"
         ]
+        self.__schema = _build_schema(self.__header, {'height': pa.uint32(), 'width': pa.uint32(), 'is_dense': pa.bool_()})
 
         # Color conversion lambdas
         self._convert_rgb_uint32_to_tuple = lambda rgb_uint32: (
@@ -1134,7 +2026,23 @@ class PointCloudConvertor(ConvertorInterface):
     def header(self) -> List[str]:
         return deepcopy(self.__header)
 
-    def convert(self, data: Any) -> Tuple[List, Any]:
+    @property
+    def schema(self) -> pa.Schema:
+        """
+        Return the Arrow schema of the converted rows.
+
+        :return: Arrow schema
+        """
+        return self.__schema
+
+    def convert(self, data: Any, payload: Optional[memoryview] = None) -> Tuple[List, Any]:
+        """
+        Convert a PointCloud2 message instance to a tuple with metadata and Open3D cloud.
+
+        :param data: PointCloud2 message instance
+        :param payload: Point buffer to decode instead of `data.data`, e.g. a shared memory slot
+        :return: Tuple containing metadata list and Open3D point cloud
+        """
         assert isinstance(data, PointCloud2), "Input data must be of type PointCloud2."
 
         header_data = [
@@ -1146,16 +2054,128 @@ class PointCloudConvertor(ConvertorInterface):
             data.is_dense
         ]
 
-        o3d_cloud = self._convert_ros_pointcloud_to_o3d(data)
+        o3d_cloud = self._convert_ros_pointcloud_to_o3d(data, payload)
 
         return ([header_data], o3d_cloud)
 
-    def _convert_ros_pointcloud_to_o3d(self, ros_cloud: PointCloud2) -> o3d.geometry.PointCloud:
+    def convert_batch(self, messages: List[PointCloud2]) -> pa.RecordBatch:
+        """
+        Convert a batch of PointCloud2 message instances to a record batch (points are not included).
+
+        :param messages: PointCloud2 message instances
+        :return: Record batch holding the converted rows
+        """
+        columns = (
+            _stamp_columns([msg.header for msg in messages]) +
+            _attribute_columns(messages, ['height', 'width', 'is_dense'])
+        )
+
+        return columns_to_record_batch(columns, self.__schema)
+
+    def _convert_ros_pointcloud_to_o3d(self, ros_cloud: PointCloud2, payload: Optional[memoryview] = None) -> o3d.geometry.PointCloud:
+        """
+        Convert a PointCloud2 message to an Open3D point cloud.
+
+        Uses the vectorized decoder when the field layout allows it and falls back to
+        the point-by-point reader otherwise.
+
+        :param ros_cloud: PointCloud2 message instance
+        :param payload: Point buffer to decode instead of `ros_cloud.data`
+        :return: Open3D point cloud with points and colors
+        """
+        cloud_dtype = self._pointcloud_dtype(ros_cloud)
+        if cloud_dtype is None:
+            if payload is not None:
+                ros_cloud.data = bytes(payload)
+            return self._convert_ros_pointcloud_to_o3d_fallback(ros_cloud)
+
+        points, colors = self._decode_pointcloud(ros_cloud, cloud_dtype, payload)
+
+        o3d_cloud = o3d.geometry.PointCloud()
+        o3d_cloud.points = o3d.utility.Vector3dVector(points)
+        o3d_cloud.colors = o3d.utility.Vector3dVector(colors)
+
+        return o3d_cloud
+
+    def _pointcloud_dtype(self, ros_cloud: PointCloud2) -> Optional[np.dtype]:
+        """
+        Build a NumPy structured dtype for the x, y, z and rgb fields of a cloud.
+
+        :param ros_cloud: PointCloud2 message instance
+        :return: Structured dtype spanning one point, or None for unsupported layouts
+        """
+        fields = {field.name: field for field in ros_cloud.fields}
+        if any(name not in fields for name in POINTCLOUD_FIELDS):
+            return None
+        if ros_cloud.row_step != ros_cloud.width * ros_cloud.point_step:
+            return None
+
+        byte_order = '>' if ros_cloud.is_bigendian else '<'
+        formats = []
+        offsets = []
+        for name in POINTCLOUD_FIELDS:
+            field = fields[name]
+            if field.count != 1 or field.datatype not in POINTFIELD_DTYPES:
+                return None
+            formats.append(np.dtype(POINTFIELD_DTYPES[field.datatype]).newbyteorder(byte_order))
+            offsets.append(field.offset)
+
+        # Packed colors must be exactly four bytes to be reinterpreted as uint32
+        if formats[-1].itemsize != 4:
+            return None
+
+        return np.dtype({
+            'names': POINTCLOUD_FIELDS,
+            'formats': formats,
+            'offsets': offsets,
+            'itemsize': ros_cloud.point_step
+        })
+
+    def _decode_pointcloud(self, ros_cloud: PointCloud2, cloud_dtype: np.dtype, payload: Optional[memoryview] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Decode points and colors of a cloud straight from its data buffer.
+
+        :param ros_cloud: PointCloud2 message instance
+        :param cloud_dtype: Structured dtype built by _pointcloud_dtype
+        :param payload: Point buffer to decode instead of `ros_cloud.data`
+        :return: Tuple of Nx3 float64 points and Nx3 float64 colors in [0, 1]
+        """
+        buffer = ros_cloud.data if payload is None else payload
+        cloud = np.frombuffer(buffer, dtype=cloud_dtype, count=ros_cloud.width * ros_cloud.height)
+
+        # Same NaN semantics as point_cloud2.read_points(skip_nans=True)
+        if not ros_cloud.is_dense:
+            valid = np.ones(len(cloud), dtype=bool)
+            for name in POINTCLOUD_FIELDS:
+                if cloud.dtype[name].kind == 'f':
+                    valid &= ~np.isnan(cloud[name])
+            cloud = cloud[valid]
+
+        points = np.empty((len(cloud), 3), dtype=np.float64)
+        points[:, 0] = cloud['x']
+        points[:, 1] = cloud['y']
+        points[:, 2] = cloud['z']
+
+        rgb = np.ascontiguousarray(cloud['rgb'])
+        rgb = rgb.view(np.dtype(np.uint32).newbyteorder(rgb.dtype.byteorder)).astype(np.uint32)
+        colors = np.empty((len(cloud), 3), dtype=np.float64)
+        colors[:, 0] = (rgb >> 16) & 0xff
+        colors[:, 1] = (rgb >> 8) & 0xff
+        colors[:, 2] = rgb & 0xff
+
+        return points, colors / 255.0
+
+    def _convert_ros_pointcloud_to_o3d_fallback(self, ros_cloud: PointCloud2) -> o3d.geometry.PointCloud:
+        """
+        Convert a PointCloud2 message point by point, for unusual field layouts.
+
+        :param ros_cloud: PointCloud2 message instance
+        :return: Open3D point cloud with points and colors
+        """
         # RGB index
         RGB_COL = 3
-        FIELDS = ['x', 'y', 'z', 'rgb']
 
-        cloud_data = list(point_cloud2.read_points(ros_cloud, field_names=FIELDS, skip_nans=True))
+        cloud_data = list(point_cloud2.read_points(ros_cloud, field_names=POINTCLOUD_FIELDS, skip_nans=True))
         cloud_data = np.array([list(row) for row in cloud_data])
 
         rgb = [self._convert_rgb_float_to_tuple(row[RGB_COL]) for row in cloud_data]
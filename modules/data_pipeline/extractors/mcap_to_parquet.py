@@ -10,17 +10,13 @@ prohibited without the express written permission of Scintilla.
 
 import argparse
 import yaml
-from common.oslibs import info
-from typing import Dict, Union, List, Any, Tuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from common.oslibs import info, warning
+from typing import Dict, Union, List, Any, Tuple, Optional, Set, Callable
 from pathlib import Path
-from datetime import datetime
 import os
-import shutil
-import open3d as o3d
-import pandas as pd
+import numpy as np
 import pyarrow as pa
-import pyarrow.parquet as pq
-import cv2
 
 import rosbag2_py
 from sensor_msgs.msg import Image, PointCloud2
@@ -30,6 +26,34 @@ from rosidl_runtime_py.utilities import get_message
 
 
 from data_pipeline.extractors.convertors.convertor_loader import load_convertors
+from data_pipeline.extractors.convertors.convertor_interface import ConvertorInterface
+from data_pipeline.extractors.convertors.generated_convertor import GeneratedConvertor
+from data_pipeline.extractors.convertors.cdr_decoder import cdr_layout, check_cdr_batch, decode_cdr_batch
+from data_pipeline.extractors.catalog import record_extraction
+from data_pipeline.extractors.change_filter import ChangeFilter, LAST_SEEN_COLUMN
+from data_pipeline.extractors.checkpoint import CheckpointManifest, convertor_hash, plan_topics, clear_topic_directory, discard_uncommitted_parts, SKIP, RESUME
+from data_pipeline.extractors.pipeline import Pipeline, Stage, MemoryBudget, DEFAULT_QUEUE_SIZE, DEFAULT_MEMORY_BUDGET, DEFAULT_REPORT_INTERVAL
+from data_pipeline.extractors.shared_frames import FrameWorkerPool, write_frame, DEFAULT_FRAME_WORKERS, DEFAULT_FRAME_SLOTS, DEFAULT_FRAME_SLOT_BYTES
+from data_pipeline.extractors.readers.mcap_reader import McapChunkReader, DEFAULT_READER_THREADS, DEFAULT_PREFETCH_CHUNKS
+from data_pipeline.extractors.writers.parquet_policy import ParquetPolicies
+from data_pipeline.extractors.writers.parquet_writer import ParquetWriterPool, PartitionedParquetWriter, topic_to_directory, LOG_TIME_COLUMN, DEFAULT_ROW_GROUP_ROWS, DEFAULT_ROW_GROUP_BYTES, DEFAULT_INDEX_ROWS, DEFAULT_PARTITIONING, DEFAULT_TARGET_FILE_BYTES
+from data_pipeline.extractors.writers.tf_index import write_tf_index, DEFAULT_TF_TOPICS, DEFAULT_TF_STATIC_TOPICS
+from data_pipeline.extractors.writers.frame_store import FrameStore, FRAME_HASH_COLUMN, frame_digest, store_frame, temporary_frame_path
+from data_pipeline.extractors.writers.video_writer import VideoWriterPool
+from data_pipeline.extractors.writers.pointcloud_writer import ColumnarCloudWriterPool
+from data_pipeline.extractors.writers.file_sink import AsyncFileSink, DEFAULT_SINK_THREADS, DEFAULT_SINK_MAX_PENDING
+
+# Number of messages of a tabular topic converted together
+DEFAULT_CONVERT_BATCH_SIZE = 1024
+
+# Messages of the first batch of a bulk decoded type checked against its convertor
+CDR_CHECK_MESSAGES = 16
+
+# Message classes and convertor classes whose bulk decoding has been checked
+_checked_cdr_layouts: Set[Tuple[Any, Any]] = set()
+
+# Placeholder of a serialized message repeating the previous message of a change-only topic
+REPEATED = object()
 
 
 def load_config(config_file: str) -> Dict[str, Union[str, List[str], float, int]]:
@@ -47,20 +71,56 @@ def load_config(config_file: str) -> Dict[str, Union[str, List[str], float, int]
     return config
 
 
-def read_messages(input_bag: str, topics: List[str]) -> List[Tuple[str, Any, str, int]]:
+def resolve_message_types(topic_types: List[Any], topics: List[str]) -> Dict[str, Any]:
+    """
+    Resolve the message class of every requested topic once.
+
+    Parameters:
+        topic_types (List[rosbag2_py.TopicMetadata]): Topics and types stored in the bag.
+        topics (List[str]): List of topic names to read.
+
+    Returns:
+        Dict[str, Any]: Message class per requested topic found in the bag.
+    """
+    requested = set(topics)
+    message_types = {}
+    for topic_type in topic_types:
+        if topic_type.name in requested:
+            message_types[topic_type.name] = get_message(topic_type.type)
+
+    for topic in requested.difference(message_types):
+        warning(f"topic {topic} not in bag")
+    return message_types
+
+
+def read_messages(
+    input_bag: str,
+    topics: List[str],
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+    raw_types: Optional[Set[str]] = None,
+    deserialize: bool = True
+) -> List[Tuple[str, Any, str, int]]:
     """
     Read messages from a ROS bag file for specified topics.
 
+    The topic filter is pushed down into the storage reader so that records of other
+    topics never reach Python, and message classes are resolved once when the reader
+    opens. When a start time is given the reader seeks to it instead of scanning.
+    Messages of the types listed in `raw_types`, or every message when `deserialize`
+    is False, are yielded as their serialized CDR bytes instead of being deserialized.
+
     Parameters:
         input_bag (str): Path to the ROS bag file.
         topics (List[str]): List of topic names to read.
+        start_time (int, optional): First receive timestamp to read, in nanoseconds.
+        end_time (int, optional): Last receive timestamp to read, in nanoseconds.
+        raw_types (Set[str], optional): Type names, such as 'sensor_msgs/msg/Imu', yielded serialized.
+        deserialize (bool): Whether to deserialize the messages of the other types.
 
     Yields:
         Tuple[str, Any, str, int]: A tuple containing topic name, message, message type, and timestamp.
 
-    Raises:
-        ValueError: If the specified topic is not found in the bag.
-
     Example:
         >>> for topic, msg, msg_type, timestamp in read_messages('example.bag', ['topic1', 'topic2']):
         ...     print(f"Topic: {topic}, Type: {msg_type}, Timestamp: {timestamp}")
@@ -75,107 +135,578 @@ def read_messages(input_bag: str, topics: List[str]) -> List[Tuple[str, Any, str
     )
 
     topic_types = reader.get_all_topics_and_types()
+    message_types = resolve_message_types(topic_types, topics)
+    raw_topics = {topic_type.name for topic_type in topic_types if not deserialize or topic_type.type in (raw_types or set())}
+    if not message_types:
+        del reader
+        return
 
-    def typename(topic_name: str) -> str:
-        """
-        Get the message type for a specified topic.
-
-        Parameters:
-            topic_name (str): Name of the topic.
-
-        Returns:
-            str: The message type.
-
-        Raises:
-            ValueError: If the specified topic is not found in the bag.
-        """
-        for topic_type in topic_types:
-            if topic_type.name == topic_name:
-                return topic_type.type
-        raise ValueError(f"topic {topic_name} not in bag")
+    reader.set_filter(rosbag2_py.StorageFilter(topics=list(message_types)))
+    if start_time is not None:
+        reader.seek(start_time)
 
     while reader.has_next():
         topic, data, timestamp = reader.read_next()
-        if topic in topics:
-            msg_type = get_message(typename(topic))
-            msg = deserialize_message(data, msg_type)
-            yield topic, msg, msg_type, timestamp
+        if end_time is not None and timestamp > end_time:
+            break
+        msg_type = message_types[topic]
+        msg = data if topic in raw_topics else deserialize_message(data, msg_type)
+        yield topic, msg, msg_type, timestamp
     del reader
 
 
 def create_topic_directories(output_directory, topics) -> None:
-    # Delete the entire directory if it exists
-    try:
-        shutil.rmtree(output_directory)
-    except FileNotFoundError:
-        pass  # Ignore if the directory doesn't exist
+    # Existing outputs are kept, the checkpoint manifest decides which topics are redone
     for topic in topics:
         # Create the output directory if it doesn't exist
-        topic_directory = os.path.join(output_directory, topic.lstrip('/').replace('/', os.path.sep))
-        info(f'Deleting and creating directory: {topic_directory}')
+        topic_directory = topic_to_directory(output_directory, topic)
+        info(f'Creating directory: {topic_directory}')
 
         # Create the directory
         os.makedirs(topic_directory, exist_ok=True)
 
 
-def check_and_update_parquet(parquet_file, log_name, yaml_file):
-    # Check if Parquet file exists
+def save_as_parquet(topic, metadata, converted_message, writers: ParquetWriterPool, timestamp: Optional[int] = None) -> None:
+    """
+    Append the converted rows of a message to the parquet file of its topic.
+
+    Rows are prefixed with the log time of the message when its timestamp is given.
+
+    Args:
+        topic (str): Name of the topic.
+        metadata (List[str]): Column names of the converted rows.
+        converted_message (List[List[Any]]): Converted rows of a single message.
+        writers (ParquetWriterPool): Pool holding the open per-topic writers.
+        timestamp (int, optional): Bag receive timestamp of the message, in nanoseconds.
+
+    Returns:
+        None
+    """
+    if timestamp is not None:
+        metadata = [LOG_TIME_COLUMN] + metadata
+        converted_message = [[timestamp] + list(row) for row in converted_message]
+    writers.get(topic, metadata).write(converted_message, timestamp)
+
+
+def convert_messages(
+    convertor: ConvertorInterface,
+    messages: List[Any],
+    msg_type: Any = None,
+    timestamps: Optional[List[int]] = None
+) -> pa.RecordBatch:
+    """
+    Convert a batch of messages of a topic to a record batch.
+
+    Serialized messages are decoded in bulk straight into the schema of the convertor
+    when their type has a fixed CDR layout, and deserialized one by one otherwise.
+    The first bulk decoded batch of every message type and convertor is checked
+    against the rows of the convertor, so that a decoder diverging from it fails the
+    extraction instead of writing other values.
+    When timestamps are given, the batch starts with a log time column repeating the
+    timestamp of every message over the rows it converted to.
+
+    Args:
+        convertor (ConvertorInterface): Convertor of the topic.
+        messages (List[Any]): Messages of the topic, in bag order, deserialized or as CDR bytes.
+        msg_type (Any, optional): Message class of the topic, required for serialized messages.
+        timestamps (List[int], optional): Bag receive timestamp of every message, in nanoseconds.
+
+    Returns:
+        pa.RecordBatch: Converted rows of every message.
+
+    Raises:
+        ValueError: If bulk decoded messages differ from the rows of the convertor.
+    """
+    row_counts = None
+    if messages and isinstance(messages[0], bytes) and convertor.schema is not None and cdr_layout(msg_type) is not None:
+        batch = decode_cdr_batch(msg_type, messages, convertor.schema)
+        if (msg_type, type(convertor)) not in _checked_cdr_layouts:
+            sample = [deserialize_message(message, msg_type) for message in messages[:CDR_CHECK_MESSAGES]]
+            check_cdr_batch(msg_type, batch.slice(0, len(sample)), convertor.convert_batch(sample))
+            _checked_cdr_layouts.add((msg_type, type(convertor)))
+    else:
+        if messages and isinstance(messages[0], bytes):
+            messages = [deserialize_message(message, msg_type) for message in messages]
+        batch = convertor.convert_batch(messages)
+        row_counts = convertor.row_counts(messages)
+
+    if timestamps is None:
+        return batch
+    if row_counts is None and batch.num_rows != len(messages):
+        # The convertor emits several rows per message without reporting how many
+        row_counts = [len(convertor.convert(message)) for message in messages]
+    log_times = np.asarray(timestamps, dtype=np.int64)
+    if row_counts is not None:
+        log_times = np.repeat(log_times, row_counts)
+    return pa.RecordBatch.from_arrays(
+        [pa.array(log_times, type=pa.int64())] + batch.columns,
+        schema=batch.schema.insert(0, pa.field(LOG_TIME_COLUMN, pa.int64()))
+    )
+
+
+def save_batch_as_parquet(topic, metadata, batch: pa.RecordBatch, writers: ParquetWriterPool, timestamp: Optional[int] = None) -> None:
+    """
+    Append a converted batch of messages to the parquet file of its topic.
+
+    Args:
+        topic (str): Name of the topic.
+        metadata (List[str]): Column names of the batch.
+        batch (pa.RecordBatch): Converted rows of a batch of messages.
+        writers (ParquetWriterPool): Pool holding the open per-topic writers.
+        timestamp (int, optional): Bag receive timestamp of the last message of the batch, in nanoseconds.
+
+    Returns:
+        None
+    """
+    writers.get(topic, metadata).write_batch(batch, timestamp)
+
+
+def _write_and_release(write: Callable[[], Any], budget: MemoryBudget, size: int) -> None:
+    """
+    Run a write and return the memory of the written message to the budget.
+
+    Args:
+        write (Callable): Function writing the message.
+        budget (MemoryBudget): Budget the message was reserved from.
+        size (int): Bytes reserved by the message.
+
+    Returns:
+        None
+    """
     try:
-        df = pd.read_parquet(parquet_file)
-    except FileNotFoundError:
-        # If the Parquet file doesn't exist, create a new DataFrame
-        df = pd.DataFrame(columns=['timestamp', 'log_name', 'start_time', 'duration'])
+        write()
+    finally:
+        budget.release(size)
+
+
+def extract_topics(
+    input_bag: str,
+    topics: List[str],
+    output_directory: str,
+    convertors: Dict[str, Any],
+    config: Dict[str, Any],
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Read, convert and write the given topics of a bag.
+
+    The extraction runs as a pipeline of stages connected by bounded queues: the
+    reader (rosbag2, or the chunk-parallel MCAP reader when `reader_backend` is
+    'mcap') yields serialized messages, the deserializer turns them into messages,
+    the convertor turns them into write tasks and the sink runs the writes. Every
+    serialized message reserves its size from `memory_budget_bytes` until it has been
+    written, so the reader stalls when the sink falls behind.
+
+    Messages of tabular topics are converted in batches with `convert_batch`, or
+    decoded in bulk from their CDR bytes for the `cdr_fast_path_types`. Images and
+    point clouds are encoded to files by an asynchronous sink, or converted and
+    encoded by `frame_workers` processes reading their payload from shared memory;
+    every pending file has been written by the time this function returns. With
+    `deduplicate_frames`, PNG frames are hashed before being encoded and stored once
+    per distinct frame in the content-addressed store of the log, which the
+    `frame_hash` column of the image rows points at.
+
+    Progress is checkpointed in the manifest of the log every time a topic commits a
+    part file. Topics completed by an earlier run with the same convertor and time
+    range are skipped, topics interrupted half-way resume after the last message of
+    their last committed part, and the others are extracted from scratch. Topics
+    stored as video or columnar point clouds cannot be appended to, so an
+    interrupted one is rebuilt. Messages received at the exact timestamp of the last
+    committed message of a resumed topic are assumed committed with it.
+
+    Topics whose convertor sets `change_only` only store the rows whose content
+    changed, with the interval they were seen for; messages repeating the previous
+    one are neither deserialized nor converted. Their rows are held until their
+    content changes, so an interrupted one is rebuilt.
+
+    Args:
+        input_bag (str): Path to the ROS bag file.
+        topics (List[str]): List of topic names to extract.
+        output_directory (str): Root directory of the extracted log.
+        convertors (Dict[str, ConvertorInterface]): Convertor of every topic.
+        config (dict): Extraction configuration settings.
+        start_time (int, optional): First receive timestamp to extract, in nanoseconds.
+        end_time (int, optional): Last receive timestamp to extract, in nanoseconds.
+
+    Returns:
+        Dict[str, int]: Number of converted messages per topic.
+    """
+    stats_dict: Dict[str, int] = {}
+    counter = 0
+
+    partitioning = config.get('parquet_partitioning', DEFAULT_PARTITIONING)
+    policies = ParquetPolicies(config.get('parquet_policy'))
+    manifest = CheckpointManifest(output_directory)
+    entries = manifest.load()
+    plan = plan_topics(entries, convertors, topics, start_time, end_time, partitioning, policies)
+    resume_after: Dict[str, int] = {}
+    resumed: Dict[str, Tuple[int, int]] = {}
+    for topic, action in plan.items():
+        if action == SKIP:
+            info(f'Skipping {topic}, already extracted')
+        elif action == RESUME:
+            entry = entries[topic]
+            info(f'Resuming {topic} after {entry["last_timestamp"]} ({entry["rows"]} rows committed)')
+            discard_uncommitted_parts(output_directory, topic, entry['parts'])
+            resume_after[topic] = entry['last_timestamp']
+            resumed[topic] = (entry['parts'], entry['rows'])
+        else:
+            info(f'Extracting {topic} from scratch')
+            clear_topic_directory(output_directory, topic)
+            if topic in convertors:
+                manifest.start(topic, convertor_hash(convertors[topic]), start_time, end_time, partitioning, policies.get(topic))
+
+    topics = [topic for topic in topics if plan[topic] != SKIP]
+    if not topics:
+        return stats_dict
+    if len(resume_after) == len(topics):
+        # Every topic resumes, so the messages before the earliest checkpoint are not read
+        start_time = min(resume_after.values()) + 1
+    change_filters = {
+        topic: ChangeFilter(convertor.config.get('change_key_columns'), convertor.config.get('change_ignore_columns'))
+        for topic, convertor in convertors.items() if topic in topics and (convertor.config or {}).get('change_only')
+    }
+    stateful_topics: Set[str] = set(change_filters)
+
+    row_group_rows = config.get('parquet_row_group_rows', DEFAULT_ROW_GROUP_ROWS)
+    row_group_bytes = config.get('parquet_row_group_bytes', DEFAULT_ROW_GROUP_BYTES)
+    index_rows = config.get('parquet_index_rows', DEFAULT_INDEX_ROWS)
+    target_file_bytes = config.get('parquet_target_file_bytes', DEFAULT_TARGET_FILE_BYTES)
+    sink_threads = config.get('sink_threads', DEFAULT_SINK_THREADS)
+    sink_max_pending = config.get('sink_max_pending', DEFAULT_SINK_MAX_PENDING)
+    image_storage = config.get('image_storage', 'png')
+    frame_store = FrameStore(output_directory) if image_storage == 'png' and config.get('deduplicate_frames', False) else None
+    pointcloud_storage = config.get('pointcloud_storage', 'pcd')
+    convert_batch_size = config.get('convert_batch_size', DEFAULT_CONVERT_BATCH_SIZE)
+    raw_classes = set()
+    for type_name in config.get('cdr_fast_path_types', []):
+        # A type without layout would silently be deserialized message by message
+        if cdr_layout(get_message(type_name)) is None:
+            raise ValueError(f'{type_name} of cdr_fast_path_types has no fixed CDR layout.')
+        raw_classes.add(get_message(type_name))
+    reader_backend = config.get('reader_backend', 'rosbag2')
+    budget = MemoryBudget(config.get('memory_budget_bytes', DEFAULT_MEMORY_BUDGET))
+    pending_messages: Dict[str, List[Any]] = {}
+    pending_types: Dict[str, Any] = {}
+    pending_bytes: Dict[str, int] = {}
+    pending_timestamps: Dict[str, List[int]] = {}
+
+    if reader_backend == 'mcap':
+        reader = McapChunkReader(
+            input_bag,
+            config.get('reader_threads', DEFAULT_READER_THREADS),
+            config.get('reader_prefetch_chunks', DEFAULT_PREFETCH_CHUNKS)
+        )
+        source = reader.read(topics, start_time, end_time, deserialize=False)
+    else:
+        source = read_messages(input_bag, topics, start_time, end_time, deserialize=False)
+
+    def commit_topic(topic: str, writer: PartitionedParquetWriter) -> None:
+        # Files of the committed messages are written before their rows are checkpointed
+        sink.wait()
+        fields = {
+            'parts': writer.parts,
+            'rows': writer.num_rows,
+            'last_timestamp': writer.committed_timestamp,
+            'resumable': topic not in stateful_topics,
+        }
+        if topic not in resume_after:
+            fields['first_timestamp'] = writer.first_timestamp
+        manifest.update(topic, **fields)
+
+    # Writers stay open for the whole extraction and are closed even on failure
+    with AsyncFileSink(sink_threads, sink_max_pending) as sink, \
+            ParquetWriterPool(
+                output_directory, row_group_rows, row_group_bytes, resumed, commit_topic, index_rows,
+                partitioning, target_file_bytes, policies
+            ) as writers, \
+            VideoWriterPool(output_directory, config) as videos, \
+            ColumnarCloudWriterPool(output_directory, config) as clouds, \
+            FrameWorkerPool(
+                config.get('frame_workers', DEFAULT_FRAME_WORKERS),
+                config.get('frame_slots', DEFAULT_FRAME_SLOTS),
+                config.get('frame_slot_bytes', DEFAULT_FRAME_SLOT_BYTES)
+            ) as frame_workers:
+
+        def deserialize_stage(item: Tuple[str, bytes, Any, int]) -> List[Tuple[str, Any, Any, int, int]]:
+            # Messages of the fast path types stay serialized and are decoded in bulk
+            topic, data, msg_type, timestamp = item
+            if topic in change_filters and msg_type not in (PointCloud2, Image, DisparityImage) and change_filters[topic].is_repeat(data, msg_type):
+                return [(topic, REPEATED, msg_type, timestamp, len(data))]
+            msg = data if msg_type in raw_classes else deserialize_message(data, msg_type)
+            return [(topic, msg, msg_type, timestamp, len(data))]
+
+        def flush_pending(topic: str) -> Tuple[int, Callable[[], Any], bool]:
+            timestamps = pending_timestamps.pop(topic)
+            batch = convert_messages(convertors[topic], pending_messages.pop(topic), pending_types[topic], timestamps)
+            size = pending_bytes.pop(topic)
+            if topic in change_filters:
+                return save_changes(topic, change_filters[topic].update(batch), size)
+            metadata = [LOG_TIME_COLUMN] + convertors[topic].header
+            return size, lambda: save_batch_as_parquet(topic, metadata, batch, writers, timestamps[-1]), False
+
+        def save_changes(topic: str, batch: Optional[pa.RecordBatch], size: int) -> Tuple[int, Callable[[], Any], bool]:
+            # Rows of a change-only topic are written once their content has changed
+            if batch is None:
+                return size, lambda: None, False
+            metadata = [LOG_TIME_COLUMN, LAST_SEEN_COLUMN] + convertors[topic].header
+            timestamp = change_filters[topic].last_timestamp
+            return size, lambda: save_batch_as_parquet(topic, metadata, batch, writers, timestamp), False
+
+        def convert_stage(item: Tuple[str, Any, Any, int, int]) -> List[Tuple[int, Callable[[], Any], bool]]:
+            # Every write task carries the bytes it returns to the budget and whether it is a file encoding job
+            nonlocal counter
+            topic, msg, msg_type, timestamp, size = item
+            if topic not in convertors.keys():
+                info(f'No extractors are provided for {topic}:{msg_type}')
+                budget.release(size)
+                return []
+            if topic in resume_after and timestamp <= resume_after[topic]:
+                # Committed by the interrupted run
+                budget.release(size)
+                return []
+
+            info(f'Converting {topic} ({msg_type}): @ stamp [{timestamp}]')
+            try:
+                stats_dict[topic] = stats_dict[topic] + 1
+            except:
+                stats_dict[topic] = 1
+            counter = counter + 1
+            info(f'couter: {counter}')
+
+            if msg is REPEATED:
+                # Messages converted before it update the rows it repeats
+                tasks = [flush_pending(topic)] if topic in pending_messages else []
+                change_filters[topic].extend(timestamp)
+                budget.release(size)
+                return tasks
 
-    # Check if the log name exists in the log name column
-    if log_name not in df['log_name'].values:
-        # If not, add a new row with current timestamp, log name, and flattened fields from YAML
-        timestamp = datetime.now()
+            metadata = convertors[topic].header
+
+            # Generated convertors flatten every message type, media included, into tabular rows
+            if isinstance(convertors[topic], GeneratedConvertor) or msg_type not in (PointCloud2, Image, DisparityImage):
+                # Convert and save parquet in batches of messages
+                pending_messages.setdefault(topic, []).append(msg)
+                pending_types[topic] = msg_type
+                pending_bytes[topic] = pending_bytes.get(topic, 0) + size
+                pending_timestamps.setdefault(topic, []).append(timestamp)
+                if len(pending_messages[topic]) >= convert_batch_size:
+                    return [flush_pending(topic)]
+                return []
+
+            # Frames stored one file each are written to this path, the others to a per-topic writer
+            digest = None
+            if msg_type == PointCloud2:
+                path = os.path.join(output_directory, f'{topic.lstrip("/")}/{timestamp}.pcd') if pointcloud_storage != 'columnar' else None
+            elif image_storage == 'video':
+                path = None
+            elif frame_store is not None:
+                # Rows point at the frame by hash, and a frame already in the store is not encoded again
+                digest = frame_digest(msg)
+                path, is_new = frame_store.claim(digest)
+                metadata = metadata + [FRAME_HASH_COLUMN]
+                if not is_new:
+                    rows = [list(row) + [digest] for row in convertors[topic].convert(msg)[0]]
+                    return [(size, lambda: save_as_parquet(topic, metadata, rows, writers, timestamp), False)]
+            else:
+                path = os.path.join(output_directory, f'{topic.lstrip("/")}/{timestamp}.png')
+
+            if path is not None and frame_workers.enabled:
+                # A worker converts and writes the frame from shared memory, only the rows come back
+                worker_path = path if digest is None else temporary_frame_path(path)
+                future = frame_workers.submit(convertors[topic], msg, worker_path)
+                if future is not None:
+                    if digest is None:
+                        return [(size, lambda: save_as_parquet(topic, metadata, future.result(), writers, timestamp), False)]
+                    return [(size, lambda: save_stored_frame(topic, metadata, future, worker_path, path, digest, timestamp), False)]
+                if digest is not None:
+                    os.remove(worker_path)
+
+            # Files are queued before the rows, so a checkpoint covering the rows waits for them
+            converted_message = convertors[topic].convert(msg)
+            rows = converted_message[0] if digest is None else [list(row) + [digest] for row in converted_message[0]]
+            save_rows = (0, lambda: save_as_parquet(topic, metadata, rows, writers, timestamp), False)
+            if msg_type == PointCloud2 and pointcloud_storage == 'columnar':
+                # Append to the columnar point store of the topic
+                stateful_topics.add(topic)
+                o3d_cloud = converted_message[1]
+                return [(size, lambda: clouds.get(topic).write(timestamp, np.asarray(o3d_cloud.points), np.asarray(o3d_cloud.colors)), False), save_rows]
+            elif msg_type == PointCloud2:
+                # Save as a PCD
+                return [(size, lambda: write_frame(path, converted_message[1]), True), save_rows]
+            elif image_storage == 'video':
+                # Append to the video segments of the topic
+                stateful_topics.add(topic)
+                return [(size, lambda: videos.get(topic).write(timestamp, converted_message[1]), False), save_rows]
+            elif digest is not None:
+                # Save as the first copy of the frame in the store
+                return [(size, lambda: frame_store.write(path, converted_message[1]), True), save_rows]
+            else:
+                # Save as an image
+                return [(size, lambda: write_frame(path, converted_message[1]), True), save_rows]
+
+        def save_stored_frame(topic: str, metadata: List[str], future: Future, temporary_path: str, path: str, digest: str, timestamp: int) -> None:
+            # The frame a worker wrote is moved into the store before rows point at it
+            try:
+                rows = future.result()
+            except BaseException:
+                os.remove(temporary_path)
+                raise
+            store_frame(temporary_path, path)
+            save_as_parquet(topic, metadata, [list(row) + [digest] for row in rows], writers, timestamp)
+
+        def flush_stage() -> List[Tuple[int, Callable[[], Any], bool]]:
+            # Convert the messages left in partial batches
+            return [flush_pending(topic) for topic in list(pending_messages)]
+
+        def finish_stage() -> List[Tuple[int, Callable[[], Any], bool]]:
+            # Rows of change-only topics are held until the end of the extraction at the latest
+            tasks = flush_stage()
+            return tasks + [save_changes(topic, change_filter.close(), 0) for topic, change_filter in change_filters.items()]
+
+        def idle_stage() -> List[Tuple[int, Callable[[], Any], bool]]:
+            # Partial batches would otherwise hold the budget the stalled reader waits for
+            return flush_stage() if budget.waiting else []
+
+        def sink_stage(task: Tuple[int, Callable[[], Any], bool]) -> List[Any]:
+            size, write, is_file = task
+            if is_file:
+                sink.submit(_write_and_release, write, budget, size)
+            else:
+                _write_and_release(write, budget, size)
+            return []
+
+        pipeline = Pipeline(
+            [
+                Stage('deserialize', deserialize_stage),
+                Stage('convert', convert_stage, finish_stage, idle_stage),
+                Stage('sink', sink_stage),
+            ],
+            config.get('pipeline_queue_size', DEFAULT_QUEUE_SIZE),
+            budget,
+            config.get('pipeline_report_interval', DEFAULT_REPORT_INTERVAL)
+        )
+        pipeline.run(source, lambda item: len(item[1]))
+
+    # Every writer has committed its last part and every file has been written
+    for topic in topics:
+        if topic in convertors:
+            manifest.update(topic, complete=True)
+
+    return stats_dict
+
+
+def extract_topics_worker(
+    input_bag: str,
+    topics: List[str],
+    output_directory: str,
+    config: Dict[str, Any],
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Extract a shard of topics in a worker process.
+
+    Every worker loads its own convertors, generating the missing ones from the bag
+    metadata, and opens its own reader, filtered down to the topics of its shard, so
+    nothing but the shard description and the resulting stats cross the process
+    boundary.
+
+    Args:
+        input_bag (str): Path to the ROS bag file.
+        topics (List[str]): Topics of the shard.
+        output_directory (str): Root directory of the extracted log.
+        config (dict): Extraction configuration settings.
+        start_time (int, optional): First receive timestamp to extract, in nanoseconds.
+        end_time (int, optional): Last receive timestamp to extract, in nanoseconds.
+
+    Returns:
+        Dict[str, int]: Number of converted messages per topic.
+    """
+    topic_types = load_topic_types(Path(input_bag).parent / 'metadata.yaml', topics)
+    convertors = load_convertors(config.get('convertors'), topic_types)
+    return extract_topics(input_bag, topics, output_directory, convertors, config, start_time, end_time)
+
+
+def load_message_counts(yaml_file: Union[str, Path]) -> Dict[str, int]:
+    """
+    Load the number of recorded messages per topic from the bag metadata.
+
+    Args:
+        yaml_file (str): Path to the metadata.yaml file of the bag.
+
+    Returns:
+        Dict[str, int]: Message count per topic, empty if the metadata is missing.
+    """
+    try:
         with open(yaml_file, 'r') as f:
             yaml_data = yaml.safe_load(f)
+    except FileNotFoundError:
+        return {}
+
+    message_counts = {}
+    for topic_info in yaml_data['rosbag2_bagfile_information'].get('topics_with_message_count', []):
+        message_counts[topic_info['topic_metadata']['name']] = topic_info['message_count']
+    return message_counts
+
 
-        start_time = yaml_data['rosbag2_bagfile_information']['starting_time']['nanoseconds_since_epoch']
-        duration = yaml_data['rosbag2_bagfile_information']['duration']['nanoseconds']
-        new_row = {'timestamp': timestamp, 'log_name': log_name, 'start_time': start_time, 'duration': duration}
-        df = pd.concat([df, pd.DataFrame([new_row], columns=['timestamp', 'log_name', 'start_time', 'duration'])], ignore_index=True)
+def load_topic_types(yaml_file: Union[str, Path], topics: List[str]) -> Dict[str, str]:
+    """
+    Load the message type name of the given topics from the bag metadata.
 
-        # Write the updated DataFrame to the Parquet file
-        df.to_parquet(parquet_file)
+    Args:
+        yaml_file (str): Path to the metadata.yaml file of the bag.
+        topics (List[str]): List of topic names to look up.
 
+    Returns:
+        Dict[str, str]: Message type name per topic, empty if the metadata is missing.
+    """
+    try:
+        with open(yaml_file, 'r') as f:
+            yaml_data = yaml.safe_load(f)
+    except FileNotFoundError:
+        return {}
 
-def save_as_parquet(topic, metadata, converted_message, output_directory):
-    topic_directory = os.path.join(output_directory, topic.lstrip('/').replace('/', os.path.sep))
+    topic_types = {}
+    for topic_info in yaml_data['rosbag2_bagfile_information'].get('topics_with_message_count', []):
+        topic_metadata = topic_info['topic_metadata']
+        if topic_metadata['name'] in topics:
+            topic_types[topic_metadata['name']] = topic_metadata['type']
+    return topic_types
 
-    # Load the converted_message into a DataFrame
-    converted_message_df = pd.DataFrame(converted_message, columns=metadata)
 
-    # Create or append to the Parquet file
-    parquet_file_path = os.path.join(topic_directory, 'data.parquet')
-    header_written = False
+def shard_topics(topics: List[str], num_shards: int, message_counts: Dict[str, int]) -> List[List[str]]:
+    """
+    Split topics into shards with a similar number of messages.
 
-    if os.path.exists(parquet_file_path):
-        # Append to existing Parquet file
-        existing_table = pq.read_table(parquet_file_path)
+    Topics are assigned greedily, largest first, to the shard with the fewest
+    messages so far. Topics without a known message count weigh one message.
 
-        # Check if the schema matches
-        if existing_table.schema.equals(pa.Table.from_pandas(converted_message_df).schema):
-            new_table = pa.Table.from_pandas(converted_message_df)
-            new_table = pa.concat_tables([existing_table, new_table])
-            header_written = True
-        else:
-            raise ValueError('Schema for the message has changed!')
-    else:
-        # Create a new Parquet file
-        new_table = pa.Table.from_pandas(converted_message_df)
-        header_written = True
+    Args:
+        topics (List[str]): List of topic names to split.
+        num_shards (int): Maximum number of shards.
+        message_counts (Dict[str, int]): Message count per topic.
 
-    # Write the table to the Parquet file
-    pq.write_table(new_table, parquet_file_path, write_statistics=not header_written)
+    Returns:
+        List[List[str]]: Non-empty shards of topics.
+    """
+    shards: List[List[str]] = [[] for _ in range(max(1, num_shards))]
+    loads = [0] * len(shards)
+    for topic in sorted(topics, key=lambda topic: message_counts.get(topic, 1), reverse=True):
+        shard_index = loads.index(min(loads))
+        shards[shard_index].append(topic)
+        loads[shard_index] += message_counts.get(topic, 1)
+    return [shard for shard in shards if shard]
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Convert mcap files to parquet')
     parser.add_argument('mcap', help='Path to the mcap file.')
     parser.add_argument('-c', '--config', help='Path to the mcap file.', default='data/config/mcap_to_parquet.yaml')
+    parser.add_argument('-w', '--workers', help='Number of worker processes extracting topics in parallel.', type=int, default=1)
+    parser.add_argument('--start', help='First receive timestamp to extract, in nanoseconds.', type=int, default=None)
+    parser.add_argument('--end', help='Last receive timestamp to extract, in nanoseconds.', type=int, default=None)
     args = parser.parse_args()
 
     config_file = args.config
@@ -186,48 +717,32 @@ if __name__ == "__main__":
     output_directory = os.path.join(output_directory, log_name)
 
     topics = config.get('extracted_topics', [])
-
-    stats_dict: Dict = {}
-    topic_dict: Dict = {}
-    counter = 0
-
-    info('Loading message convertors')
-    convertor_config_file = config.get('convertors')
-    convertors = load_convertors(convertor_config_file)
-    info(convertors)
+    yaml_file = Path(args.mcap).parent / 'metadata.yaml'
 
      # Create all topic directories first
     create_topic_directories(output_directory, topics)
 
-    for topic, msg, msg_type, timestamp in read_messages(args.mcap, topics):
-        if topic in convertors.keys():
-            info(f'Converting {topic} ({msg_type}): @ stamp [{timestamp}]')
-            converted_message = convertors[topic].convert(msg)
-            try:
-                stats_dict[topic] = stats_dict[topic] + 1
-            except:
-                stats_dict[topic] = 1
-            counter = counter + 1
-            info(f'couter: {counter}')
-
-            metadata = convertors[topic].header
+    stats_dict: Dict[str, int] = {}
+    if args.workers > 1:
+        shards = shard_topics(topics, args.workers, load_message_counts(yaml_file))
+        info(f'Extracting {len(topics)} topics in {len(shards)} worker processes')
+        with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+            futures = [
+                executor.submit(extract_topics_worker, args.mcap, shard, output_directory, config, args.start, args.end)
+                for shard in shards
+            ]
+            for future in futures:
+                stats_dict.update(future.result())
+    else:
+        info('Loading message convertors')
+        convertors = load_convertors(config.get('convertors'), load_topic_types(yaml_file, topics))
+        info(convertors)
+        stats_dict = extract_topics(args.mcap, topics, output_directory, convertors, config, args.start, args.end)
 
-            if msg_type == PointCloud2:
-                # Save as a PCD
-                o3d.io.write_point_cloud(os.path.join(output_directory, f'{topic.lstrip("/")}/{timestamp}.pcd'), converted_message[1])
-                save_as_parquet(topic, metadata, converted_message[0], output_directory)
-            elif msg_type == Image or msg_type == DisparityImage:
-                # Save as an image
-                cv2.imwrite(os.path.join(output_directory, f'{topic.lstrip("/")}/{timestamp}.png'), converted_message[1])
-                save_as_parquet(topic, metadata, converted_message[0], output_directory)
-            else:
-                # Save parquet
-                save_as_parquet(topic, metadata, converted_message, output_directory)
+    info(f'Converted {sum(stats_dict.values())} messages: {stats_dict}')
 
-        else:
-            info(f'No extractors are provided for {topic}:{msg_type}')
+    # Index the extracted transforms for TFBuffer lookups
+    write_tf_index(output_directory, config.get('tf_topics', DEFAULT_TF_TOPICS), config.get('tf_static_topics', DEFAULT_TF_STATIC_TOPICS))
 
     # Update info on extracted data
-    manifest_path = config.get('manifest_parquet')
-    yaml_file = Path(args.mcap).parent / 'metadata.yaml'
-    check_and_update_parquet(manifest_path, log_name, yaml_file)
\ No newline at end of file
+    record_extraction(config, log_name, yaml_file, output_directory)
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+
+"""
+Threaded stages connected by bounded queues under a shared memory budget.
+
+(c) 2023 Scintilla. All rights reserved.
+Unauthorized reproduction, distribution, or disclosure of this material is strictly
+prohibited without the express written permission of Scintilla.
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from common.oslibs import info
+
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_MEMORY_BUDGET = 2 * 1024 * 1024 * 1024
+DEFAULT_REPORT_INTERVAL = 10.0
+
+# Seconds a blocked stage waits before checking whether the pipeline failed
+POLL_INTERVAL = 0.1
+
+# Marks the end of the stream in a queue
+_END = object()
+
+
+class PipelineAborted(Exception):
+    """
+    Raised in a stage blocked on the pipeline when another stage failed.
+    """
+
+
+class MemoryBudget:
+    """
+    Byte budget shared by the items in flight between the first and the last stage.
+
+    The source reserves the size of every item before it enters the pipeline and
+    the last stage releases it once the item has been written, so the source stalls
+    while the stages behind it are holding the whole budget. An item larger than the
+    budget is still admitted when nothing else is in flight.
+    """
+
+    def __init__(self, budget_bytes: int = DEFAULT_MEMORY_BUDGET) -> None:
+        """
+        Initialize the MemoryBudget.
+
+        Args:
+            budget_bytes (int): Maximum number of bytes in flight.
+
+        Returns:
+            None
+        """
+        self.budget_bytes = budget_bytes
+        self.in_use = 0
+        self.peak = 0
+        self.waiting = False
+        self._condition = threading.Condition()
+
+    def acquire(self, size: int, aborted: threading.Event) -> None:
+        """
+        Reserve bytes, blocking while the budget is exhausted.
+
+        Args:
+            size (int): Number of bytes to reserve.
+            aborted (threading.Event): Set when the pipeline failed.
+
+        Returns:
+            None
+
+        Raises:
+            PipelineAborted: If the pipeline failed while waiting.
+        """
+        with self._condition:
+            while self.in_use > 0 and self.in_use + size > self.budget_bytes:
+                if aborted.is_set():
+                    raise PipelineAborted()
+                self.waiting = True
+                self._condition.wait(POLL_INTERVAL)
+            self.waiting = False
+            self.in_use += size
+            self.peak = max(self.peak, self.in_use)
+
+    def release(self, size: int) -> None:
+        """
+        Return reserved bytes to the budget.
+
+        Args:
+            size (int): Number of bytes to release.
+
+        Returns:
+            None
+        """
+        with self._condition:
+            self.in_use -= size
+            self._condition.notify_all()
+
+
+class Stage:
+    """
+    A named step of the pipeline.
+
+    `process` maps one input item to any number of output items. `finish` emits the
+    items still held by the stage at the end of the stream, and `idle` is called
+    while no input arrives, letting a stage hand over the items it is holding when
+    the source is stalled on the memory budget.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        process: Callable[[Any], Iterable[Any]],
+        finish: Optional[Callable[[], Iterable[Any]]] = None,
+        idle: Optional[Callable[[], Iterable[Any]]] = None
+    ) -> None:
+        """
+        Initialize the Stage.
+
+        Args:
+            name (str): Name of the stage, used to report its queue depth.
+            process (Callable): Function mapping an item to its output items.
+            finish (Callable, optional): Function emitting the remaining items at the end of the stream.
+            idle (Callable, optional): Function emitting held items while no input arrives.
+
+        Returns:
+            None
+        """
+        self.name = name
+        self.process = process
+        self.finish = finish or (lambda: ())
+        self.idle = idle or (lambda: ())
+
+
+class Pipeline:
+    """
+    Run stages in their own threads, each fed by a bounded queue.
+
+    The source is iterated in the calling thread. Bounded queues stop a fast stage
+    from running ahead of a slow one, and the memory budget caps the bytes held by
+    all stages together. The first failure of any stage stops the others and is
+    re-raised by `run`.
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        budget: Optional[MemoryBudget] = None,
+        report_interval: float = DEFAULT_REPORT_INTERVAL
+    ) -> None:
+        """
+        Initialize the Pipeline.
+
+        Args:
+            stages (List[Stage]): Stages in processing order; outputs of the last stage are dropped.
+            queue_size (int): Maximum number of items queued in front of every stage.
+            budget (MemoryBudget, optional): Budget of the bytes in flight.
+            report_interval (float): Seconds between two reports of the queue depths.
+
+        Returns:
+            None
+        """
+        self.stages = stages
+        self.budget = budget or MemoryBudget()
+        self.report_interval = report_interval
+        self.max_depths = {stage.name: 0 for stage in stages}
+
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self._aborted = threading.Event()
+        self._errors: List[BaseException] = []
+
+    def queue_depths(self) -> Dict[str, int]:
+        """
+        Return the number of items queued in front of every stage.
+
+        Returns:
+            Dict[str, int]: Queue depth per stage name.
+        """
+        return {stage.name: stage_queue.qsize() for stage, stage_queue in zip(self.stages, self._queues)}
+
+    def run(self, source: Iterable[Any], size_of: Callable[[Any], int]) -> None:
+        """
+        Feed the items of the source through the stages until every stage is done.
+
+        Args:
+            source (Iterable): Items entering the first stage.
+            size_of (Callable): Number of bytes an item reserves from the budget.
+
+        Returns:
+            None
+
+        Raises:
+            Exception: The first exception raised by the source or a stage.
+        """
+        threads = [
+            threading.Thread(target=self._run_stage, args=(index,), name=f'pipeline_{stage.name}', daemon=True)
+            for index, stage in enumerate(self.stages)
+        ]
+        for thread in threads:
+            thread.start()
+
+        last_report = time.monotonic()
+        try:
+            for item in source:
+                self.budget.acquire(size_of(item), self._aborted)
+                self._put(0, item)
+                if time.monotonic() - last_report >= self.report_interval:
+                    self._report()
+                    last_report = time.monotonic()
+            self._put(0, _END)
+        except PipelineAborted:
+            pass
+        except BaseException as exception:
+            self._fail(exception)
+
+        for thread in threads:
+            thread.join()
+        self._report()
+
+        if self._errors:
+            raise self._errors[0]
+
+    def _run_stage(self, index: int) -> None:
+        """
+        Process the items queued in front of a stage until the end of the stream.
+
+        Args:
+            index (int): Index of the stage.
+
+        Returns:
+            None
+        """
+        stage = self.stages[index]
+        try:
+            while True:
+                try:
+                    item = self._queues[index].get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    if self._aborted.is_set():
+                        return
+                    self._emit(index, stage.idle())
+                    continue
+
+                if item is _END:
+                    self._emit(index, stage.finish())
+                    if index + 1 < len(self.stages):
+                        self._put(index + 1, _END)
+                    return
+                self._emit(index, stage.process(item))
+        except PipelineAborted:
+            pass
+        except BaseException as exception:
+            self._fail(exception)
+
+    def _emit(self, index: int, items: Iterable[Any]) -> None:
+        """
+        Queue the output items of a stage in front of the next stage.
+
+        Args:
+            index (int): Index of the stage emitting the items.
+            items (Iterable): Output items.
+
+        Returns:
+            None
+        """
+        for item in items:
+            if index + 1 < len(self.stages):
+                self._put(index + 1, item)
+
+    def _put(self, index: int, item: Any) -> None:
+        """
+        Queue an item in front of a stage, blocking while the queue is full.
+
+        Args:
+            index (int): Index of the receiving stage.
+            item (Any): Item to queue.
+
+        Returns:
+            None
+
+        Raises:
+            PipelineAborted: If the pipeline failed while waiting.
+        """
+        while True:
+            if self._aborted.is_set():
+                raise PipelineAborted()
+            try:
+                self._queues[index].put(item, timeout=POLL_INTERVAL)
+                break
+            except queue.Full:
+                continue
+
+        name = self.stages[index].name
+        self.max_depths[name] = max(self.max_depths[name], self._queues[index].qsize())
+
+    def _fail(self, exception: BaseException) -> None:
+        """
+        Record a failure and stop every stage.
+
+        Args:
+            exception (BaseException): The failure.
+
+        Returns:
+            None
+        """
+        self._errors.append(exception)
+        self._aborted.set()
+
+    def _report(self) -> None:
+        """
+        Log the queue depths and the memory in flight.
+
+        Returns:
+            None
+        """
+        depths = ', '.join(f'{name}={depth}/{self.max_depths[name]}' for name, depth in self.queue_depths().items())
+        info(
+            f'Pipeline queues (current/max): {depths}; memory in flight: '
+            f'{self.budget.in_use / 2**20:.1f} MB (peak {self.budget.peak / 2**20:.1f} MB of {self.budget.budget_bytes / 2**20:.1f} MB)'
+        )
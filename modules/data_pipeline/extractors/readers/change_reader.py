@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+"""
+Look up the rows of change-only topics in effect at a time.
+
+(c) 2023 Scintilla. All rights reserved.
+Unauthorized reproduction, distribution, or disclosure of this material is strictly
+prohibited without the express written permission of Scintilla.
+"""
+
+from typing import List, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from data_pipeline.extractors.change_filter import CHANGE_KEY_METADATA, LAST_SEEN_COLUMN
+from data_pipeline.extractors.writers.parquet_writer import load_topic
+
+
+def _key_columns(table: pa.Table) -> List[str]:
+    """
+    Read the columns identifying the rows of a message from the schema of a change-only topic.
+
+    Args:
+        table (pa.Table): Rows of the topic.
+
+    Returns:
+        List[str]: Key columns, empty for one row per message.
+    """
+    keys = (table.schema.metadata or {}).get(CHANGE_KEY_METADATA, b'')
+    return [name for name in keys.decode().split(',') if name]
+
+
+def load_changes(log_directory: str, topic: str, start_time: Optional[int] = None, end_time: Optional[int] = None) -> pa.Table:
+    """
+    Load the rows of a change-only topic seen within a time range.
+
+    Args:
+        log_directory (str): Root directory of the extracted log.
+        topic (str): Name of the topic.
+        start_time (int, optional): Start of the range, in nanoseconds.
+        end_time (int, optional): End of the range, in nanoseconds.
+
+    Returns:
+        pa.Table: Rows whose interval from their log time to their last seen time overlaps the range, sorted by log time.
+
+    Raises:
+        FileNotFoundError: If the topic has no part file.
+    """
+    table = load_topic(log_directory, topic, end_time=end_time)
+    if start_time is None:
+        return table
+    return table.filter(pc.greater_equal(table.column(LAST_SEEN_COLUMN), start_time))
+
+
+def load_value_at(log_directory: str, topic: str, timestamp: int) -> pa.Table:
+    """
+    Load the rows of a change-only topic in effect at a time.
+
+    The row in effect is the last one logged at or before the time, for every key of
+    the topic, such as the child frame of a static transform. Rows stay in effect
+    after they were last seen, as latched topics are only published once.
+
+    Args:
+        log_directory (str): Root directory of the extracted log.
+        topic (str): Name of the topic.
+        timestamp (int): Log time to look up, in nanoseconds.
+
+    Returns:
+        pa.Table: One row per key, empty if nothing was logged before the time.
+
+    Raises:
+        FileNotFoundError: If the topic has no part file.
+    """
+    table = load_topic(log_directory, topic, end_time=timestamp)
+    keys = _key_columns(table)
+    if table.num_rows == 0 or not keys:
+        return table.slice(max(table.num_rows - 1, 0))
+
+    # Rows are sorted by log time, so the last occurrence of every key is the one in effect
+    last = {}
+    for index, key in enumerate(zip(*[table.column(name).to_pylist() for name in keys])):
+        last[key] = index
+    return table.take(pa.array(np.sort(list(last.values())), type=pa.int64()))
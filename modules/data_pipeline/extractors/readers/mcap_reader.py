@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+
+"""
+Read MCAP files through their chunk index, decoding chunks in parallel.
+
+(c) 2023 Scintilla. All rights reserved.
+Unauthorized reproduction, distribution, or disclosure of this material is strictly
+prohibited without the express written permission of Scintilla.
+"""
+
+import heapq
+import io
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+from mcap.reader import make_reader
+from mcap.records import Chunk, ChunkIndex, Message
+from mcap.stream_reader import breakup_chunk
+from mcap.data_stream import ReadDataStream
+from rclpy.serialization import deserialize_message
+from rosidl_runtime_py.utilities import get_message
+
+from common.oslibs import info, warning
+
+DEFAULT_READER_THREADS = 4
+DEFAULT_PREFETCH_CHUNKS = 8
+
+# Opcode byte and record length preceding the body of every MCAP record
+RECORD_PREFIX_SIZE = 9
+
+# A decoded message is its log time, its topic, its message and its message class
+DecodedMessage = Tuple[int, str, Any, Any]
+
+
+def plan_chunks(
+    chunk_indexes: List[ChunkIndex],
+    channel_ids: Set[int],
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None
+) -> List[ChunkIndex]:
+    """
+    Select the chunks holding messages of the requested channels and time range.
+
+    Chunks without message indexes cannot be ruled out by channel and are kept.
+
+    Args:
+        chunk_indexes (List[ChunkIndex]): Chunk indexes of the summary section.
+        channel_ids (Set[int]): Identifiers of the requested channels.
+        start_time (int, optional): First log time to read, in nanoseconds.
+        end_time (int, optional): Last log time to read, in nanoseconds.
+
+    Returns:
+        List[ChunkIndex]: Selected chunks, sorted by their first log time.
+    """
+    planned = []
+    for chunk_index in chunk_indexes:
+        if start_time is not None and chunk_index.message_end_time < start_time:
+            continue
+        if end_time is not None and chunk_index.message_start_time > end_time:
+            continue
+        if chunk_index.message_index_offsets and channel_ids.isdisjoint(chunk_index.message_index_offsets):
+            continue
+        planned.append(chunk_index)
+    return sorted(planned, key=lambda chunk_index: (chunk_index.message_start_time, chunk_index.chunk_start_offset))
+
+
+class McapChunkReader:
+    """
+    Read the messages of selected topics from an indexed MCAP file.
+
+    The summary section and its chunk index are used to plan which chunks hold the
+    requested topics and time range; the other chunks are never read. Planned chunks
+    are read, decompressed and deserialized by a thread pool, a bounded number of
+    chunks ahead of the consumer, while messages are still yielded in log-time order.
+    """
+
+    def __init__(
+        self,
+        input_bag: str,
+        num_threads: int = DEFAULT_READER_THREADS,
+        prefetch_chunks: int = DEFAULT_PREFETCH_CHUNKS
+    ) -> None:
+        """
+        Initialize the McapChunkReader.
+
+        Args:
+            input_bag (str): Path to the MCAP file.
+            num_threads (int): Number of threads decoding chunks.
+            prefetch_chunks (int): Maximum number of chunks decoded ahead of the consumer.
+
+        Returns:
+            None
+        """
+        self.input_bag = input_bag
+        self.num_threads = num_threads
+        self.prefetch_chunks = max(1, prefetch_chunks)
+
+    def read(
+        self,
+        topics: List[str],
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        raw_types: Optional[Set[str]] = None,
+        deserialize: bool = True
+    ) -> Iterator[Tuple[str, Any, Any, int]]:
+        """
+        Read the messages of the given topics in log-time order.
+
+        Args:
+            topics (List[str]): List of topic names to read.
+            start_time (int, optional): First log time to read, in nanoseconds.
+            end_time (int, optional): Last log time to read, in nanoseconds.
+            raw_types (Set[str], optional): Type names, such as 'sensor_msgs/msg/Imu', yielded serialized.
+            deserialize (bool): Whether to deserialize the messages of the other types.
+
+        Yields:
+            Tuple[str, Any, Any, int]: A tuple containing topic name, message, message type, and timestamp.
+        """
+        with open(self.input_bag, 'rb') as file:
+            summary = make_reader(file).get_summary()
+            if summary is None or not summary.chunk_indexes:
+                warning(f'{self.input_bag} has no chunk index, reading it sequentially')
+                yield from self._read_sequentially(file, topics, start_time, end_time, raw_types, deserialize)
+                return
+
+            channels = self._resolve_channels(summary, topics, raw_types, deserialize)
+            planned = plan_chunks(summary.chunk_indexes, set(channels), start_time, end_time)
+            info(f'Reading {len(planned)} of {len(summary.chunk_indexes)} chunks of {self.input_bag}')
+
+            with ThreadPoolExecutor(max_workers=self.num_threads) as executor:
+                yield from self._merge(executor, file.fileno(), planned, channels, start_time, end_time)
+
+    def _resolve_channels(
+        self,
+        summary: Any,
+        topics: List[str],
+        raw_types: Optional[Set[str]],
+        deserialize: bool
+    ) -> Dict[int, Tuple[str, Any, bool]]:
+        """
+        Resolve the topic, message class and raw flag of every requested channel.
+
+        Args:
+            summary (mcap.records.Summary): Summary section of the file.
+            topics (List[str]): List of topic names to read.
+            raw_types (Set[str], optional): Type names yielded serialized.
+            deserialize (bool): Whether to deserialize the messages of the other types.
+
+        Returns:
+            Dict[int, Tuple[str, Any, bool]]: Topic, message class and raw flag per channel identifier.
+        """
+        requested = set(topics)
+        channels = {}
+        for channel_id, channel in summary.channels.items():
+            if channel.topic in requested:
+                type_name = summary.schemas[channel.schema_id].name
+                channels[channel_id] = (channel.topic, get_message(type_name), not deserialize or type_name in (raw_types or set()))
+
+        for topic in requested.difference(topic for topic, _, _ in channels.values()):
+            warning(f"topic {topic} not in bag")
+        return channels
+
+    def _merge(
+        self,
+        executor: ThreadPoolExecutor,
+        descriptor: int,
+        planned: List[ChunkIndex],
+        channels: Dict[int, Tuple[str, Any, bool]],
+        start_time: Optional[int],
+        end_time: Optional[int]
+    ) -> Iterator[Tuple[str, Any, Any, int]]:
+        """
+        Decode the planned chunks ahead of the consumer and merge them in log-time order.
+
+        Chunks are consumed in order of their first log time, so once a chunk is
+        decoded, no message logged before the start of the next chunk is still
+        missing; those messages are released. Chunks that do not overlap, the common
+        case, are yielded directly without going through the heap.
+
+        Args:
+            executor (ThreadPoolExecutor): Pool decoding the chunks.
+            descriptor (int): File descriptor of the MCAP file.
+            planned (List[ChunkIndex]): Chunks to read, sorted by their first log time.
+            channels (Dict[int, Tuple[str, Any, bool]]): Topic, message class and raw flag per channel.
+            start_time (int, optional): First log time to read, in nanoseconds.
+            end_time (int, optional): Last log time to read, in nanoseconds.
+
+        Yields:
+            Tuple[str, Any, Any, int]: A tuple containing topic name, message, message type, and timestamp.
+        """
+        pending: Deque[Future] = deque()
+        next_chunk = 0
+        heap: List[Tuple[int, int, int, str, Any, Any]] = []
+
+        for position in range(len(planned)):
+            while next_chunk < len(planned) and len(pending) < self.prefetch_chunks:
+                pending.append(executor.submit(decode_chunk, descriptor, planned[next_chunk], channels, start_time, end_time))
+                next_chunk += 1
+            messages = pending.popleft().result()
+
+            bound = planned[position + 1].message_start_time if position + 1 < len(planned) else None
+            if not heap and messages and (bound is None or messages[-1][0] < bound):
+                for log_time, topic, msg, msg_type in messages:
+                    yield topic, msg, msg_type, log_time
+                continue
+
+            for sequence, (log_time, topic, msg, msg_type) in enumerate(messages):
+                heapq.heappush(heap, (log_time, position, sequence, topic, msg, msg_type))
+            while heap and (bound is None or heap[0][0] < bound):
+                log_time, _, _, topic, msg, msg_type = heapq.heappop(heap)
+                yield topic, msg, msg_type, log_time
+
+    def _read_sequentially(
+        self,
+        file: io.BufferedReader,
+        topics: List[str],
+        start_time: Optional[int],
+        end_time: Optional[int],
+        raw_types: Optional[Set[str]],
+        deserialize: bool
+    ) -> Iterator[Tuple[str, Any, Any, int]]:
+        """
+        Read an MCAP file without chunk index from start to end.
+
+        Args:
+            file (io.BufferedReader): Open MCAP file.
+            topics (List[str]): List of topic names to read.
+            start_time (int, optional): First log time to read, in nanoseconds.
+            end_time (int, optional): Last log time to read, in nanoseconds.
+            raw_types (Set[str], optional): Type names yielded serialized.
+            deserialize (bool): Whether to deserialize the messages of the other types.
+
+        Yields:
+            Tuple[str, Any, Any, int]: A tuple containing topic name, message, message type, and timestamp.
+        """
+        file.seek(0)
+        message_types: Dict[str, Any] = {}
+        end = end_time + 1 if end_time is not None else None
+        for schema, channel, message in make_reader(file).iter_messages(topics, start_time, end, log_time_order=True):
+            if schema.name not in message_types:
+                message_types[schema.name] = get_message(schema.name)
+            msg_type = message_types[schema.name]
+            raw = not deserialize or schema.name in (raw_types or set())
+            msg = message.data if raw else deserialize_message(message.data, msg_type)
+            yield channel.topic, msg, msg_type, message.log_time
+
+
+def decode_chunk(
+    descriptor: int,
+    chunk_index: ChunkIndex,
+    channels: Dict[int, Tuple[str, Any, bool]],
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None
+) -> List[DecodedMessage]:
+    """
+    Read, decompress and deserialize the requested messages of a chunk.
+
+    The chunk is read with a positioned read, so threads share the file descriptor.
+
+    Args:
+        descriptor (int): File descriptor of the MCAP file.
+        chunk_index (ChunkIndex): Index entry of the chunk.
+        channels (Dict[int, Tuple[str, Any, bool]]): Topic, message class and raw flag per channel.
+        start_time (int, optional): First log time to read, in nanoseconds.
+        end_time (int, optional): Last log time to read, in nanoseconds.
+
+    Returns:
+        List[DecodedMessage]: Log time, topic, message and message class, sorted by log time.
+    """
+    record = os.pread(descriptor, chunk_index.chunk_length, chunk_index.chunk_start_offset)
+    chunk = Chunk.read(ReadDataStream(io.BytesIO(record[RECORD_PREFIX_SIZE:])))
+
+    messages = []
+    for message in breakup_chunk(chunk):
+        if not isinstance(message, Message) or message.channel_id not in channels:
+            continue
+        if start_time is not None and message.log_time < start_time:
+            continue
+        if end_time is not None and message.log_time > end_time:
+            continue
+        topic, msg_type, raw = channels[message.channel_id]
+        msg = message.data if raw else deserialize_message(message.data, msg_type)
+        messages.append((message.log_time, topic, msg, msg_type))
+
+    messages.sort(key=lambda decoded: decoded[0])
+    return messages
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+"""
+Reconstruct accumulated paths from their delta encoded rows.
+
+(c) 2023 Scintilla. All rights reserved.
+Unauthorized reproduction, distribution, or disclosure of this material is strictly
+prohibited without the express written permission of Scintilla.
+"""
+
+from typing import Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from data_pipeline.extractors.writers.parquet_writer import LOG_TIME_COLUMN, list_part_files, load_topic, topic_to_directory
+
+# Columns of a path topic converted in delta mode: whether the rows of a message are a
+# full snapshot of the path, and the number of poses of the path after the message
+PATH_SNAPSHOT_COLUMN = 'delta/snapshot'
+PATH_SIZE_COLUMN = 'delta/path_size'
+
+
+def load_path(log_directory: str, topic: str, timestamp: Optional[int] = None) -> pa.Table:
+    """
+    Load the poses of a path topic as published by its last message at a timestamp.
+
+    For a delta encoded topic, only the rows from the last snapshot up to the
+    timestamp are read: the new poses of every message are appended to the path, and
+    the poses dropped from its front are trimmed using its size. For a topic stored
+    in full, the rows of the last message are read.
+
+    Args:
+        log_directory (str): Root directory of the extracted log.
+        topic (str): Name of the path topic.
+        timestamp (int, optional): Log time to reconstruct the path at, in nanoseconds, the end of the log by default.
+
+    Returns:
+        pa.Table: One row per pose of the path, empty if no message was logged before the timestamp.
+
+    Raises:
+        FileNotFoundError: If the topic has no part file.
+    """
+    paths = list_part_files(topic_to_directory(log_directory, topic))
+    if not paths:
+        raise FileNotFoundError(f'No parquet parts for {topic} in {log_directory}')
+    schema = pq.read_schema(paths[0])
+
+    if PATH_SNAPSHOT_COLUMN not in schema.names:
+        log_times = load_topic(log_directory, topic, end_time=timestamp, columns=[LOG_TIME_COLUMN]).column(LOG_TIME_COLUMN)
+        if len(log_times) == 0:
+            return schema.empty_table()
+        last = pc.max(log_times).as_py()
+        return load_topic(log_directory, topic, last, last)
+
+    index = load_topic(log_directory, topic, end_time=timestamp, columns=[LOG_TIME_COLUMN, PATH_SNAPSHOT_COLUMN])
+    snapshots = index.filter(index.column(PATH_SNAPSHOT_COLUMN)).column(LOG_TIME_COLUMN)
+    if len(snapshots) == 0:
+        return schema.empty_table()
+
+    rows = load_topic(log_directory, topic, pc.max(snapshots).as_py(), timestamp)
+    log_times = rows.column(LOG_TIME_COLUMN).to_numpy()
+    is_snapshot = rows.column(PATH_SNAPSHOT_COLUMN).to_numpy(zero_copy_only=False)
+    sizes = rows.column(PATH_SIZE_COLUMN).to_numpy()
+
+    # Replay the messages in order, keeping the row indices of the current path
+    bounds = [0, *(np.flatnonzero(np.diff(log_times)) + 1).tolist(), len(log_times)]
+    path = np.empty(0, dtype=np.int64)
+    for begin, end in zip(bounds[:-1], bounds[1:]):
+        poses = np.arange(begin, end)
+        path = poses if is_snapshot[begin] else np.concatenate([path, poses])
+        path = path[max(len(path) - int(sizes[begin]), 0):]
+    return rows.take(pa.array(path, type=pa.int64()))
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+
+"""
+Look up transforms between any two frames of an extracted log at many times at once.
+
+(c) 2023 Scintilla. All rights reserved.
+Unauthorized reproduction, distribution, or disclosure of this material is strictly
+prohibited without the express written permission of Scintilla.
+"""
+
+import os
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from data_pipeline.extractors.writers.tf_index import TF_INDEX_FILE, write_tf_index
+
+# Rotations closer than this, as the sine of their angle, are interpolated linearly
+SLERP_THRESHOLD = 1e-6
+
+
+def _quaternion_multiply(q0: np.ndarray, q1: np.ndarray) -> np.ndarray:
+    """
+    Compose rotations given as (x, y, z, w) quaternions.
+
+    Args:
+        q0 (np.ndarray): Outer rotations, of shape (n, 4).
+        q1 (np.ndarray): Inner rotations, of shape (n, 4).
+
+    Returns:
+        np.ndarray: Rotations q0 * q1, of shape (n, 4).
+    """
+    x0, y0, z0, w0 = q0.T
+    x1, y1, z1, w1 = q1.T
+    return np.stack([
+        w0 * x1 + x0 * w1 + y0 * z1 - z0 * y1,
+        w0 * y1 - x0 * z1 + y0 * w1 + z0 * x1,
+        w0 * z1 + x0 * y1 - y0 * x1 + z0 * w1,
+        w0 * w1 - x0 * x1 - y0 * y1 - z0 * z1,
+    ], axis=1)
+
+
+def _rotate(q: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """
+    Rotate vectors by (x, y, z, w) quaternions.
+
+    Args:
+        q (np.ndarray): Unit rotations, of shape (n, 4).
+        v (np.ndarray): Vectors, of shape (n, 3).
+
+    Returns:
+        np.ndarray: Rotated vectors, of shape (n, 3).
+    """
+    u, w = q[:, :3], q[:, 3:]
+    uv = np.cross(u, v)
+    return v + 2.0 * (w * uv + np.cross(u, uv))
+
+
+def _compose(
+    outer: Tuple[np.ndarray, np.ndarray],
+    inner: Tuple[np.ndarray, np.ndarray]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Chain transforms, applying the inner transforms first.
+
+    Args:
+        outer (Tuple[np.ndarray, np.ndarray]): Translations and rotations of the outer transforms.
+        inner (Tuple[np.ndarray, np.ndarray]): Translations and rotations of the inner transforms.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Translations and rotations of the chained transforms.
+    """
+    return outer[0] + _rotate(outer[1], inner[0]), _quaternion_multiply(outer[1], inner[1])
+
+
+def _invert(transform: Tuple[np.ndarray, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Invert transforms.
+
+    Args:
+        transform (Tuple[np.ndarray, np.ndarray]): Translations and rotations.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Translations and rotations of the inverse transforms.
+    """
+    conjugate = transform[1] * np.array([-1.0, -1.0, -1.0, 1.0])
+    return -_rotate(conjugate, transform[0]), conjugate
+
+
+def _slerp(q0: np.ndarray, q1: np.ndarray, alpha: np.ndarray) -> np.ndarray:
+    """
+    Interpolate rotations along the shortest arc.
+
+    Args:
+        q0 (np.ndarray): Rotations at the start, of shape (n, 4).
+        q1 (np.ndarray): Rotations at the end, of shape (n, 4).
+        alpha (np.ndarray): Interpolation factors in [0, 1], of shape (n,).
+
+    Returns:
+        np.ndarray: Unit rotations, of shape (n, 4).
+    """
+    dot = np.sum(q0 * q1, axis=1)
+    q1 = np.where(dot[:, None] < 0.0, -q1, q1)
+    theta = np.arccos(np.clip(np.abs(dot), 0.0, 1.0))
+    sine = np.sin(theta)
+    linear = sine < SLERP_THRESHOLD
+    safe_sine = np.where(linear, 1.0, sine)
+    w0 = np.where(linear, 1.0 - alpha, np.sin((1.0 - alpha) * theta) / safe_sine)
+    w1 = np.where(linear, alpha, np.sin(alpha * theta) / safe_sine)
+    q = w0[:, None] * q0 + w1[:, None] * q1
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+
+class TFBuffer:
+    """
+    Transforms of an extracted log, from its TF index.
+
+    Every edge of the frame tree holds the samples of one parent to child transform,
+    sorted by header stamp. `lookup_transform` chains the edges between two frames,
+    cached per pair of frames, and interpolates every dynamic edge at all the
+    requested times at once: translations linearly and rotations with SLERP. Static
+    edges hold a single transform and skip the time search.
+    """
+
+    def __init__(self, index: Dict[str, np.ndarray]) -> None:
+        """
+        Initialize the TFBuffer.
+
+        Args:
+            index (Dict[str, np.ndarray]): Arrays written by write_tf_index.
+
+        Returns:
+            None
+        """
+        self._static = index['static']
+        self._offsets = index['offsets']
+        self._times = index['times']
+        self._translations = index['translations']
+        self._rotations = index['rotations']
+        self._parents = [str(parent) for parent in index['parents']]
+
+        # Parent edge of every frame, the last published edge winning if a frame has several parents
+        self._edges = {str(child): edge for edge, child in enumerate(index['children'])}
+        self._chains: Dict[Tuple[str, str], Tuple[List[int], List[int]]] = {}
+
+    @classmethod
+    def from_log(cls, log_directory: str) -> 'TFBuffer':
+        """
+        Load the TF index of an extracted log, writing it first if it is missing.
+
+        Args:
+            log_directory (str): Root directory of the extracted log.
+
+        Returns:
+            TFBuffer: Transforms of the log.
+
+        Raises:
+            FileNotFoundError: If the log has no extracted TF topic.
+        """
+        path = os.path.join(log_directory, TF_INDEX_FILE)
+        if not os.path.exists(path) and write_tf_index(log_directory) is None:
+            raise FileNotFoundError(f'No TF topics extracted in {log_directory}')
+        with np.load(path) as index:
+            return cls(dict(index))
+
+    @property
+    def frames(self) -> List[str]:
+        """
+        Return the frames of the tree.
+
+        Returns:
+            List[str]: Every parent and child frame, sorted.
+        """
+        return sorted(set(self._parents) | set(self._edges))
+
+    def lookup_transform(
+        self,
+        target_frame: str,
+        source_frame: str,
+        times: Union[int, Sequence[int], np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Look up the transform from a source frame to a target frame at many times.
+
+        The transform maps source coordinates to target coordinates: a point p of the
+        source frame is `rotate(rotation, p) + translation` in the target frame.
+
+        Args:
+            target_frame (str): Frame to express the transform in.
+            source_frame (str): Frame to transform from.
+            times (int or array): Header stamps to look up, in nanoseconds.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Translations of shape (n, 3) and (x, y, z, w) rotations of shape (n, 4), NaN at the times outside of the samples of a dynamic edge.
+
+        Raises:
+            ValueError: If a frame is unknown or the frames are not connected.
+        """
+        times = np.atleast_1d(np.asarray(times, dtype=np.int64))
+        source_edges, target_edges = self._chain(target_frame, source_frame)
+        source = self._identity(len(times))
+        for edge in source_edges:
+            source = _compose(self._sample(edge, times), source)
+        target = self._identity(len(times))
+        for edge in target_edges:
+            target = _compose(self._sample(edge, times), target)
+        return _compose(_invert(target), source)
+
+    def _chain(self, target_frame: str, source_frame: str) -> Tuple[List[int], List[int]]:
+        """
+        Find the edges from both frames up to their closest common ancestor.
+
+        Args:
+            target_frame (str): Frame to express the transform in.
+            source_frame (str): Frame to transform from.
+
+        Returns:
+            Tuple[List[int], List[int]]: Edges from the source frame and from the target frame, child first.
+
+        Raises:
+            ValueError: If a frame is unknown or the frames are not connected.
+        """
+        chain = self._chains.get((target_frame, source_frame))
+        if chain is not None:
+            return chain
+
+        known = set(self._parents) | set(self._edges)
+        for frame in (target_frame, source_frame):
+            if frame not in known:
+                raise ValueError(f'Unknown frame {frame}')
+
+        source_path = self._ancestors(source_frame)
+        target_path = self._ancestors(target_frame)
+        source_frames = [frame for frame, _ in source_path]
+        common = next((frame for frame, _ in target_path if frame in source_frames), None)
+        if common is None:
+            raise ValueError(f'Frames {target_frame} and {source_frame} are not connected')
+
+        target_frames = [frame for frame, _ in target_path]
+        chain = (
+            [edge for _, edge in source_path[:source_frames.index(common)]],
+            [edge for _, edge in target_path[:target_frames.index(common)]],
+        )
+        self._chains[(target_frame, source_frame)] = chain
+        return chain
+
+    def _ancestors(self, frame: str) -> List[Tuple[str, int]]:
+        """
+        List a frame and its ancestors up to the root of its tree.
+
+        Args:
+            frame (str): Frame to start from.
+
+        Returns:
+            List[Tuple[str, int]]: Every frame with the edge to its parent, -1 for the root.
+        """
+        path = []
+        visited = set()
+        while frame not in visited:
+            visited.add(frame)
+            edge = self._edges.get(frame, -1)
+            path.append((frame, edge))
+            if edge < 0:
+                break
+            frame = self._parents[edge]
+        return path
+
+    def _sample(self, edge: int, times: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Interpolate the transform of an edge at the given times.
+
+        Args:
+            edge (int): Index of the edge.
+            times (np.ndarray): Header stamps, in nanoseconds.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Parent from child translations and rotations at every time.
+        """
+        begin, end = self._offsets[edge], self._offsets[edge + 1]
+        if self._static[edge]:
+            return (
+                np.broadcast_to(self._translations[begin], (len(times), 3)),
+                np.broadcast_to(self._rotations[begin], (len(times), 4)),
+            )
+
+        edge_times = self._times[begin:end]
+        following = np.searchsorted(edge_times, times, side='right')
+        lower = np.clip(following - 1, 0, len(edge_times) - 1)
+        upper = np.clip(following, 0, len(edge_times) - 1)
+        span = (edge_times[upper] - edge_times[lower]).astype(np.float64)
+        alpha = np.where(span > 0, (times - edge_times[lower]) / np.where(span > 0, span, 1.0), 0.0)
+
+        translations = self._translations[begin:end]
+        rotations = self._rotations[begin:end]
+        translation = translations[lower] + alpha[:, None] * (translations[upper] - translations[lower])
+        rotation = _slerp(rotations[lower], rotations[upper], alpha)
+
+        outside = (times < edge_times[0]) | (times > edge_times[-1])
+        translation[outside] = np.nan
+        rotation[outside] = np.nan
+        return translation, rotation
+
+    @staticmethod
+    def _identity(size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return identity transforms.
+
+        Args:
+            size (int): Number of transforms.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Zero translations and unit rotations.
+        """
+        return np.zeros((size, 3)), np.tile([0.0, 0.0, 0.0, 1.0], (size, 1))
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+
+"""
+Hand image and point cloud payloads to worker processes through shared memory.
+
+(c) 2023 Scintilla. All rights reserved.
+Unauthorized reproduction, distribution, or disclosure of this material is strictly
+prohibited without the express written permission of Scintilla.
+"""
+
+import multiprocessing
+import os
+import queue
+from concurrent.futures import Future, ProcessPoolExecutor
+from importlib import import_module
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import cv2
+import numpy as np
+import open3d as o3d
+import yaml
+from stereo_msgs.msg import DisparityImage
+
+from data_pipeline.extractors.convertors.convertor_interface import ConvertorInterface
+
+DEFAULT_FRAME_WORKERS = 0
+DEFAULT_FRAME_SLOTS = 16
+DEFAULT_FRAME_SLOT_BYTES = 16 * 1024 * 1024
+
+# Functions writing a converted frame, by file extension, returning False on failure
+FRAME_WRITERS = {
+    '.png': cv2.imwrite,
+    '.pcd': o3d.io.write_point_cloud,
+}
+
+# Shared memory blocks of the current worker process, and its convertors by serialized configuration
+_attached: Dict[str, SharedMemory] = {}
+_convertors: Dict[str, ConvertorInterface] = {}
+
+
+class FrameHandle(NamedTuple):
+    """
+    Location of a payload in a shared memory block.
+    """
+    name: str
+    slot: int
+    offset: int
+    size: int
+
+
+class SharedFrameRing:
+    """
+    Fixed number of equally sized payload slots in one shared memory block.
+
+    A payload is copied once into a free slot, and only its handle crosses the
+    process boundary. Writing blocks while every slot is in use, which bounds the
+    frames in flight; a slot is recycled by `release` once its frame is written.
+    """
+
+    def __init__(self, num_slots: int = DEFAULT_FRAME_SLOTS, slot_bytes: int = DEFAULT_FRAME_SLOT_BYTES) -> None:
+        """
+        Initialize the SharedFrameRing.
+
+        Args:
+            num_slots (int): Number of slots.
+            slot_bytes (int): Size of every slot, in bytes.
+
+        Returns:
+            None
+        """
+        self.num_slots = num_slots
+        self.slot_bytes = slot_bytes
+        self._memory = SharedMemory(create=True, size=num_slots * slot_bytes)
+        self._free: queue.Queue = queue.Queue()
+        for slot in range(num_slots):
+            self._free.put(slot)
+
+    def write(self, payload: Any) -> Optional[FrameHandle]:
+        """
+        Copy a payload into a free slot, blocking until one is available.
+
+        Args:
+            payload (Any): Buffer holding the payload.
+
+        Returns:
+            FrameHandle: Handle of the slot, or None if the payload is larger than a slot.
+        """
+        data = np.frombuffer(payload, dtype=np.uint8)
+        if len(data) > self.slot_bytes:
+            return None
+
+        slot = self._free.get()
+        offset = slot * self.slot_bytes
+        np.frombuffer(self._memory.buf, dtype=np.uint8, count=len(data), offset=offset)[:] = data
+        return FrameHandle(self._memory.name, slot, offset, len(data))
+
+    def release(self, handle: FrameHandle) -> None:
+        """
+        Recycle the slot of a written frame.
+
+        Args:
+            handle (FrameHandle): Handle returned by `write`.
+
+        Returns:
+            None
+        """
+        self._free.put(handle.slot)
+
+    def close(self) -> None:
+        """
+        Close and remove the shared memory block.
+
+        Returns:
+            None
+        """
+        self._memory.close()
+        self._memory.unlink()
+
+
+def frame_view(handle: FrameHandle) -> memoryview:
+    """
+    Map the payload of a handle without copying it, attaching its block once per process.
+
+    Args:
+        handle (FrameHandle): Handle of the payload.
+
+    Returns:
+        memoryview: View on the payload.
+    """
+    memory = _attached.get(handle.name)
+    if memory is None:
+        memory = SharedMemory(name=handle.name)
+        _attached[handle.name] = memory
+    return memory.buf[handle.offset:handle.offset + handle.size]
+
+
+def _worker_convertor(config: Dict[str, Any]) -> ConvertorInterface:
+    """
+    Instantiate a convertor once per worker process and configuration.
+
+    Topics converted by the same class with other settings get convertors of their own.
+
+    Args:
+        config (dict): Convertor configuration holding the class path under 'name'.
+
+    Returns:
+        ConvertorInterface: The convertor.
+    """
+    key = yaml.safe_dump(config, sort_keys=True)
+    convertor = _convertors.get(key)
+    if convertor is None:
+        module_name, class_name = config['name'].rsplit('.', 1)
+        convertor = getattr(import_module(module_name), class_name)(config)
+        _convertors[key] = convertor
+    return convertor
+
+
+def write_frame(path: str, frame: Any) -> None:
+    """
+    Write a converted frame to a file.
+
+    Args:
+        path (str): File the frame is written to; its extension selects the writer.
+        frame (Any): Pixels of an image, or Open3D point cloud.
+
+    Returns:
+        None
+
+    Raises:
+        IOError: If the frame could not be written.
+    """
+    if not FRAME_WRITERS[os.path.splitext(path)[1]](path, frame):
+        raise IOError(f'Could not write {path}')
+
+
+def encode_frame(convertor_config: Dict[str, Any], msg: Any, handle: FrameHandle, path: str) -> List[List[Any]]:
+    """
+    Convert a frame from shared memory and write it to a file, in a worker process.
+
+    Args:
+        convertor_config (dict): Configuration of the convertor of the topic.
+        msg (Any): Message without its payload.
+        handle (FrameHandle): Handle of the payload.
+        path (str): File the frame is written to; its extension selects the writer.
+
+    Returns:
+        List[List[Any]]: Converted rows of the message.
+
+    Raises:
+        IOError: If the frame could not be written.
+    """
+    rows, frame = _worker_convertor(convertor_config).convert(msg, frame_view(handle))
+    write_frame(path, frame)
+    return rows
+
+
+class FrameWorkerPool:
+    """
+    Worker processes converting and writing image and point cloud frames.
+
+    Payloads travel through a SharedFrameRing and messages are sent without them,
+    so frames are never pickled. The pool is inert when it has no workers.
+    """
+
+    def __init__(
+        self,
+        num_workers: int = DEFAULT_FRAME_WORKERS,
+        num_slots: int = DEFAULT_FRAME_SLOTS,
+        slot_bytes: int = DEFAULT_FRAME_SLOT_BYTES
+    ) -> None:
+        """
+        Initialize the FrameWorkerPool.
+
+        Args:
+            num_workers (int): Number of worker processes, 0 to disable the pool.
+            num_slots (int): Number of shared memory slots.
+            slot_bytes (int): Size of every slot, in bytes.
+
+        Returns:
+            None
+        """
+        self.enabled = num_workers > 0
+        self._ring = SharedFrameRing(num_slots, slot_bytes) if self.enabled else None
+        # Workers are started from a fork server rather than forked from the extraction, whose
+        # reader, sink and encoder threads may hold locks that a forked child would inherit
+        self._executor = ProcessPoolExecutor(
+            max_workers=num_workers, mp_context=multiprocessing.get_context('forkserver')
+        ) if self.enabled else None
+
+    def __enter__(self) -> 'FrameWorkerPool':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def submit(self, convertor: ConvertorInterface, msg: Any, path: str) -> Optional[Future]:
+        """
+        Move the payload of a message to shared memory and convert it in a worker.
+
+        The payload of the message is emptied once copied. The slot is recycled as
+        soon as the worker has written the file.
+
+        Args:
+            convertor (ConvertorInterface): Convertor of the topic.
+            msg (Any): Image, DisparityImage or PointCloud2 message.
+            path (str): File the frame is written to.
+
+        Returns:
+            Future: Future of the converted rows, or None if the payload does not fit a slot.
+        """
+        holder = msg.image if isinstance(msg, DisparityImage) else msg
+        handle = self._ring.write(holder.data)
+        if handle is None:
+            return None
+        holder.data = b''
+
+        try:
+            future = self._executor.submit(encode_frame, convertor.config, msg, handle, path)
+        except BaseException:
+            self._ring.release(handle)
+            raise
+        future.add_done_callback(lambda _: self._ring.release(handle))
+        return future
+
+    def close(self) -> None:
+        """
+        Wait for the workers to finish and remove the shared memory block.
+
+        Returns:
+            None
+        """
+        if not self.enabled:
+            return
+        try:
+            self._executor.shutdown(wait=True)
+        finally:
+            self._ring.close()
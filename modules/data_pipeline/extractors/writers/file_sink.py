@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+"""
+Asynchronous sink encoding images and point clouds to files.
+
+(c) 2023 Scintilla. All rights reserved.
+Unauthorized reproduction, distribution, or disclosure of this material is strictly
+prohibited without the express written permission of Scintilla.
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+DEFAULT_SINK_THREADS = 4
+DEFAULT_SINK_MAX_PENDING = 32
+
+
+class AsyncFileSink:
+    """
+    Bounded thread pool running file encoding jobs off the extraction loop.
+
+    Encoders such as cv2.imwrite and open3d release the GIL, so jobs run in parallel
+    with reading and converting. At most `max_pending` jobs are queued or running;
+    submitting more blocks the caller until a slot frees up, which keeps the memory
+    held by pending frames capped.
+    """
+
+    def __init__(self, num_threads: int = DEFAULT_SINK_THREADS, max_pending: int = DEFAULT_SINK_MAX_PENDING) -> None:
+        """
+        Initialize the AsyncFileSink.
+
+        Args:
+            num_threads (int): Number of encoding threads.
+            max_pending (int): Maximum number of queued or running jobs.
+
+        Returns:
+            None
+        """
+        self._executor = ThreadPoolExecutor(max_workers=num_threads, thread_name_prefix='file_sink')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._futures: List[Future] = []
+        self._exception: Optional[BaseException] = None
+
+    def __enter__(self) -> 'AsyncFileSink':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        try:
+            self.wait()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def submit(self, function: Callable, *args: Any) -> None:
+        """
+        Queue an encoding job, blocking while the queue is full.
+
+        Args:
+            function (Callable): Function writing the file.
+            *args: Arguments of the function.
+
+        Returns:
+            None
+
+        Raises:
+            Exception: The first exception raised by an earlier job.
+        """
+        self._raise_on_failure()
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._futures.append(future)
+        future.add_done_callback(self._on_done)
+
+    def wait(self) -> None:
+        """
+        Wait until every submitted job has completed.
+
+        Returns:
+            None
+
+        Raises:
+            Exception: The first exception raised by a job.
+        """
+        with self._lock:
+            futures, self._futures = self._futures, []
+        for future in futures:
+            future.exception()
+        self._raise_on_failure()
+
+    def _on_done(self, future: Future) -> None:
+        """
+        Release the slot of a finished job and remember its failure.
+
+        Args:
+            future (Future): The finished job.
+
+        Returns:
+            None
+        """
+        self._slots.release()
+        with self._lock:
+            if future in self._futures:
+                self._futures.remove(future)
+            if future.exception() is not None and self._exception is None:
+                self._exception = future.exception()
+
+    def _raise_on_failure(self) -> None:
+        """
+        Re-raise the first failure of a job in the calling thread.
+
+        Returns:
+            None
+        """
+        if self._exception is not None:
+            raise self._exception
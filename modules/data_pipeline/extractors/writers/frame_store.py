@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+
+"""
+Content-addressed store of the image frames of an extracted log.
+
+(c) 2023 Scintilla. All rights reserved.
+Unauthorized reproduction, distribution, or disclosure of this material is strictly
+prohibited without the express written permission of Scintilla.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Any, Set, Tuple
+
+import cv2
+import numpy as np
+from stereo_msgs.msg import DisparityImage
+
+# Directory of the store in the extracted log, and the column of the image rows pointing at it
+FRAME_STORE_DIRECTORY = 'frames'
+FRAME_HASH_COLUMN = 'frame_hash'
+
+
+def frame_digest(msg: Any) -> str:
+    """
+    Hash the raw pixels of an image message with their layout.
+
+    Args:
+        msg (Any): Image or DisparityImage message.
+
+    Returns:
+        str: Hexadecimal digest, equal for messages holding the same frame.
+    """
+    image = msg.image if isinstance(msg, DisparityImage) else msg
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f'{image.height}:{image.width}:{image.step}:{image.encoding}:{image.is_bigendian}'.encode())
+    digest.update(image.data)
+    return digest.hexdigest()
+
+
+def temporary_frame_path(path: str) -> str:
+    """
+    Create a file unique to the caller to encode a frame to before it is stored.
+
+    Args:
+        path (str): Path to the file of the frame.
+
+    Returns:
+        str: Path to the empty temporary file, with the extension selecting the encoder kept.
+    """
+    name = os.path.basename(path)[:-len('.png')]
+    descriptor, temporary_path = tempfile.mkstemp(suffix='.tmp.png', prefix=f'{name}.', dir=os.path.dirname(path))
+    os.close(descriptor)
+    return temporary_path
+
+
+def store_frame(temporary_path: str, path: str) -> None:
+    """
+    Move an encoded frame to its path in the store, unless another writer stored it first.
+
+    The frame is linked rather than renamed, so that a frame stored concurrently by
+    another process, such as the extraction of another shard of the topics, is kept
+    and this copy is dropped.
+
+    Args:
+        temporary_path (str): File the frame was encoded to, from `temporary_frame_path`.
+        path (str): Path to the file of the frame.
+
+    Returns:
+        None
+    """
+    try:
+        os.link(temporary_path, path)
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(temporary_path)
+
+
+def frame_path(log_directory: str, digest: str) -> str:
+    """
+    Return the path of a frame in the store of a log.
+
+    Args:
+        log_directory (str): Root directory of the extracted log.
+        digest (str): Hash of the frame.
+
+    Returns:
+        str: Path to the PNG file of the frame.
+    """
+    return os.path.join(log_directory, FRAME_STORE_DIRECTORY, digest[:2], f'{digest}.png')
+
+
+def load_frame(log_directory: str, digest: str) -> np.ndarray:
+    """
+    Read a frame of the store of a log.
+
+    Args:
+        log_directory (str): Root directory of the extracted log.
+        digest (str): Hash of the frame, from the frame_hash column of an image topic.
+
+    Returns:
+        np.ndarray: Pixels of the frame, with their stored depth and channels.
+
+    Raises:
+        FileNotFoundError: If the frame is not in the store.
+    """
+    path = frame_path(log_directory, digest)
+    frame = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if frame is None:
+        raise FileNotFoundError(f'No frame {digest} in {log_directory}')
+    return frame
+
+
+class FrameStore:
+    """
+    PNG files of the image frames of a log, stored once per distinct frame.
+
+    Frames are named after the hash of their raw pixels, so identical frames of
+    different topics, such as the rectified left and rgb images, or repeated frames of
+    a topic, are encoded and written once. Frames are claimed before being encoded,
+    once per process, and every writer encodes to a file of its own before linking it
+    into the store, so a frame present in the store is complete and processes
+    extracting other topics of the log keep the first copy of a frame.
+    """
+
+    def __init__(self, output_directory: str) -> None:
+        """
+        Initialize the FrameStore.
+
+        Args:
+            output_directory (str): Root directory of the extracted log.
+
+        Returns:
+            None
+        """
+        self.output_directory = output_directory
+        self._claimed: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def claim(self, digest: str) -> Tuple[str, bool]:
+        """
+        Reserve the file of a frame.
+
+        Args:
+            digest (str): Hash of the frame.
+
+        Returns:
+            Tuple[str, bool]: Path to the file of the frame, and whether the caller must write it.
+        """
+        path = frame_path(self.output_directory, digest)
+        with self._lock:
+            if digest in self._claimed:
+                return path, False
+            self._claimed.add(digest)
+        if os.path.exists(path):
+            # Written by an earlier extraction of the log
+            return path, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path, True
+
+    @staticmethod
+    def write(path: str, frame: np.ndarray) -> None:
+        """
+        Encode a frame to its file in the store.
+
+        Args:
+            path (str): Path returned by `claim`.
+            frame (np.ndarray): Pixels of the frame.
+
+        Returns:
+            None
+
+        Raises:
+            IOError: If the frame could not be encoded.
+        """
+        temporary_path = temporary_frame_path(path)
+        if not cv2.imwrite(temporary_path, frame):
+            os.remove(temporary_path)
+            raise IOError(f'Could not write {path}')
+        store_frame(temporary_path, path)
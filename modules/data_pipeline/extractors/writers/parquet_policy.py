@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+
+"""
+Per-topic encoding, compression and column type policy of the parquet part files.
+
+(c) 2023 Scintilla. All rights reserved.
+Unauthorized reproduction, distribution, or disclosure of this material is strictly
+prohibited without the express written permission of Scintilla.
+"""
+
+import hashlib
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import yaml
+
+# Codecs accepted by pyarrow.parquet, 'none' writes uncompressed pages
+COMPRESSIONS = {'none', 'snappy', 'gzip', 'brotli', 'lz4', 'zstd'}
+
+# Keys of a policy and their values when the configuration does not set them
+DEFAULT_POLICY: Dict[str, Any] = {
+    'compression': 'snappy',
+    'compression_level': None,
+    'dictionary_columns': [],
+    'float32_columns': [],
+    'byte_stream_split_columns': [],
+    'bloom_filter_columns': [],
+    'row_group_size': None,
+}
+
+DICTIONARY_TYPE = pa.dictionary(pa.int32(), pa.string())
+
+
+def _matches(column: str, patterns: List[str]) -> bool:
+    """
+    Check whether a column matches one of the column patterns of a policy.
+
+    A pattern matches either the full column name or its last component, so that
+    'frame_id' matches 'header/frame_id'.
+
+    Args:
+        column (str): Name of the column.
+        patterns (List[str]): Column names or glob patterns.
+
+    Returns:
+        bool: True if the column matches.
+    """
+    leaf = column.rsplit('/', 1)[-1]
+    return any(fnmatchcase(column, pattern) or fnmatchcase(leaf, pattern) for pattern in patterns)
+
+
+def _float32_type(data_type: pa.DataType) -> pa.DataType:
+    """
+    Replace the float64 values of a column type, possibly within lists, by float32.
+
+    Args:
+        data_type (pa.DataType): Type of the column.
+
+    Returns:
+        pa.DataType: Downcast type, the same type if it holds no float64.
+    """
+    if pa.types.is_float64(data_type):
+        return pa.float32()
+    if pa.types.is_fixed_size_list(data_type):
+        return pa.list_(_float32_type(data_type.value_type), data_type.list_size)
+    if pa.types.is_list(data_type):
+        return pa.list_(_float32_type(data_type.value_type))
+    return data_type
+
+
+def _leaf_columns(name: str, data_type: pa.DataType) -> Iterator[Tuple[str, pa.DataType]]:
+    """
+    List the parquet leaf columns of an Arrow column with their value types.
+
+    Args:
+        name (str): Path of the column.
+        data_type (pa.DataType): Type of the column.
+
+    Yields:
+        Tuple[str, pa.DataType]: Parquet column path and value type of every leaf.
+    """
+    if pa.types.is_struct(data_type):
+        for index in range(data_type.num_fields):
+            child = data_type.field(index)
+            yield from _leaf_columns(f'{name}.{child.name}', child.type)
+    elif pa.types.is_list(data_type) or pa.types.is_large_list(data_type) or pa.types.is_fixed_size_list(data_type):
+        yield from _leaf_columns(f'{name}.list.element', data_type.value_type)
+    else:
+        yield name, data_type
+
+
+class ParquetPolicy:
+    """
+    Encoding, compression and column types of the part files of a topic.
+
+    Column lists hold column names or glob patterns matched against the full name
+    or its last component:
+        - dictionary_columns: string columns stored as dictionaries, such as frame_id.
+        - float32_columns: float64 columns, or lists of them, downcast to float32.
+        - byte_stream_split_columns: floating point columns byte-stream-split instead of
+          dictionary encoded, which compresses smooth sensor values better.
+        - bloom_filter_columns: columns getting a bloom filter in every row group.
+    row_group_size overrides the number of rows per row group of the part files.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Initialize the ParquetPolicy.
+
+        Args:
+            config (dict, optional): Keys of the policy, the defaults of DEFAULT_POLICY otherwise.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If a key or the compression codec is unknown.
+        """
+        config = dict(config or {})
+        unknown = set(config) - set(DEFAULT_POLICY)
+        if unknown:
+            raise ValueError(f'Unknown parquet policy keys: {", ".join(sorted(unknown))}')
+        self.config = {**DEFAULT_POLICY, **config}
+        self.compression = str(self.config['compression']).lower()
+        if self.compression not in COMPRESSIONS:
+            raise ValueError(f'Unknown parquet compression {self.compression}, expected one of {", ".join(sorted(COMPRESSIONS))}')
+        self.compression_level = self.config['compression_level']
+        self.dictionary_columns = list(self.config['dictionary_columns'])
+        self.float32_columns = list(self.config['float32_columns'])
+        self.byte_stream_split_columns = list(self.config['byte_stream_split_columns'])
+        self.bloom_filter_columns = list(self.config['bloom_filter_columns'])
+        self.row_group_size = self.config['row_group_size']
+        self._schemas: Dict[pa.Schema, pa.Schema] = {}
+
+    def fingerprint(self) -> str:
+        """
+        Hash the policy, so that topics written with another policy are rebuilt.
+
+        Returns:
+            str: Hexadecimal digest of the policy.
+        """
+        return hashlib.sha256(yaml.safe_dump(self.config, sort_keys=True).encode()).hexdigest()
+
+    def schema(self, schema: pa.Schema) -> pa.Schema:
+        """
+        Map the schema of converted rows to the schema they are stored with.
+
+        Args:
+            schema (pa.Schema): Schema of the converted rows.
+
+        Returns:
+            pa.Schema: Schema with downcast floats and dictionary encoded strings.
+        """
+        stored = self._schemas.get(schema)
+        if stored is None:
+            fields = []
+            for field in schema:
+                data_type = field.type
+                if _matches(field.name, self.float32_columns):
+                    data_type = _float32_type(data_type)
+                if _matches(field.name, self.dictionary_columns) and (pa.types.is_string(data_type) or pa.types.is_large_string(data_type)):
+                    data_type = DICTIONARY_TYPE
+                fields.append(field.with_type(data_type))
+            stored = pa.schema(fields, metadata=schema.metadata)
+            self._schemas[schema] = stored
+        return stored
+
+    def apply(self, batch: pa.RecordBatch) -> pa.RecordBatch:
+        """
+        Cast a record batch of converted rows to the schema it is stored with.
+
+        Args:
+            batch (pa.RecordBatch): Converted rows.
+
+        Returns:
+            pa.RecordBatch: Rows with the types of the policy.
+        """
+        schema = self.schema(batch.schema)
+        if schema.equals(batch.schema):
+            return batch
+        columns = [column.cast(field.type) for column, field in zip(batch.columns, schema)]
+        return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+    def write_options(self, schema: pa.Schema) -> Dict[str, Any]:
+        """
+        Build the keyword arguments of the parquet writer for the stored schema.
+
+        Args:
+            schema (pa.Schema): Stored schema of the rows.
+
+        Returns:
+            Dict[str, Any]: Compression, dictionary, byte stream split and bloom filter options.
+        """
+        options: Dict[str, Any] = {'compression': self.compression}
+        if self.compression_level is not None:
+            options['compression_level'] = self.compression_level
+
+        split_columns = []
+        dictionary_columns = []
+        bloom_columns = []
+        for field in schema:
+            split = _matches(field.name, self.byte_stream_split_columns)
+            bloom = _matches(field.name, self.bloom_filter_columns)
+            for path, value_type in _leaf_columns(field.name, field.type):
+                if split and pa.types.is_floating(value_type):
+                    split_columns.append(path)
+                else:
+                    dictionary_columns.append(path)
+                if bloom:
+                    bloom_columns.append(path)
+
+        if split_columns:
+            # Dictionary encoding takes precedence, so it is disabled on the split columns
+            options['use_byte_stream_split'] = split_columns
+            options['use_dictionary'] = dictionary_columns
+        if bloom_columns:
+            options['bloom_filter_options'] = {path: True for path in bloom_columns}
+        return options
+
+
+class ParquetPolicies:
+    """
+    Parquet policy of every topic, from the parquet_policy block of the extraction configuration.
+
+    The 'default' policy applies to every topic, and the entries of 'topics', keyed by
+    topic name or glob pattern, override its keys in their order of declaration.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Initialize the ParquetPolicies.
+
+        Args:
+            config (dict, optional): parquet_policy block with 'default' and 'topics' keys.
+
+        Returns:
+            None
+        """
+        config = config or {}
+        self.default = dict(config.get('default') or {})
+        self.topics = dict(config.get('topics') or {})
+        self._policies: Dict[str, ParquetPolicy] = {}
+
+    def get(self, topic: str) -> ParquetPolicy:
+        """
+        Resolve the policy of a topic.
+
+        Args:
+            topic (str): Name of the topic.
+
+        Returns:
+            ParquetPolicy: Policy of the topic.
+        """
+        policy = self._policies.get(topic)
+        if policy is None:
+            config = dict(self.default)
+            for pattern, overrides in self.topics.items():
+                if fnmatchcase(topic, pattern):
+                    config.update(overrides or {})
+            policy = ParquetPolicy(config)
+            self._policies[topic] = policy
+        return policy
@@ -0,0 +1,830 @@
+#!/usr/bin/env python3
+
+"""
+Streaming per-topic parquet writers.
+
+(c) 2023 Scintilla. All rights reserved.
+Unauthorized reproduction, distribution, or disclosure of this material is strictly
+prohibited without the express written permission of Scintilla.
+"""
+
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from data_pipeline.extractors.writers.parquet_policy import ParquetPolicies, ParquetPolicy
+from data_pipeline.extractors.writers.writer_pool import WriterPool
+
+DEFAULT_ROW_GROUP_ROWS = 65536
+DEFAULT_ROW_GROUP_BYTES = 64 * 1024 * 1024
+
+# Every committed row group of a tabular topic is written to its own part file
+PART_FILE = 'data-{part:05d}.parquet'
+
+# Bag receive time of the message every row was converted from, in nanoseconds.
+# Part files are sorted by it and split into row groups of DEFAULT_INDEX_ROWS rows,
+# whose statistics let time-range reads skip everything outside the range.
+LOG_TIME_COLUMN = 'log_time'
+DEFAULT_INDEX_ROWS = 8192
+
+# Hive partitioning of tabular topics into bucket=<first log time of the bucket>/part-N.parquet,
+# with part files rolled over at a target size. Parts are numbered across buckets.
+BUCKET_KEY = 'bucket'
+BUCKET_PART_FILE = 'part-{part:05d}.parquet'
+BUCKET_PART_PATTERN = re.compile(r'part-(\d+)\.parquet$')
+BUCKET_WIDTHS = {'minute': 60 * 10**9, 'hour': 3600 * 10**9}
+DEFAULT_PARTITIONING = 'none'
+DEFAULT_TARGET_FILE_BYTES = 128 * 1024 * 1024
+
+
+def topic_to_directory(output_directory: str, topic: str) -> str:
+    """
+    Map a topic name to its directory in the output tree.
+
+    Args:
+        output_directory (str): Root directory of the extracted log.
+        topic (str): Name of the topic.
+
+    Returns:
+        str: Directory holding the extracted data of the topic.
+    """
+    return os.path.join(output_directory, topic.lstrip('/').replace('/', os.path.sep))
+
+
+def part_path(topic_directory: str, part: int) -> str:
+    """
+    Path of a part file of a topic.
+
+    Args:
+        topic_directory (str): Directory of the topic in the output tree.
+        part (int): Index of the part.
+
+    Returns:
+        str: Path of the part file.
+    """
+    return os.path.join(topic_directory, PART_FILE.format(part=part))
+
+
+def bucket_part_path(topic_directory: str, bucket: int, part: int) -> str:
+    """
+    Path of a part file of a topic partitioned by time bucket.
+
+    Args:
+        topic_directory (str): Directory of the topic in the output tree.
+        bucket (int): First log time of the bucket, in nanoseconds.
+        part (int): Index of the part.
+
+    Returns:
+        str: Path of the part file.
+    """
+    return os.path.join(topic_directory, f'{BUCKET_KEY}={bucket}', BUCKET_PART_FILE.format(part=part))
+
+
+def path_bucket(path: str) -> Optional[int]:
+    """
+    Read the time bucket of a part file from its directory name.
+
+    Args:
+        path (str): Path of the part file.
+
+    Returns:
+        int: First log time of the bucket, None if the part is not partitioned.
+    """
+    return _directory_bucket(os.path.basename(os.path.dirname(path)))
+
+
+def _directory_bucket(name: str) -> Optional[int]:
+    """
+    Parse the time bucket of a partition directory name.
+
+    Args:
+        name (str): Name of the directory, such as bucket=1700000040000000000.
+
+    Returns:
+        int: First log time of the bucket, None if the directory is not a partition.
+    """
+    key, _, value = name.partition('=')
+    if key != BUCKET_KEY:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def list_part_files(topic_directory: str) -> List[str]:
+    """
+    List the committed part files of a tabular topic in log time order.
+
+    Args:
+        topic_directory (str): Directory of the topic in the output tree.
+
+    Returns:
+        List[str]: Paths of the part files, by bucket then part for a partitioned topic.
+    """
+    paths = []
+    while os.path.exists(part_path(topic_directory, len(paths))):
+        paths.append(part_path(topic_directory, len(paths)))
+    if paths:
+        return paths
+
+    parts = []
+    try:
+        entries = list(os.scandir(topic_directory))
+    except FileNotFoundError:
+        return []
+    for entry in entries:
+        bucket = _directory_bucket(entry.name)
+        if bucket is None or not entry.is_dir():
+            continue
+        for name in os.listdir(entry.path):
+            match = BUCKET_PART_PATTERN.match(name)
+            if match is not None:
+                parts.append((bucket, int(match.group(1)), os.path.join(entry.path, name)))
+    return [path for _, _, path in sorted(parts)]
+
+
+def topic_dataset(log_directory: str, topic: str) -> ds.Dataset:
+    """
+    Open the part files of a tabular topic as a pyarrow dataset.
+
+    Frame files and indexes sharing the topic directory are left out. The bucket
+    of a partitioned topic is exposed as an int64 column, so filters on it prune
+    whole directories, and scans read the part files in parallel.
+
+    Args:
+        log_directory (str): Root directory of the extracted log.
+        topic (str): Name of the topic.
+
+    Returns:
+        ds.Dataset: Dataset of the committed part files.
+
+    Raises:
+        FileNotFoundError: If the topic has no part file.
+    """
+    topic_directory = topic_to_directory(log_directory, topic)
+    paths = list_part_files(topic_directory)
+    if not paths:
+        raise FileNotFoundError(f'No parquet parts for {topic} in {log_directory}')
+    partitioning = None
+    if path_bucket(paths[0]) is not None:
+        partitioning = ds.partitioning(pa.schema([(BUCKET_KEY, pa.int64())]), flavor='hive')
+    return ds.dataset(paths, format='parquet', partitioning=partitioning, partition_base_dir=topic_directory)
+
+
+def _sort_by_log_time(table: pa.Table) -> Tuple[pa.Table, Optional[List[pq.SortingColumn]]]:
+    """
+    Sort flushed rows by their log time column if they are not already.
+
+    Args:
+        table (pa.Table): Flushed rows.
+
+    Returns:
+        Tuple[pa.Table, List[pq.SortingColumn]]: Sorted rows and their sorting columns, None without log time column.
+    """
+    if LOG_TIME_COLUMN not in table.column_names:
+        return table, None
+    log_times = table.column(LOG_TIME_COLUMN)
+    if len(log_times) > 1 and not pc.all(pc.greater_equal(log_times[1:], log_times[:-1])).as_py():
+        table = table.sort_by(LOG_TIME_COLUMN)
+    return table, [pq.SortingColumn(table.column_names.index(LOG_TIME_COLUMN))]
+
+
+def _estimate_row_bytes(row: List[Any]) -> int:
+    """
+    Roughly estimate the in-memory size of a converted row.
+
+    Args:
+        row (List[Any]): A single converted row.
+
+    Returns:
+        int: Estimated number of bytes the row takes once written.
+    """
+    size = 0
+    for value in row:
+        if isinstance(value, (str, bytes)):
+            size += len(value)
+        else:
+            size += 8
+    return size
+
+
+class TopicParquetWriter:
+    """
+    Long-lived parquet writer for a single topic.
+
+    Rows, or record batches of rows, are buffered in memory and flushed as a row
+    group whenever the buffered row count or the estimated buffered bytes cross
+    their thresholds. The schema is resolved once, from the first flushed rows cast
+    by the parquet policy, and every following row group must conform to it.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        columns: List[str],
+        row_group_rows: int = DEFAULT_ROW_GROUP_ROWS,
+        row_group_bytes: int = DEFAULT_ROW_GROUP_BYTES,
+        policy: Optional[ParquetPolicy] = None
+    ) -> None:
+        """
+        Initialize the TopicParquetWriter.
+
+        Args:
+            file_path (str): Path to the parquet file to write.
+            columns (List[str]): Column names of the converted rows.
+            row_group_rows (int): Number of buffered rows that triggers a flush.
+            row_group_bytes (int): Estimated buffered bytes that trigger a flush.
+            policy (ParquetPolicy, optional): Encoding, compression and column types of the file.
+
+        Returns:
+            None
+        """
+        self.file_path = file_path
+        self.columns = columns
+        self.row_group_rows = row_group_rows
+        self.row_group_bytes = row_group_bytes
+        self.policy = policy or ParquetPolicy()
+
+        self.schema: Optional[pa.Schema] = None
+        self.num_rows = 0
+        self.first_timestamp: Optional[int] = None
+        self.last_timestamp: Optional[int] = None
+        self.committed_timestamp: Optional[int] = None
+        self._writer: Optional[pq.ParquetWriter] = None
+        self._rows: List[List[Any]] = []
+        self._batches: List[pa.RecordBatch] = []
+        self._buffered_rows = 0
+        self._buffered_bytes = 0
+
+    def write(self, rows: List[List[Any]], timestamp: Optional[int] = None) -> None:
+        """
+        Buffer converted rows and flush a row group when a threshold is hit.
+
+        Args:
+            rows (List[List[Any]]): Converted rows of a single message.
+            timestamp (int, optional): Bag receive timestamp of the message, in nanoseconds.
+
+        Returns:
+            None
+        """
+        for row in rows:
+            self._rows.append(row)
+            self._buffered_bytes += _estimate_row_bytes(row)
+        self._buffered_rows += len(rows)
+        self._track(timestamp)
+        self._flush_if_full()
+
+    def write_batch(self, batch: pa.RecordBatch, timestamp: Optional[int] = None) -> None:
+        """
+        Buffer a converted record batch and flush a row group when a threshold is hit.
+
+        Args:
+            batch (pa.RecordBatch): Converted rows of a batch of messages.
+            timestamp (int, optional): Bag receive timestamp of the last message of the batch, in nanoseconds.
+
+        Returns:
+            None
+        """
+        self._batches.append(batch)
+        self._buffered_rows += batch.num_rows
+        self._buffered_bytes += batch.nbytes
+        if batch.num_rows and LOG_TIME_COLUMN in batch.schema.names:
+            self._track(batch.column(LOG_TIME_COLUMN)[0].as_py())
+        self._track(timestamp)
+        self._flush_if_full()
+
+    def flush(self) -> None:
+        """
+        Write the buffered rows to the parquet file as one row group.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the buffered rows do not match the schema of the file.
+        """
+        if self._rows:
+            df = pd.DataFrame(self._rows, columns=self.columns)
+            try:
+                self._batches.append(pa.RecordBatch.from_pandas(df, schema=self.schema, preserve_index=False))
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as exception:
+                raise ValueError('Schema for the message has changed!') from exception
+            self._rows = []
+
+        if not self._batches:
+            return
+
+        self._batches = [self.policy.apply(batch) for batch in self._batches]
+        if self.schema is None:
+            self.schema = self._batches[0].schema
+        if any(not batch.schema.equals(self.schema) for batch in self._batches):
+            raise ValueError('Schema for the message has changed!')
+
+        table = pa.Table.from_batches(self._batches, schema=self.schema)
+        self._write_table(table)
+        self._batches = []
+        self._buffered_rows = 0
+        self._buffered_bytes = 0
+
+    def _write_table(self, table: pa.Table) -> None:
+        """
+        Append the flushed rows to the parquet file as one row group.
+
+        Args:
+            table (pa.Table): Flushed rows.
+
+        Returns:
+            None
+        """
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.file_path, self.schema, **self.policy.write_options(self.schema))
+        self._writer.write_table(table)
+        self._commit(table.num_rows, self.last_timestamp)
+
+    def _commit(self, num_rows: int, timestamp: Optional[int]) -> None:
+        """
+        Account for rows written to the output.
+
+        Args:
+            num_rows (int): Number of written rows.
+            timestamp (int, optional): Bag receive timestamp of the last written message.
+
+        Returns:
+            None
+        """
+        self.num_rows += num_rows
+        self.committed_timestamp = timestamp
+
+    def _track(self, timestamp: Optional[int]) -> None:
+        """
+        Remember the earliest and latest bag timestamps of the written rows.
+
+        Args:
+            timestamp (int, optional): Bag receive timestamp of the buffered message.
+
+        Returns:
+            None
+        """
+        if timestamp is None:
+            return
+        if self.first_timestamp is None or timestamp < self.first_timestamp:
+            self.first_timestamp = timestamp
+        if self.last_timestamp is None or timestamp > self.last_timestamp:
+            self.last_timestamp = timestamp
+
+    def _flush_if_full(self) -> None:
+        """
+        Flush a row group when the buffered rows or bytes cross their thresholds.
+
+        Returns:
+            None
+        """
+        if self._buffered_rows >= self.row_group_rows or self._buffered_bytes >= self.row_group_bytes:
+            self.flush()
+
+    def close(self) -> None:
+        """
+        Flush the remaining rows and close the underlying parquet file.
+
+        Returns:
+            None
+        """
+        try:
+            self.flush()
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+class PartitionedParquetWriter(TopicParquetWriter):
+    """
+    Parquet writer of a topic committing every row group to its own part file.
+
+    A part file is written under a temporary name and renamed once complete, so a
+    flushed row group survives a crash of the extraction. `on_commit` is called
+    after every part, letting the caller checkpoint how far the topic got; a
+    resumed writer continues numbering after the parts already committed.
+
+    Rows carrying a log time column are sorted by it and declared sorted in the
+    file metadata. Parts are split into small row groups with statistics and a page
+    index, so readers can seek to a time range.
+    """
+
+    def __init__(
+        self,
+        topic_directory: str,
+        columns: List[str],
+        row_group_rows: int = DEFAULT_ROW_GROUP_ROWS,
+        row_group_bytes: int = DEFAULT_ROW_GROUP_BYTES,
+        first_part: int = 0,
+        first_rows: int = 0,
+        on_commit: Optional[Callable[['PartitionedParquetWriter'], None]] = None,
+        index_rows: int = DEFAULT_INDEX_ROWS,
+        policy: Optional[ParquetPolicy] = None
+    ) -> None:
+        """
+        Initialize the PartitionedParquetWriter.
+
+        Args:
+            topic_directory (str): Directory of the topic in the output tree.
+            columns (List[str]): Column names of the converted rows.
+            row_group_rows (int): Number of buffered rows that triggers a flush.
+            row_group_bytes (int): Estimated buffered bytes that trigger a flush.
+            first_part (int): Number of parts committed by an earlier run.
+            first_rows (int): Number of rows committed by an earlier run.
+            on_commit (Callable, optional): Function called with the writer after every committed part.
+            index_rows (int): Number of rows per row group within a part, unless the policy sets it.
+            policy (ParquetPolicy, optional): Encoding, compression and column types of the parts.
+
+        Returns:
+            None
+        """
+        super().__init__(part_path(topic_directory, first_part), columns, row_group_rows, row_group_bytes, policy)
+        self.topic_directory = topic_directory
+        self.index_rows = self.policy.row_group_size or index_rows
+        self.parts = first_part
+        self.num_rows = first_rows
+        self.on_commit = on_commit
+        if first_part > 0:
+            # Rows appended on resume must match the parts already committed
+            self.schema = pq.read_schema(list_part_files(topic_directory)[0])
+
+    def _write_table(self, table: pa.Table) -> None:
+        """
+        Write the flushed rows to the next part file.
+
+        Args:
+            table (pa.Table): Flushed rows.
+
+        Returns:
+            None
+        """
+        table, sorting_columns = _sort_by_log_time(table)
+        path = part_path(self.topic_directory, self.parts)
+        pq.write_table(
+            table, f'{path}.tmp',
+            row_group_size=self.index_rows,
+            write_statistics=True,
+            write_page_index=True,
+            sorting_columns=sorting_columns,
+            **self.policy.write_options(table.schema)
+        )
+        os.replace(f'{path}.tmp', path)
+        self._commit(table.num_rows, self.last_timestamp)
+
+    def _commit(self, num_rows: int, timestamp: Optional[int]) -> None:
+        """
+        Account for a committed part file and checkpoint it.
+
+        Args:
+            num_rows (int): Number of rows of the part.
+            timestamp (int, optional): Bag receive timestamp of the last message of the part.
+
+        Returns:
+            None
+        """
+        self.parts += 1
+        super()._commit(num_rows, timestamp)
+        if self.on_commit is not None:
+            self.on_commit(self)
+
+
+class BucketedParquetWriter(PartitionedParquetWriter):
+    """
+    Parquet writer of a topic partitioned into time buckets of its log time.
+
+    Flushed rows are split by bucket and appended to the open part file of their
+    bucket, under bucket=<first log time of the bucket>/part-N.parquet. A part is
+    committed, and `on_commit` called, when the rows move on to the next bucket or
+    when the part reaches its target size, so files are neither rewritten nor tiny
+    and every bucket can be written and read independently.
+    """
+
+    def __init__(
+        self,
+        topic_directory: str,
+        columns: List[str],
+        bucket_width: int,
+        target_file_bytes: int = DEFAULT_TARGET_FILE_BYTES,
+        row_group_rows: int = DEFAULT_ROW_GROUP_ROWS,
+        row_group_bytes: int = DEFAULT_ROW_GROUP_BYTES,
+        first_part: int = 0,
+        first_rows: int = 0,
+        on_commit: Optional[Callable[['PartitionedParquetWriter'], None]] = None,
+        index_rows: int = DEFAULT_INDEX_ROWS,
+        policy: Optional[ParquetPolicy] = None
+    ) -> None:
+        """
+        Initialize the BucketedParquetWriter.
+
+        Args:
+            topic_directory (str): Directory of the topic in the output tree.
+            columns (List[str]): Column names of the converted rows.
+            bucket_width (int): Width of a time bucket, in nanoseconds.
+            target_file_bytes (int): Size of a part file that triggers its commit.
+            row_group_rows (int): Number of buffered rows that triggers a flush.
+            row_group_bytes (int): Estimated buffered bytes that trigger a flush.
+            first_part (int): Number of parts committed by an earlier run.
+            first_rows (int): Number of rows committed by an earlier run.
+            on_commit (Callable, optional): Function called with the writer after every committed part.
+            index_rows (int): Number of rows per row group within a part, unless the policy sets it.
+            policy (ParquetPolicy, optional): Encoding, compression and column types of the parts.
+
+        Returns:
+            None
+        """
+        super().__init__(
+            topic_directory, columns, row_group_rows, row_group_bytes, first_part, first_rows, on_commit, index_rows, policy
+        )
+        self.bucket_width = bucket_width
+        self.target_file_bytes = target_file_bytes
+        self._bucket: Optional[int] = None
+        self._sink: Optional[pa.NativeFile] = None
+        self._file_rows = 0
+        self._file_timestamp: Optional[int] = None
+
+    def _write_table(self, table: pa.Table) -> None:
+        """
+        Append the flushed rows to the part files of their buckets.
+
+        Args:
+            table (pa.Table): Flushed rows.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the rows have no log time column.
+        """
+        table, sorting_columns = _sort_by_log_time(table)
+        if sorting_columns is None:
+            raise ValueError(f'Rows partitioned by time need a {LOG_TIME_COLUMN} column')
+
+        log_times = table.column(LOG_TIME_COLUMN).to_numpy()
+        buckets = log_times - log_times % self.bucket_width
+        bounds = [0, *(np.flatnonzero(np.diff(buckets)) + 1).tolist(), len(buckets)]
+        for begin, end in zip(bounds[:-1], bounds[1:]):
+            if self._writer is not None and self._bucket != buckets[begin]:
+                self._close_part()
+            if self._writer is None:
+                self._open_part(int(buckets[begin]), sorting_columns)
+            self._writer.write_table(table.slice(begin, end - begin), row_group_size=self.index_rows)
+            self._file_rows += end - begin
+            self._file_timestamp = int(log_times[end - 1])
+            if self._sink.tell() >= self.target_file_bytes:
+                self._close_part()
+
+    def _open_part(self, bucket: int, sorting_columns: List[pq.SortingColumn]) -> None:
+        """
+        Open the next part file in the directory of a bucket.
+
+        Args:
+            bucket (int): First log time of the bucket, in nanoseconds.
+            sorting_columns (List[pq.SortingColumn]): Columns the rows are sorted by.
+
+        Returns:
+            None
+        """
+        path = bucket_part_path(self.topic_directory, bucket, self.parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._sink = pa.OSFile(f'{path}.tmp', 'wb')
+        self._writer = pq.ParquetWriter(
+            self._sink, self.schema,
+            write_statistics=True,
+            write_page_index=True,
+            sorting_columns=sorting_columns,
+            **self.policy.write_options(self.schema)
+        )
+        self._bucket = bucket
+        self.file_path = path
+
+    def _close_part(self, commit: bool = True) -> None:
+        """
+        Close the open part file and commit it.
+
+        Args:
+            commit (bool): Whether to rename and checkpoint the part, False to leave it uncommitted.
+
+        Returns:
+            None
+        """
+        try:
+            self._writer.close()
+        finally:
+            self._sink.close()
+            self._writer = None
+            self._sink = None
+        if commit:
+            os.replace(f'{self.file_path}.tmp', self.file_path)
+            self._commit(self._file_rows, self._file_timestamp)
+        self._file_rows = 0
+        self._file_timestamp = None
+
+    def close(self) -> None:
+        """
+        Flush the remaining rows and commit the open part file.
+
+        The open part is left uncommitted if the flush fails.
+
+        Returns:
+            None
+        """
+        try:
+            self.flush()
+        except BaseException:
+            if self._writer is not None:
+                self._close_part(commit=False)
+            raise
+        if self._writer is not None:
+            self._close_part()
+
+
+class ParquetWriterPool(WriterPool):
+    """
+    Collection of per-topic parquet writers that are closed together.
+    """
+
+    def __init__(
+        self,
+        output_directory: str,
+        row_group_rows: int = DEFAULT_ROW_GROUP_ROWS,
+        row_group_bytes: int = DEFAULT_ROW_GROUP_BYTES,
+        resumed: Optional[Dict[str, Tuple[int, int]]] = None,
+        on_commit: Optional[Callable[[str, PartitionedParquetWriter], None]] = None,
+        index_rows: int = DEFAULT_INDEX_ROWS,
+        partitioning: str = DEFAULT_PARTITIONING,
+        target_file_bytes: int = DEFAULT_TARGET_FILE_BYTES,
+        policies: Optional[ParquetPolicies] = None
+    ) -> None:
+        """
+        Initialize the ParquetWriterPool.
+
+        Args:
+            output_directory (str): Root directory of the extracted log.
+            row_group_rows (int): Number of buffered rows that triggers a flush.
+            row_group_bytes (int): Estimated buffered bytes that trigger a flush.
+            resumed (Dict[str, Tuple[int, int]], optional): Parts and rows already committed per resumed topic.
+            on_commit (Callable, optional): Function called with the topic and its writer after every committed part.
+            index_rows (int): Number of rows per row group within a part.
+            partitioning (str): 'none' for flat part files, or the time bucket of the partitions, 'minute' or 'hour'.
+            target_file_bytes (int): Size of a partitioned part file that triggers its commit.
+            policies (ParquetPolicies, optional): Parquet policy of every topic, the default policy otherwise.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the partitioning is unknown.
+        """
+        if partitioning != DEFAULT_PARTITIONING and partitioning not in BUCKET_WIDTHS:
+            raise ValueError(f'Unknown parquet partitioning {partitioning}, expected none, {" or ".join(BUCKET_WIDTHS)}')
+        super().__init__(output_directory)
+        self.row_group_rows = row_group_rows
+        self.row_group_bytes = row_group_bytes
+        self.resumed = resumed or {}
+        self.on_commit = on_commit
+        self.index_rows = index_rows
+        self.partitioning = partitioning
+        self.target_file_bytes = target_file_bytes
+        self.policies = policies or ParquetPolicies()
+
+    def get(self, topic: str, columns: List[str]) -> PartitionedParquetWriter:
+        """
+        Get the writer of a topic, opening it on first use.
+
+        Args:
+            topic (str): Name of the topic.
+            columns (List[str]): Column names of the converted rows.
+
+        Returns:
+            PartitionedParquetWriter: The writer of the topic.
+        """
+        writer = self.writers.get(topic)
+        if writer is None:
+            parts, rows = self.resumed.get(topic, (0, 0))
+            on_commit = (lambda committed: self.on_commit(topic, committed)) if self.on_commit is not None else None
+            topic_directory = topic_to_directory(self.output_directory, topic)
+            policy = self.policies.get(topic)
+            if self.partitioning in BUCKET_WIDTHS:
+                writer = BucketedParquetWriter(
+                    topic_directory, columns, BUCKET_WIDTHS[self.partitioning], self.target_file_bytes,
+                    self.row_group_rows, self.row_group_bytes, parts, rows, on_commit, self.index_rows, policy
+                )
+            else:
+                writer = PartitionedParquetWriter(
+                    topic_directory, columns,
+                    self.row_group_rows, self.row_group_bytes, parts, rows, on_commit, self.index_rows, policy
+                )
+            self.writers[topic] = writer
+        return writer
+
+
+def _log_time_range(metadata: pq.FileMetaData, row_group: int, column: int) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Read the log time statistics of a row group.
+
+    Args:
+        metadata (pq.FileMetaData): Footer of the part file.
+        row_group (int): Index of the row group.
+        column (int): Index of the log time column.
+
+    Returns:
+        Tuple[int, int]: Smallest and largest log time of the row group, None when unknown.
+    """
+    statistics = metadata.row_group(row_group).column(column).statistics
+    if statistics is None or not statistics.has_min_max:
+        return None, None
+    return statistics.min, statistics.max
+
+
+def load_topic(
+    log_directory: str,
+    topic: str,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+    columns: Optional[List[str]] = None
+) -> pa.Table:
+    """
+    Load the rows of a tabular topic logged within a time range.
+
+    Buckets of a partitioned topic outside of the range are pruned by their path,
+    then only the footers of the part files are read to locate the range: row groups,
+    and whole parts, whose log time statistics fall outside of it are never read,
+    and reading stops at the first row group starting after the range since parts
+    are sorted by log time. Only the requested columns of the remaining row groups
+    are read.
+
+    Args:
+        log_directory (str): Root directory of the extracted log.
+        topic (str): Name of the topic.
+        start_time (int, optional): First log time to load, in nanoseconds.
+        end_time (int, optional): Last log time to load, in nanoseconds.
+        columns (List[str], optional): Columns to load, every column when None.
+
+    Returns:
+        pa.Table: Rows of the topic within the range, sorted by log time.
+
+    Raises:
+        FileNotFoundError: If the topic has no part file.
+    """
+    paths = list_part_files(topic_to_directory(log_directory, topic))
+    if not paths:
+        raise FileNotFoundError(f'No parquet parts for {topic} in {log_directory}')
+
+    # Rows of a bucket are logged before the start of the next bucket
+    buckets = [path_bucket(path) for path in paths]
+    next_buckets: List[Optional[int]] = [None] * len(paths)
+    for position in range(len(paths) - 2, -1, -1):
+        following = buckets[position + 1]
+        next_buckets[position] = following if following != buckets[position] else next_buckets[position + 1]
+
+    read_columns = None if columns is None else list(dict.fromkeys([LOG_TIME_COLUMN] + columns))
+    tables = []
+    schema = pq.read_schema(paths[0])
+    for path, bucket, next_bucket in zip(paths, buckets, next_buckets):
+        if end_time is not None and bucket is not None and bucket > end_time:
+            break
+        if start_time is not None and next_bucket is not None and next_bucket <= start_time:
+            continue
+        parquet_file = pq.ParquetFile(path)
+        schema = parquet_file.schema_arrow
+        column = schema.get_field_index(LOG_TIME_COLUMN)
+        row_groups = []
+        past_end = False
+        for row_group in range(parquet_file.num_row_groups):
+            minimum, maximum = _log_time_range(parquet_file.metadata, row_group, column) if column >= 0 else (None, None)
+            if end_time is not None and minimum is not None and minimum > end_time:
+                past_end = True
+                break
+            if start_time is not None and maximum is not None and maximum < start_time:
+                continue
+            row_groups.append(row_group)
+        if row_groups:
+            tables.append(parquet_file.read_row_groups(row_groups, columns=read_columns))
+        if past_end:
+            break
+
+    if not tables:
+        table = schema.empty_table()
+        return table if columns is None else table.select(columns)
+
+    table = pa.concat_tables(tables)
+    if LOG_TIME_COLUMN in table.column_names:
+        mask = None
+        if start_time is not None:
+            mask = pc.greater_equal(table.column(LOG_TIME_COLUMN), start_time)
+        if end_time is not None:
+            upper = pc.less_equal(table.column(LOG_TIME_COLUMN), end_time)
+            mask = upper if mask is None else pc.and_(mask, upper)
+        if mask is not None:
+            table = table.filter(mask)
+    return table if columns is None else table.select(columns)
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+
+"""
+Store point cloud topics in a chunked, memory-mappable columnar file.
+
+(c) 2023 Scintilla. All rights reserved.
+Unauthorized reproduction, distribution, or disclosure of this material is strictly
+prohibited without the express written permission of Scintilla.
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from data_pipeline.extractors.writers.parquet_writer import TopicParquetWriter, topic_to_directory
+from data_pipeline.extractors.writers.writer_pool import WriterPool
+
+POINTS_FILE = 'points.arrow'
+INDEX_FILE = 'cloud_index.parquet'
+INDEX_COLUMNS = [
+    'timestamp', 'batch', 'offset', 'count',
+    'scale/x', 'scale/y', 'scale/z', 'offset/x', 'offset/y', 'offset/z',
+]
+
+POINTS_SCHEMA = pa.schema([
+    ('x', pa.int16()),
+    ('y', pa.int16()),
+    ('z', pa.int16()),
+    ('rgb', pa.uint32()),
+])
+
+DEFAULT_CHUNK_POINTS = 4 * 1024 * 1024
+
+# Quantized coordinates span the whole int16 range
+QUANTIZATION_LEVELS = 65535
+QUANTIZATION_ORIGIN = -32768
+
+
+def quantize_points(points: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Quantize float points to int16 with a per-axis scale and offset.
+
+    Args:
+        points (np.ndarray): Nx3 array of points.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: Nx3 int16 points, per-axis scale and per-axis offset.
+    """
+    if len(points) == 0:
+        return np.empty((0, 3), dtype=np.int16), np.ones(3), np.zeros(3)
+
+    minimum = points.min(axis=0)
+    scale = (points.max(axis=0) - minimum) / QUANTIZATION_LEVELS
+    scale[scale == 0] = 1.0
+    quantized = np.rint((points - minimum) / scale) + QUANTIZATION_ORIGIN
+    return quantized.astype(np.int16), scale, minimum
+
+
+def dequantize_points(quantized: np.ndarray, scale: np.ndarray, offset: np.ndarray) -> np.ndarray:
+    """
+    Restore float points from their int16 quantization.
+
+    Args:
+        quantized (np.ndarray): Nx3 int16 points.
+        scale (np.ndarray): Per-axis scale.
+        offset (np.ndarray): Per-axis offset.
+
+    Returns:
+        np.ndarray: Nx3 float64 points.
+    """
+    return (quantized.astype(np.float64) - QUANTIZATION_ORIGIN) * scale + offset
+
+
+def pack_colors(colors: np.ndarray) -> np.ndarray:
+    """
+    Pack Nx3 colors in [0, 1] into 0x00RRGGBB uint32 values.
+
+    Args:
+        colors (np.ndarray): Nx3 array of colors.
+
+    Returns:
+        np.ndarray: Packed colors.
+    """
+    channels = np.rint(colors * 255.0).astype(np.uint32)
+    return (channels[:, 0] << 16) | (channels[:, 1] << 8) | channels[:, 2]
+
+
+def unpack_colors(rgb: np.ndarray) -> np.ndarray:
+    """
+    Unpack 0x00RRGGBB uint32 values into Nx3 colors in [0, 1].
+
+    Args:
+        rgb (np.ndarray): Packed colors.
+
+    Returns:
+        np.ndarray: Nx3 float64 colors.
+    """
+    colors = np.empty((len(rgb), 3), dtype=np.float64)
+    colors[:, 0] = (rgb >> 16) & 0xff
+    colors[:, 1] = (rgb >> 8) & 0xff
+    colors[:, 2] = rgb & 0xff
+    return colors / 255.0
+
+
+class ColumnarCloudWriter:
+    """
+    Append the frames of one point cloud topic to an Arrow IPC file.
+
+    Frames are buffered and written as record batches of about `chunk_points` points;
+    a frame never spans two batches. A sidecar parquet index records, per frame, its
+    bag timestamp, its batch, its row offset and point count within the batch, and the
+    scale and offset of its quantized coordinates.
+    """
+
+    def __init__(self, topic_directory: str, chunk_points: int = DEFAULT_CHUNK_POINTS) -> None:
+        """
+        Initialize the ColumnarCloudWriter.
+
+        Args:
+            topic_directory (str): Directory of the topic in the output tree.
+            chunk_points (int): Number of buffered points that triggers a new record batch.
+
+        Returns:
+            None
+        """
+        self.chunk_points = chunk_points
+        self.index = TopicParquetWriter(os.path.join(topic_directory, INDEX_FILE), INDEX_COLUMNS)
+
+        self._file = pa.OSFile(os.path.join(topic_directory, POINTS_FILE), 'wb')
+        self._writer = pa.ipc.new_file(self._file, POINTS_SCHEMA)
+        self._batch = 0
+        self._frames: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._buffered_points = 0
+
+    def write(self, timestamp: int, points: np.ndarray, colors: np.ndarray) -> None:
+        """
+        Quantize a frame and buffer it, writing a record batch when the chunk is full.
+
+        Args:
+            timestamp (int): Bag receive timestamp of the frame, in nanoseconds.
+            points (np.ndarray): Nx3 array of points.
+            colors (np.ndarray): Nx3 array of colors in [0, 1].
+
+        Returns:
+            None
+        """
+        quantized, scale, offset = quantize_points(np.asarray(points, dtype=np.float64))
+        self.index.write([[timestamp, self._batch, self._buffered_points, len(quantized), *scale, *offset]])
+        self._frames.append((quantized, pack_colors(np.asarray(colors))))
+        self._buffered_points += len(quantized)
+
+        if self._buffered_points >= self.chunk_points:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write the buffered frames as one record batch.
+
+        Returns:
+            None
+        """
+        if not self._frames:
+            return
+
+        quantized = np.concatenate([frame[0] for frame in self._frames])
+        rgb = np.concatenate([frame[1] for frame in self._frames])
+        batch = pa.record_batch([
+            pa.array(quantized[:, 0]),
+            pa.array(quantized[:, 1]),
+            pa.array(quantized[:, 2]),
+            pa.array(rgb),
+        ], schema=POINTS_SCHEMA)
+        self._writer.write_batch(batch)
+
+        self._batch += 1
+        self._frames = []
+        self._buffered_points = 0
+
+    def close(self) -> None:
+        """
+        Write the remaining frames and close the points file and the index.
+
+        Returns:
+            None
+        """
+        try:
+            self.flush()
+            self._writer.close()
+        finally:
+            self._file.close()
+            self.index.close()
+
+
+class ColumnarCloudWriterPool(WriterPool):
+    """
+    Collection of per-topic columnar point cloud writers that are closed together.
+    """
+
+    def __init__(self, output_directory: str, config: Dict[str, Any]) -> None:
+        """
+        Initialize the ColumnarCloudWriterPool.
+
+        Args:
+            output_directory (str): Root directory of the extracted log.
+            config (dict): Extraction configuration settings.
+
+        Returns:
+            None
+        """
+        super().__init__(output_directory)
+        self.chunk_points = config.get('pointcloud_chunk_points', DEFAULT_CHUNK_POINTS)
+
+    def get(self, topic: str) -> ColumnarCloudWriter:
+        """
+        Get the point cloud writer of a topic, opening it on first use.
+
+        Args:
+            topic (str): Name of the topic.
+
+        Returns:
+            ColumnarCloudWriter: The writer of the topic.
+        """
+        writer = self.writers.get(topic)
+        if writer is None:
+            writer = ColumnarCloudWriter(topic_to_directory(self.output_directory, topic), self.chunk_points)
+            self.writers[topic] = writer
+        return writer
+
+
+def load_clouds(
+    topic_directory: str,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None
+) -> List[Tuple[int, np.ndarray, np.ndarray]]:
+    """
+    Load the point clouds of a topic received within a time range.
+
+    The points file is memory-mapped and only the record batches holding the
+    requested frames are touched.
+
+    Args:
+        topic_directory (str): Directory of the topic in the output tree.
+        start_time (int, optional): First receive timestamp to load, in nanoseconds.
+        end_time (int, optional): Last receive timestamp to load, in nanoseconds.
+
+    Returns:
+        List[Tuple[int, np.ndarray, np.ndarray]]: Timestamp, Nx3 points and Nx3 colors of every frame.
+    """
+    filters = []
+    if start_time is not None:
+        filters.append(('timestamp', '>=', start_time))
+    if end_time is not None:
+        filters.append(('timestamp', '<=', end_time))
+    index = pd.read_parquet(os.path.join(topic_directory, INDEX_FILE), filters=filters or None)
+
+    clouds = []
+    with pa.memory_map(os.path.join(topic_directory, POINTS_FILE), 'r') as source:
+        reader = pa.ipc.open_file(source)
+        batches: Dict[int, pa.RecordBatch] = {}
+        for row in index.itertuples(index=False):
+            batch_index = int(row[1])
+            if batch_index not in batches:
+                batches[batch_index] = reader.get_batch(batch_index)
+            frame = batches[batch_index].slice(int(row[2]), int(row[3]))
+
+            quantized = np.stack([frame.column(axis).to_numpy() for axis in range(3)], axis=1)
+            scale = np.array(row[4:7], dtype=np.float64)
+            offset = np.array(row[7:10], dtype=np.float64)
+            points = dequantize_points(quantized, scale, offset)
+            colors = unpack_colors(frame.column(3).to_numpy())
+            clouds.append((int(row[0]), points, colors))
+
+    return clouds
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+"""
+Index the transforms of an extracted log by edge of the frame tree.
+
+(c) 2023 Scintilla. All rights reserved.
+Unauthorized reproduction, distribution, or disclosure of this material is strictly
+prohibited without the express written permission of Scintilla.
+"""
+
+import os
+from typing import List, Optional
+
+import numpy as np
+import pyarrow as pa
+
+from data_pipeline.extractors.writers.parquet_writer import load_topic
+
+TF_INDEX_FILE = 'tf_index.npz'
+
+DEFAULT_TF_TOPICS = ['/tf']
+DEFAULT_TF_STATIC_TOPICS = ['/tf_static']
+
+# Columns of the rows of TFMessageConvertor
+TF_PARENT_COLUMN = 'transforms/header/frame_id'
+TF_CHILD_COLUMN = 'transforms/child_frame_id'
+TF_STAMP_COLUMNS = ['transforms/header/sec', 'transforms/header/nanosec']
+TF_TRANSLATION_COLUMNS = ['transforms/transform/translation/x', 'transform/translation/y', 'transforms/transform/translation/z']
+TF_ROTATION_COLUMNS = [
+    'transforms/transform/rotation/x', 'transforms/transform/rotation/y',
+    'transforms/transform/rotation/z', 'transforms/transform/rotation/w',
+]
+
+
+def _load_transforms(log_directory: str, topics: List[str]) -> Optional[pa.Table]:
+    """
+    Load the transforms of the extracted TF topics of a log.
+
+    Args:
+        log_directory (str): Root directory of the extracted log.
+        topics (List[str]): TFMessage topics.
+
+    Returns:
+        pa.Table: Transforms of every topic in log order, None if no topic was extracted.
+    """
+    columns = [TF_PARENT_COLUMN, TF_CHILD_COLUMN] + TF_STAMP_COLUMNS + TF_TRANSLATION_COLUMNS + TF_ROTATION_COLUMNS
+    tables = []
+    for topic in topics:
+        try:
+            table = load_topic(log_directory, topic, columns=columns)
+        except FileNotFoundError:
+            continue
+        # Frames may be stored as dictionaries by the parquet policy
+        tables.append(table.select(columns).cast(pa.schema(
+            [pa.field(name, pa.string()) for name in [TF_PARENT_COLUMN, TF_CHILD_COLUMN]] +
+            [table.schema.field(name) for name in columns[2:]]
+        )))
+    return pa.concat_tables(tables) if tables else None
+
+
+def _edge_codes(table: pa.Table) -> np.ndarray:
+    """
+    Label every transform with its edge of the frame tree.
+
+    Args:
+        table (pa.Table): Transforms.
+
+    Returns:
+        np.ndarray: Parent and child frame of every transform, as 'parent\\nchild' strings.
+    """
+    parents = np.asarray(table.column(TF_PARENT_COLUMN).to_pylist(), dtype=object)
+    children = np.asarray(table.column(TF_CHILD_COLUMN).to_pylist(), dtype=object)
+    return parents + '\n' + children
+
+
+def write_tf_index(
+    log_directory: str,
+    tf_topics: Optional[List[str]] = None,
+    static_topics: Optional[List[str]] = None
+) -> Optional[str]:
+    """
+    Write the transforms of a log as per-edge arrays of stamps, translations and rotations.
+
+    Samples of every dynamic edge are sorted by header stamp, the last one received
+    winning for a repeated stamp, and stored back to back with the offset of every
+    edge. Static edges hold their last transform only, which also overrides the
+    dynamic samples of the same edge. The index is replaced atomically.
+
+    Args:
+        log_directory (str): Root directory of the extracted log.
+        tf_topics (List[str], optional): TFMessage topics of dynamic transforms, DEFAULT_TF_TOPICS by default.
+        static_topics (List[str], optional): TFMessage topics of static transforms, DEFAULT_TF_STATIC_TOPICS by default.
+
+    Returns:
+        str: Path to the index, None if no TF topic was extracted.
+    """
+    dynamic = _load_transforms(log_directory, DEFAULT_TF_TOPICS if tf_topics is None else tf_topics)
+    static = _load_transforms(log_directory, DEFAULT_TF_STATIC_TOPICS if static_topics is None else static_topics)
+    if dynamic is None and static is None:
+        return None
+
+    edges, edge_static, offsets = [], [], [0]
+    times, translations, rotations = [], [], []
+
+    static_edges = set()
+    if static is not None and static.num_rows:
+        codes = _edge_codes(static)
+        # Rows are in log order, so the last occurrence of an edge is its latest transform
+        last = {code: index for index, code in enumerate(codes)}
+        static_edges = set(last)
+        rows = np.asarray(list(last.values()), dtype=np.int64)
+        for code, row in zip(last, rows):
+            edges.append(code)
+            edge_static.append(True)
+            offsets.append(offsets[-1] + 1)
+        times.append(np.zeros(len(rows), dtype=np.int64))
+        translations.append(np.column_stack([static.column(name).to_numpy()[rows] for name in TF_TRANSLATION_COLUMNS]))
+        rotations.append(np.column_stack([static.column(name).to_numpy()[rows] for name in TF_ROTATION_COLUMNS]))
+
+    if dynamic is not None and dynamic.num_rows:
+        codes = _edge_codes(dynamic)
+        names, labels = np.unique(codes, return_inverse=True)
+        stamps = dynamic.column(TF_STAMP_COLUMNS[0]).to_numpy().astype(np.int64) * 10**9 + dynamic.column(TF_STAMP_COLUMNS[1]).to_numpy().astype(np.int64)
+
+        # Stable sort by edge then stamp, keeping the last received of equal stamps
+        order = np.lexsort((stamps, labels))
+        labels, stamps = labels[order], stamps[order]
+        keep = np.ones(len(order), dtype=bool)
+        keep[:-1] = (labels[1:] != labels[:-1]) | (stamps[1:] != stamps[:-1])
+        keep &= ~np.isin(names[labels], list(static_edges))
+        order, labels, stamps = order[keep], labels[keep], stamps[keep]
+
+        counts = np.bincount(labels, minlength=len(names))
+        for code, count in zip(names, counts):
+            if count:
+                edges.append(code)
+                edge_static.append(False)
+                offsets.append(offsets[-1] + int(count))
+        times.append(stamps)
+        translations.append(np.column_stack([dynamic.column(name).to_numpy()[order] for name in TF_TRANSLATION_COLUMNS]))
+        rotations.append(np.column_stack([dynamic.column(name).to_numpy()[order] for name in TF_ROTATION_COLUMNS]))
+
+    parents, children = zip(*[edge.split('\n', 1) for edge in edges]) if edges else ((), ())
+    path = os.path.join(log_directory, TF_INDEX_FILE)
+    with open(f'{path}.tmp', 'wb') as file:
+        np.savez(
+            file,
+            parents=np.asarray(parents, dtype=str),
+            children=np.asarray(children, dtype=str),
+            static=np.asarray(edge_static, dtype=bool),
+            offsets=np.asarray(offsets, dtype=np.int64),
+            times=np.concatenate(times) if times else np.zeros(0, dtype=np.int64),
+            translations=np.concatenate(translations).astype(np.float64) if translations else np.zeros((0, 3)),
+            rotations=np.concatenate(rotations).astype(np.float64) if rotations else np.zeros((0, 4)),
+        )
+    os.replace(f'{path}.tmp', path)
+    return path
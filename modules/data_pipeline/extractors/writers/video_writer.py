@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+
+"""
+Store image topics as segmented video files with a per-frame parquet index.
+
+(c) 2023 Scintilla. All rights reserved.
+Unauthorized reproduction, distribution, or disclosure of this material is strictly
+prohibited without the express written permission of Scintilla.
+"""
+
+import os
+import subprocess
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+import pandas as pd
+import yaml
+
+from data_pipeline.extractors.writers.parquet_writer import TopicParquetWriter, topic_to_directory
+from data_pipeline.extractors.writers.writer_pool import WriterPool
+
+INDEX_FILE = 'video_index.parquet'
+INFO_FILE = 'video.yaml'
+INDEX_COLUMNS = ['timestamp', 'segment', 'frame', 'keyframe']
+
+DEFAULT_VIDEO_BACKEND = 'ffmpeg'
+DEFAULT_VIDEO_FPS = 30
+DEFAULT_SEGMENT_FRAMES = 900
+DEFAULT_GOP_FRAMES = 30
+DEFAULT_VIDEO_CRF = 18
+DEFAULT_CV2_FOURCC = 'mp4v'
+
+
+def frame_pixel_format(image: np.ndarray) -> Tuple[str, bool]:
+    """
+    Map an image array to the raw ffmpeg pixel format it is streamed as.
+
+    Float images have no video pixel format, so their bytes are streamed as bgra and
+    can only be stored losslessly.
+
+    Args:
+        image (np.ndarray): Image of shape (height, width) or (height, width, channels).
+
+    Returns:
+        Tuple[str, bool]: Raw pixel format and whether the image requires lossless storage.
+
+    Raises:
+        ValueError: If the image layout cannot be stored as video.
+    """
+    channels = 1 if image.ndim == 2 else image.shape[2]
+    if image.dtype == np.uint8:
+        formats = {1: 'gray', 3: 'bgr24', 4: 'bgra'}
+        if channels in formats:
+            return formats[channels], False
+    elif image.dtype == np.uint16 and channels == 1:
+        return 'gray16le', True
+    elif image.dtype == np.float32 and channels == 1:
+        return 'bgra', True
+    raise ValueError(f'Images of type {image.dtype} with {channels} channels cannot be stored as video.')
+
+
+class _FfmpegSegmentEncoder:
+    """
+    Encode one video segment by streaming raw frames to an ffmpeg process.
+    """
+
+    def __init__(self, path: str, width: int, height: int, pixel_format: str, lossless: bool, config: Dict[str, Any]) -> None:
+        gop = 1 if lossless else config.get('video_gop_frames', DEFAULT_GOP_FRAMES)
+        command = [
+            'ffmpeg', '-loglevel', 'error', '-y',
+            '-f', 'rawvideo', '-pix_fmt', pixel_format, '-s', f'{width}x{height}',
+            '-r', str(config.get('video_fps', DEFAULT_VIDEO_FPS)), '-i', '-',
+        ]
+        if lossless:
+            command += ['-c:v', 'ffv1', '-level', '3', '-g', '1']
+        else:
+            # Fixed GOP without scene-cut keyframes so keyframes are known from the frame number
+            command += [
+                '-c:v', 'libx264', '-preset', 'veryfast', '-crf', str(config.get('video_crf', DEFAULT_VIDEO_CRF)),
+                '-g', str(gop), '-keyint_min', str(gop), '-sc_threshold', '0', '-pix_fmt', 'yuv420p',
+            ]
+        command.append(path)
+
+        self.gop = gop
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def write(self, image: np.ndarray) -> None:
+        self._process.stdin.write(np.ascontiguousarray(image).data)
+
+    def is_keyframe(self, frame: int) -> bool:
+        return frame % self.gop == 0
+
+    def close(self) -> None:
+        self._process.stdin.close()
+        if self._process.wait() != 0:
+            raise RuntimeError(f'ffmpeg exited with code {self._process.returncode}')
+
+
+class _OpenCVSegmentEncoder:
+    """
+    Encode one lossy 8-bit video segment with cv2.VideoWriter.
+    """
+
+    def __init__(self, path: str, width: int, height: int, pixel_format: str, lossless: bool, config: Dict[str, Any]) -> None:
+        if lossless:
+            raise ValueError('Lossless video storage requires the ffmpeg video backend.')
+        fourcc = cv2.VideoWriter_fourcc(*config.get('video_fourcc', DEFAULT_CV2_FOURCC))
+        fps = config.get('video_fps', DEFAULT_VIDEO_FPS)
+        self._is_bgra = pixel_format == 'bgra'
+        self._writer = cv2.VideoWriter(path, fourcc, fps, (width, height), pixel_format != 'gray')
+        if not self._writer.isOpened():
+            raise RuntimeError(f'Could not open video writer for {path}')
+
+    def write(self, image: np.ndarray) -> None:
+        if self._is_bgra:
+            image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+        self._writer.write(image)
+
+    def is_keyframe(self, frame: int) -> bool:
+        # Keyframe placement is not exposed by OpenCV, only the first frame is known
+        return frame == 0
+
+    def close(self) -> None:
+        self._writer.release()
+
+
+ENCODERS = {
+    'ffmpeg': _FfmpegSegmentEncoder,
+    'cv2': _OpenCVSegmentEncoder,
+}
+
+
+class VideoTopicWriter:
+    """
+    Encode the frames of one image topic into fixed-length video segments.
+
+    Every frame gets a row in a sidecar parquet index mapping its bag timestamp to
+    its segment, its frame number within the segment and whether it is a keyframe.
+    Stream properties needed to decode the frames are stored in a YAML file.
+    """
+
+    def __init__(self, topic_directory: str, config: Dict[str, Any], lossless: bool = False) -> None:
+        """
+        Initialize the VideoTopicWriter.
+
+        Args:
+            topic_directory (str): Directory of the topic in the output tree.
+            config (dict): Extraction configuration settings.
+            lossless (bool): Whether to encode 8-bit frames losslessly as well.
+
+        Returns:
+            None
+        """
+        self.topic_directory = topic_directory
+        self.config = config
+        self.lossless = lossless
+        self.backend = config.get('video_backend', DEFAULT_VIDEO_BACKEND)
+        self.segment_frames = config.get('video_segment_frames', DEFAULT_SEGMENT_FRAMES)
+
+        self.index = TopicParquetWriter(os.path.join(topic_directory, INDEX_FILE), INDEX_COLUMNS)
+        self._encoder = None
+        self._segment = -1
+        self._frame = 0
+        self._stream: Optional[Dict[str, Any]] = None
+
+    def write(self, timestamp: int, image: np.ndarray) -> None:
+        """
+        Append a frame to the current segment, starting a new one when it is full.
+
+        Args:
+            timestamp (int): Bag receive timestamp of the frame, in nanoseconds.
+            image (np.ndarray): Decoded image.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the frame layout differs from the first frame of the topic.
+        """
+        stream = self._stream_info(image)
+        if self._stream is None:
+            self._stream = stream
+        elif stream != self._stream:
+            raise ValueError('Image layout for the topic has changed!')
+
+        if self._encoder is None or self._frame == self.segment_frames:
+            self._open_segment()
+
+        if image.dtype == np.float32:
+            image = np.ascontiguousarray(image).view(np.uint8).reshape(image.shape[0], image.shape[1], 4)
+        self._encoder.write(image)
+        self.index.write([[timestamp, self._segment_name(self._segment), self._frame, self._encoder.is_keyframe(self._frame)]])
+        self._frame += 1
+
+    def close(self) -> None:
+        """
+        Finish the current segment, the index and the stream description.
+
+        Returns:
+            None
+        """
+        try:
+            if self._encoder is not None:
+                self._encoder.close()
+                self._encoder = None
+        finally:
+            self.index.close()
+
+        if self._stream is not None:
+            with open(os.path.join(self.topic_directory, INFO_FILE), 'w') as file:
+                yaml.safe_dump(self._stream, file)
+
+    def _stream_info(self, image: np.ndarray) -> Dict[str, Any]:
+        """
+        Describe the stream a frame belongs to.
+
+        Args:
+            image (np.ndarray): Decoded image.
+
+        Returns:
+            dict: Backend, pixel format, dtype, shape and frame rate of the stream.
+        """
+        pixel_format, requires_lossless = frame_pixel_format(image)
+        return {
+            'backend': self.backend,
+            'pixel_format': pixel_format,
+            'lossless': self.lossless or requires_lossless,
+            'dtype': image.dtype.name,
+            'shape': list(image.shape),
+            'fps': self.config.get('video_fps', DEFAULT_VIDEO_FPS),
+        }
+
+    def _open_segment(self) -> None:
+        """
+        Close the current segment and start the next one.
+
+        Returns:
+            None
+        """
+        if self._encoder is not None:
+            self._encoder.close()
+        self._segment += 1
+        self._frame = 0
+
+        height, width = self._stream['shape'][:2]
+        path = os.path.join(self.topic_directory, self._segment_name(self._segment))
+        encoder_class = ENCODERS[self.backend]
+        self._encoder = encoder_class(path, width, height, self._stream['pixel_format'], self._stream['lossless'], self.config)
+
+    def _segment_name(self, segment: int) -> str:
+        extension = 'mkv' if self.backend == 'ffmpeg' else 'avi'
+        return f'segment_{segment:05d}.{extension}'
+
+
+class VideoWriterPool(WriterPool):
+    """
+    Collection of per-topic video writers that are closed together.
+    """
+
+    def __init__(self, output_directory: str, config: Dict[str, Any]) -> None:
+        """
+        Initialize the VideoWriterPool.
+
+        Args:
+            output_directory (str): Root directory of the extracted log.
+            config (dict): Extraction configuration settings.
+
+        Returns:
+            None
+        """
+        super().__init__(output_directory)
+        self.config = config
+        self.lossless_topics = set(config.get('video_lossless_topics', []))
+
+    def get(self, topic: str) -> VideoTopicWriter:
+        """
+        Get the video writer of a topic, opening it on first use.
+
+        Args:
+            topic (str): Name of the topic.
+
+        Returns:
+            VideoTopicWriter: The writer of the topic.
+        """
+        writer = self.writers.get(topic)
+        if writer is None:
+            topic_directory = topic_to_directory(self.output_directory, topic)
+            writer = VideoTopicWriter(topic_directory, self.config, topic in self.lossless_topics)
+            self.writers[topic] = writer
+        return writer
+
+
+def read_frame(topic_directory: str, timestamp: int) -> np.ndarray:
+    """
+    Decode the frame of an image topic stored at a bag timestamp.
+
+    The index gives the segment and frame number, so only a seek to the preceding
+    keyframe and a short decode of that segment are needed.
+
+    Args:
+        topic_directory (str): Directory of the topic in the output tree.
+        timestamp (int): Bag receive timestamp of the frame, in nanoseconds.
+
+    Returns:
+        np.ndarray: The frame with the dtype and shape it was extracted with.
+
+    Raises:
+        KeyError: If no frame was stored at the timestamp.
+    """
+    index = pd.read_parquet(os.path.join(topic_directory, INDEX_FILE), filters=[('timestamp', '==', timestamp)])
+    if index.empty:
+        raise KeyError(f'No frame stored at {timestamp}')
+    row = index.iloc[0]
+
+    with open(os.path.join(topic_directory, INFO_FILE), 'r') as file:
+        stream = yaml.safe_load(file)
+
+    path = os.path.join(topic_directory, row['segment'])
+    frame = int(row['frame'])
+    shape = stream['shape']
+
+    if stream['backend'] == 'cv2':
+        capture = cv2.VideoCapture(path)
+        try:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, frame)
+            success, image = capture.read()
+        finally:
+            capture.release()
+        if not success:
+            raise KeyError(f'Frame {frame} missing from {path}')
+        if len(shape) == 2:
+            return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if shape[2] == 4:
+            return cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
+        return image
+
+    # Seek half a frame early so rounding can never skip past the requested frame
+    seek = max(0.0, (frame - 0.5) / stream['fps'])
+    command = [
+        'ffmpeg', '-loglevel', 'error', '-ss', f'{seek:.6f}', '-i', path,
+        '-frames:v', '1', '-f', 'rawvideo', '-pix_fmt', stream['pixel_format'], '-',
+    ]
+    raw = subprocess.run(command, stdout=subprocess.PIPE, check=True).stdout
+
+    return np.frombuffer(raw, dtype=np.dtype(stream['dtype'])).reshape(shape)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+"""
+Base class of the per-topic writer collections.
+
+(c) 2023 Scintilla. All rights reserved.
+Unauthorized reproduction, distribution, or disclosure of this material is strictly
+prohibited without the express written permission of Scintilla.
+"""
+
+from typing import Any, Dict
+
+from common.oslibs import info
+
+
+class WriterPool:
+    """
+    Collection of per-topic writers that are closed together.
+
+    Use it as a context manager so that every writer is flushed and closed both on
+    a normal exit and when an exception is raised during the extraction. Subclasses
+    open their writers lazily and register them in `writers`.
+    """
+
+    def __init__(self, output_directory: str) -> None:
+        """
+        Initialize the WriterPool.
+
+        Args:
+            output_directory (str): Root directory of the extracted log.
+
+        Returns:
+            None
+        """
+        self.output_directory = output_directory
+        self.writers: Dict[str, Any] = {}
+
+    def __enter__(self) -> 'WriterPool':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close every writer, even if closing one of them fails.
+
+        Returns:
+            None
+        """
+        first_exception = None
+        for topic, writer in self.writers.items():
+            try:
+                writer.close()
+                info(f'Closed {type(writer).__name__} for {topic}')
+            except Exception as exception:
+                if first_exception is None:
+                    first_exception = exception
+        self.writers = {}
+        if first_exception is not None:
+            raise first_exception